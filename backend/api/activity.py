@@ -0,0 +1,141 @@
+# api/activity.py
+"""
+Activity timeline: quotes added and imports completed per day, week or month.
+
+Each source is counted with a single ``GROUP BY`` query over the whole range
+and the empty buckets are filled in Python. Buckets that ended before today
+are cached; they only change when a quote or an import log is deleted, which
+bumps a per-user version that is part of every cache key.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import ImportLog, Quote
+
+ACTIVITY_CACHE_TIMEOUT = getattr(settings, 'ACTIVITY_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+ACTIVITY_MAX_BUCKETS = 1100
+
+BUCKETS = ('day', 'week', 'month')
+
+
+class ActivityError(ValueError):
+    """Raised for an invalid bucket size or date range."""
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing ``day``."""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_range(start, end, bucket):
+    """Start dates of every bucket overlapping [start, end]."""
+    current = bucket_start(start, bucket)
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > ACTIVITY_MAX_BUCKETS:
+            raise ActivityError(f'Range too large: more than {ACTIVITY_MAX_BUCKETS} buckets')
+        current = next_bucket(current, bucket)
+    return buckets
+
+
+def _version_key(user_id):
+    return f'activity_version:{user_id}'
+
+
+def bump_activity_version(user_id):
+    """Forget the cached past buckets of a user."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), 1, None)
+
+
+def _bucket_key(user_id, version, bucket, start):
+    return f'activity:{user_id}:{version}:{bucket}:{start.isoformat()}'
+
+
+def _counts(queryset, field, bucket, start, end, date_lookup=None):
+    """{bucket start: count} for ``queryset`` with one GROUP BY query."""
+    date_lookup = date_lookup or field
+    rows = (
+        queryset.filter(**{f'{date_lookup}__gte': start, f'{date_lookup}__lt': end})
+        .annotate(bucket=Trunc(field, bucket, output_field=DateField()))
+        .order_by()
+        .values('bucket')
+        .annotate(count=Count('id'))
+    )
+    return {row['bucket']: row['count'] for row in rows}
+
+
+def activity_timeline(user, start, end, bucket='day'):
+    """
+    ``[{date, quotes_count, imports_count, total_count}]`` for every bucket
+    between ``start`` and ``end`` (inclusive), empty buckets included.
+    """
+    if bucket not in BUCKETS:
+        raise ActivityError(f"Unknown bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+    if start > end:
+        raise ActivityError('start must not be after end')
+
+    today = timezone.now().date()
+    buckets = bucket_range(start, end, bucket)
+
+    # Past buckets come from the cache when possible
+    version = cache.get(_version_key(user.pk), 0)
+    past = [b for b in buckets if next_bucket(b, bucket) <= today]
+    keys = {b: _bucket_key(user.pk, version, bucket, b) for b in past}
+    cached = cache.get_many(keys.values())
+    results = {b: cached[keys[b]] for b in past if keys[b] in cached}
+
+    missing = [b for b in buckets if b not in results]
+    if missing:
+        range_start, range_end = missing[0], next_bucket(missing[-1], bucket)
+        quotes = _counts(Quote.objects.filter(owner=user), 'created', bucket, range_start, range_end)
+        imports = _counts(
+            ImportLog.objects.filter(owner=user, status='completed'), 'created_at', bucket,
+            range_start, range_end, date_lookup='created_at__date',
+        )
+        to_cache = {}
+        for b in missing:
+            results[b] = (quotes.get(b, 0), imports.get(b, 0))
+            if b in keys:
+                to_cache[keys[b]] = results[b]
+        if to_cache:
+            cache.set_many(to_cache, ACTIVITY_CACHE_TIMEOUT)
+
+    return [
+        {
+            'date': b.isoformat(),
+            'quotes_count': results[b][0],
+            'imports_count': results[b][1],
+            'total_count': results[b][0] + results[b][1],
+        }
+        for b in buckets
+    ]
+
+
+def parse_date(value, default):
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ActivityError(f"Invalid date '{value}'. Use YYYY-MM-DD")
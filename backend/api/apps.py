@@ -8,3 +8,4 @@ class ApiConfig(AppConfig):
     def ready(self):
         # Import signal handlers
         import api.views  # Import to ensure signals are connected
+        import api.signals  # noqa: F401
@@ -0,0 +1,246 @@
+# api/benchmark.py
+"""
+Synthetic library used by the query plan and performance checks.
+
+The dataset is deterministic for a given seed and is created with bulk inserts,
+so it can be built quickly inside a test database.
+"""
+from datetime import date, timedelta
+import gzip
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .models import (
+    Author, Book, Tag, Quote, QuoteTag, QuoteNote, ImportLog,
+    QuoteList, QuoteListQuote, QuoteGroup, QuoteGroupMembership,
+)
+from .ranking import RANK_GAP
+from .search import update_search_vectors
+from .fastpath import fast_data
+from .middleware import BROTLI_QUALITY, brotli
+from .renderers import FastJSONRenderer
+from .serializers import QuoteListSerializer, QuoteSerializer
+
+WORDS = (
+    'amor muerte tiempo memoria soledad libertad verdad silencio noche mar '
+    'ciudad camino sueño palabra olvido guerra destino alma cuerpo luz '
+    'love death time memory solitude freedom truth silence night sea city '
+    'road dream word oblivion war fate soul body light'
+).split()
+
+PLATFORMS = ('Kindle', 'Google Books', 'Apple Books')
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def seed_benchmark_dataset(users=5, quotes_per_user=400, books=60, authors=30, tags=40,
+                           notes_per_user=50, imports_per_user=20, seed=42):
+    """
+    Create users with quotes spread over books, tags, notes, lists, groups and
+    import logs. Returns a dict with the created users, books and tags.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+
+    user_objs = User.objects.bulk_create([
+        User(username=f'bench{seed}_{i}', email=f'bench{seed}_{i}@example.com')
+        for i in range(users)
+    ])
+    author_objs = Author.objects.bulk_create([
+        Author(name=f'{_sentence(rng, 2)[:-1]} {seed}-{i}') for i in range(authors)
+    ])
+    book_objs = Book.objects.bulk_create([
+        Book(
+            title=f'{_sentence(rng, 3)[:-1]} {seed}-{i}',
+            author=rng.choice(author_objs),
+            language=rng.choice(('es', 'en', None)),
+        )
+        for i in range(books)
+    ])
+    tag_objs = Tag.objects.bulk_create([
+        Tag(title=f'{rng.choice(WORDS)}-{seed}-{i}') for i in range(tags)
+    ])
+
+    today = date.today()
+    quotes = []
+    for user in user_objs:
+        for _ in range(quotes_per_user):
+            book = rng.choice(book_objs)
+            body = _sentence(rng, rng.randint(8, 40))
+            quotes.append(Quote(
+                owner=user,
+                title=book.title,
+                body=body,
+                hash=str(hash(body)),
+                book=book,
+                is_favorite=rng.random() < 0.1,
+                location=str(rng.randint(1, 400)),
+                source_platform=rng.choice(PLATFORMS),
+            ))
+    quote_objs = Quote.objects.bulk_create(quotes)
+
+    # Spread creation dates over the last two years (auto_now_add ignores them on insert)
+    for quote in quote_objs:
+        quote.created = today - timedelta(days=rng.randint(0, 730))
+    Quote.objects.bulk_update(quote_objs, ['created'], batch_size=1000)
+
+    QuoteTag.objects.bulk_create([
+        QuoteTag(quote=quote, tag=tag)
+        for quote in quote_objs
+        for tag in rng.sample(tag_objs, rng.randint(0, 3))
+    ])
+
+    by_owner = {}
+    for quote in quote_objs:
+        by_owner.setdefault(quote.owner_id, []).append(quote)
+
+    notes = []
+    for user in user_objs:
+        for quote in rng.sample(by_owner[user.pk], min(notes_per_user, quotes_per_user)):
+            notes.append(QuoteNote(
+                quote=quote, user=user, content=_sentence(rng, 12),
+                is_private=rng.random() < 0.3,
+            ))
+    QuoteNote.objects.bulk_create(notes)
+
+    ImportLog.objects.bulk_create([
+        ImportLog(
+            owner=user, platform=rng.choice(('kindle', 'google_books')),
+            file=f'imports/bench_{i}.txt', status='completed',
+            quotes_added=rng.randint(0, 50), duplicates_skipped=rng.randint(0, 10),
+        )
+        for user in user_objs
+        for i in range(imports_per_user)
+    ])
+
+    group = QuoteGroup.objects.create(name=f'Bench club {seed}', created_by=user_objs[0])
+    QuoteGroupMembership.objects.bulk_create([
+        QuoteGroupMembership(group=group, user=user, role='admin' if i == 0 else 'reader')
+        for i, user in enumerate(user_objs)
+    ])
+    for user in user_objs:
+        quote_list = QuoteList.objects.create(
+            title=f'Favoritas de {user.username}', owner=user,
+            visibility='group', group=group,
+        )
+        QuoteListQuote.objects.bulk_create([
+            QuoteListQuote(quote_list=quote_list, quote=quote, position=(i + 1) * RANK_GAP)
+            for i, quote in enumerate(rng.sample(by_owner[user.pk], min(25, quotes_per_user)))
+        ])
+
+    update_search_vectors(Quote.objects.filter(owner__in=user_objs))
+
+    return {
+        'users': user_objs,
+        'authors': author_objs,
+        'books': book_objs,
+        'tags': tag_objs,
+        'group': group,
+    }
+
+
+def measure(func, repeat=5):
+    """
+    Run ``func`` ``repeat`` times. Returns (result, queries of the first run,
+    best wall time in ms).
+    """
+    with CaptureQueriesContext(connection) as queries:
+        result = func()
+    return result, len(queries), _best_ms(func, repeat)
+
+
+def _best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def benchmark_quote_page(user, page_size=100, repeat=5):
+    """
+    Serialize one page of ``user``'s quotes in the rich (detail) form, the
+    compact list form and a sparse fieldset, the last two also through the
+    values() fast path. Returns one row per case with the queries,
+    serialization time and JSON size.
+    """
+    factory = APIRequestFactory()
+    cases = [
+        ('rich', Quote.objects.all(), False, {}),
+        ('compact', Quote.objects.select_related('book__author').prefetch_related('tags'), True, {}),
+        ('fields=id,body,book.title', Quote.objects.select_related('book'), True,
+         {'fields': 'id,body,book.title'}),
+    ]
+    cases += [(f'{name} (fast path)', queryset, compact, params, True)
+              for name, queryset, compact, params in cases[1:]]
+    rows = []
+    for name, queryset, compact, params, *fast in cases:
+        request = Request(factory.get('/api/quotes/paginated/', params))
+        request.user = user
+        page = queryset.filter(owner=user)[:page_size]
+        context = {'request': request, 'compact': compact}
+
+        def serialize():
+            if fast:
+                return fast_data(QuoteSerializer(many=True, context=context), page)
+            return QuoteSerializer(page, many=True, context=context).data
+
+        data, queries, ms = measure(serialize, repeat)
+        rows.append({
+            'case': name,
+            'queries': queries,
+            'ms': round(ms, 1),
+            'bytes': len(JSONRenderer().render(data)),
+        })
+    return rows
+
+
+def benchmark_encoding(user, repeat=5):
+    """
+    Encode typical payloads of ``user`` (a quote page, the whole library, the
+    quote lists with their embedded quotes and a document import echo) with
+    DRF's JSONRenderer and the orjson renderer, and compress them. Returns one
+    row per payload with the encode times and the bytes on the wire.
+    """
+    request = Request(APIRequestFactory().get('/api/quotes/'))
+    request.user = user
+    context = {'request': request, 'compact': True}
+    quotes = Quote.objects.filter(owner=user).select_related('book__author').prefetch_related('tags')
+    library = QuoteSerializer(quotes, many=True, context=context).data
+    payloads = [
+        ('quote page (100)', library[:100]),
+        (f'library ({len(library)})', library),
+        ('quote lists', QuoteListSerializer(
+            QuoteList.objects.filter(owner=user), many=True, context={'request': request},
+        ).data),
+        ('docx echo', {'message': 'ok', 'json_data': [
+            {'title': quote['book']['title'] if quote['book'] else '', 'body': quote['body']}
+            for quote in library
+        ]}),
+    ]
+    rows = []
+    for name, data in payloads:
+        body = FastJSONRenderer().render(data)
+        row = {
+            'payload': name,
+            'json ms': round(_best_ms(lambda: JSONRenderer().render(data), repeat), 2),
+            'orjson ms': round(_best_ms(lambda: FastJSONRenderer().render(data), repeat), 2),
+            'bytes': len(body),
+            'gzip': len(gzip.compress(body, 6)),
+            'gzip ms': round(_best_ms(lambda: gzip.compress(body, 6), repeat), 2),
+        }
+        if brotli is not None:
+            row['br'] = len(brotli.compress(body, quality=BROTLI_QUALITY))
+            row['br ms'] = round(_best_ms(lambda: brotli.compress(body, quality=BROTLI_QUALITY), repeat), 2)
+        rows.append(row)
+    return rows
@@ -0,0 +1,144 @@
+# api/budgets.py
+"""
+Query and latency budgets of the API routes.
+
+Each route of api/urls.py either has a budget here or is listed in
+``BUDGET_EXEMPT`` with the reason. EndpointBudgetTests (api/tests.py) hit
+every budgeted route as the first user of a seeded library (see
+``BUDGET_DATASET``). The test fails when a response runs more queries than
+``queries`` or takes longer than ``ms``, and lists the SQL that ran more
+than once. It also fails when a route is in neither table, so adding a
+route, or raising a budget, is a change that shows up in review.
+
+Reads start from an empty response cache (the cost of a miss) and their
+time is the best of ``BUDGET_REPEAT`` runs. Writes run once, in table
+order, against the same data. Times are scaled by
+``API_BUDGET_LATENCY_SCALE`` for slower machines.
+
+Values in ``kwargs``, ``params`` and ``data`` that start with ``@`` name a
+fixture created by the test (``@quote`` is the pk of one of the user's
+quotes, and so on).
+"""
+from collections import namedtuple
+
+from django.conf import settings
+
+API_BUDGET_LATENCY_SCALE = float(getattr(settings, 'API_BUDGET_LATENCY_SCALE', 1.0))
+BUDGET_REPEAT = 3
+
+# seed_benchmark_dataset() arguments of the budget run
+BUDGET_DATASET = {
+    'users': 3, 'quotes_per_user': 300, 'books': 40, 'authors': 20, 'tags': 30,
+    'notes_per_user': 60, 'imports_per_user': 30,
+}
+
+Budget = namedtuple('Budget', 'route method kwargs params data headers queries ms')
+
+
+def budget(route, queries, ms, method='get', kwargs=None, params=None, data=None, headers=None):
+    return Budget(route, method, kwargs or {}, params or {}, data, headers or {}, queries, ms)
+
+
+PLAIN = {'HTTP_X_PLAIN_LISTS': '1'}
+
+ENDPOINT_BUDGETS = [
+    # Users and account
+    budget('api-root', 0, 50),
+    budget('current_user', 0, 50),
+    budget('user-list', 2, 50),
+    budget('user-detail', 1, 50, kwargs={'pk': '@user'}),
+    budget('user-profile', 0, 50),
+    budget('user-stats', 1, 50),
+    budget('user-activity', 2, 50),
+    budget('user-activity-history', 1, 50),
+    budget('user-goals', 4, 50),
+    budget('subscription-plan', 1, 50, kwargs={'user_id': '@user'}),
+    budget('get_statistics', 1, 50),
+
+    # Library
+    budget('author-list', 2, 50),
+    budget('author-detail', 1, 50, kwargs={'pk': '@author'}),
+    budget('author-books', 2, 50, kwargs={'pk': '@author'}),
+    budget('book-list', 2, 100),
+    budget('book-detail', 2, 50, kwargs={'pk': '@book'}),
+    budget('tag-list', 2, 50),
+    budget('tag-detail', 1, 50, kwargs={'pk': '@tag'}),
+    budget('quote-list', 3, 50),
+    budget('quote-list', 2, 100, headers=PLAIN),
+    budget('quote-paginated', 3, 50),
+    budget('quote-paginated', 4, 100, params={'expand': 'notes'}),
+    budget('quote-random-favorites', 3, 50),
+    budget('quote-detail', 6, 150, kwargs={'pk': '@quote'}),
+    budget('quotetag-list', 2, 50),
+    budget('quotetag-detail', 1, 50, kwargs={'pk': '@quote_tag'}),
+    budget('search', 5, 150, params={'query': 'amor'}),
+    budget('search-autocomplete', 1, 150, params={'q': 'am'}),
+
+    # Notes
+    budget('quotenote-list', 2, 150),
+    budget('quotenote-detail', 1, 50, kwargs={'pk': '@note'}),
+    budget('quotenote-for-quote', 1, 50, params={'quote_id': '@quote'}),
+    budget('quotenote-by-quote', 1, 150, params={'quote_ids': '@quote_ids'}),
+
+    # Groups
+    budget('quotegroup-list', 4, 50),
+    budget('quotegroup-detail', 3, 50, kwargs={'pk': '@group'}),
+    budget('quotegroup-feed', 1, 50),
+    budget('quotegroupmembership-list', 2, 50),
+    budget('quotegroupmembership-detail', 1, 50, kwargs={'pk': '@membership'}),
+    budget('quotegroupshare-list', 2, 50),
+    budget('quotegroupshare-detail', 1, 50, kwargs={'pk': '@share'}),
+
+    # Lists
+    budget('quote-list-list', 3, 150),
+    budget('quote-list-shared', 2, 100),
+    budget('quote-list-detail', 2, 100, kwargs={'pk': '@quote_list'}),
+    budget('quote-list-quotes', 4, 100, kwargs={'pk': '@quote_list'}),
+    budget('quote-list-shared-quotes', 3, 100),
+    budget('quotelistquote-list', 2, 50),
+    budget('quotelistquote-detail', 1, 50, kwargs={'pk': '@list_quote'}),
+
+    # Imports and documents
+    budget('import_history', 3, 50),
+    budget('importlog-list', 2, 50),
+    budget('importlog-detail', 1, 50, kwargs={'pk': '@import_log'}),
+    budget('document-list', 2, 50),
+    budget('document-detail', 1, 50, kwargs={'pk': '@document'}),
+
+    # Writes
+    budget('author-toggle-favorite', 2, 50, 'post', kwargs={'pk': '@author'}),
+    budget('book-toggle-favorite', 3, 50, 'post', kwargs={'pk': '@book'}),
+    budget('tag-toggle-favorite', 2, 50, 'post', kwargs={'pk': '@tag'}),
+    budget('quote-toggle-favorite', 4, 50, 'post', kwargs={'pk': '@quote'}),
+    budget('quote-bulk', 10, 250, 'post', data={'action': 'tag', 'ids': '@quotes', 'tags': ['presupuesto']}),
+    budget('quotegroup-add-members', 8, 100, 'post', kwargs={'pk': '@group'},
+           data={'emails': ['@new_member_email', 'nadie@example.com']}),
+    budget('quotegroup-add-member', 9, 100, 'post', kwargs={'pk': '@group'}, data={'email': '@invitee_email'}),
+    budget('quotegroup-remove-member', 7, 50, 'delete', kwargs={'pk': '@group'}, data={'email': '@invitee_email'}),
+    budget('quote-list-add-quote', 6, 50, 'post', kwargs={'pk': '@quote_list'}, data={'quote_id': '@outside_quote'}),
+    budget('quote-list-move-quote', 9, 50, 'post', kwargs={'pk': '@quote_list'},
+           data={'quote_id': '@outside_quote', 'before_id': '@list_quote_quote'}),
+    budget('quote-list-update-order', 7, 100, 'post', kwargs={'pk': '@quote_list'},
+           data={'quote_ids': '@list_quote_ids'}),
+    budget('quote-list-remove-quote', 7, 50, 'post', kwargs={'pk': '@quote_list'}, data={'quote_id': '@outside_quote'}),
+    budget('quote-list-update-visibility', 7, 100, 'post', kwargs={'pk': '@quote_list'},
+           data={'visibility': 'private'}),
+    budget('user-profile-update', 1, 50, 'patch', data={'bio': 'Lectora'}),
+    budget('profile-update-direct', 1, 50, 'patch', data={'bio': 'Lector'}),
+]
+
+BUDGET_EXEMPT = {
+    'user-change-password': 'dominated by password hashing, not by queries',
+    'user-upload-avatar': 'multipart file upload',
+    'user-upload-avatar-slash': 'multipart file upload',
+    'upload-avatar-direct': 'multipart file upload',
+    'upload_quotes': 'file import, sized by the uploaded file',
+    'upload_docx': 'file import, sized by the uploaded file',
+    'upload_zip': 'file import, sized by the uploaded file',
+    'deepseek-tag': 'calls the Ollama service',
+    'deepseek-related': 'calls the Ollama service',
+    'deepseek-related-by-text': 'calls the Ollama service',
+    'deepseek-chat': 'calls the Ollama service',
+    'deepseek-context': 'calls the Ollama service',
+    'anthropic-generate-tags': 'calls the Anthropic API',
+}
@@ -0,0 +1,205 @@
+# api/bulk.py
+"""
+Set-based mutations over many quotes of one user (``POST /api/quotes/bulk/``).
+
+Each action runs a handful of statements whatever the number of quotes: one
+``UPDATE`` for flags, one ``bulk_create`` for new tag or list rows, raw
+``DELETE`` statements for removals, all in one transaction. Model signals
+don't fire for these statements, so the caches they maintain (search
+vectors, dashboard counters, version stamps, activity rollup) are refreshed
+once per batch at the end instead of once per row.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .activity import bump_activity_version
+from .filters import apply_quote_filters
+from .models import (
+    GroupFeedEntry, Quote, QuoteGroupShare, QuoteList, QuoteListQuote, QuoteNote, QuoteTag,
+)
+from .rollups import record_activity
+from .ranking import append_quotes
+from .search import search_quotes, update_search_vectors
+from .stats import invalidate_stats
+from .tagging import resolve_tags
+from .versions import bump_list_versions, bump_version, quote_viewers
+
+BULK_MAX_QUOTES = getattr(settings, 'BULK_MAX_QUOTES', 5000)
+
+ACTIONS = ('tag', 'untag', 'favorite', 'archive', 'move_to_list', 'delete')
+
+# Flag actions: action -> Quote field
+FLAGS = {'favorite': 'is_favorite', 'archive': 'archive'}
+
+# Rows referencing a quote (and the lookup to it), removed before the quote itself
+QUOTE_DEPENDENTS = (
+    (QuoteTag, 'quote_id'), (QuoteNote, 'quote_id'), (QuoteListQuote, 'quote_id'),
+    (GroupFeedEntry, 'share__quote_id'), (QuoteGroupShare, 'quote_id'),
+)
+
+
+class BulkError(ValueError):
+    """Raised for an invalid bulk request."""
+
+
+def _raw_delete(queryset):
+    """
+    One plain ``DELETE`` for ``queryset``, without fetching the rows or
+    sending signals, which is what keeps removals set-based: the public
+    ``QuerySet.delete()`` collects every row and runs the per-row receivers
+    of api/signals.py (one version/stats invalidation per tag or list row).
+
+    ``QuerySet._raw_delete()`` is private Django API (it backs the "fast
+    delete" path of ``delete()`` since Django 1.9 and is unchanged through
+    5.2); BulkMutationTests.test_raw_delete pins its behaviour, so a Django
+    upgrade that changes it fails there rather than in production.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def select_quotes(user, ids=None, filters=None):
+    """
+    Ids of ``user``'s quotes targeted by ``ids`` (a list) or ``filters`` (the
+    field filters of the paginated listing, plus ``search``).
+    """
+    if (ids is None) == (filters is None):
+        raise BulkError("Provide either 'ids' or 'filter'")
+    quotes = Quote.objects.filter(owner=user)
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise BulkError("'ids' must be a list of integers")
+        quotes = quotes.filter(id__in=ids)
+    else:
+        if not isinstance(filters, dict) or not filters:
+            raise BulkError("'filter' must be a non-empty object")
+        if not all(isinstance(value, str) for value in filters.values()):
+            raise BulkError("'filter' values must be strings")
+        search = filters.get('search')
+        if search:
+            quotes = search_quotes(quotes, search, headline=False)
+        quotes = apply_quote_filters(quotes, filters)
+    try:
+        found = list(quotes.order_by().values_list('id', flat=True)[:BULK_MAX_QUOTES + 1])
+    except (ValueError, ValidationError) as e:
+        # A value the lookups can't take, e.g. a malformed date
+        raise BulkError(f"Invalid 'filter': {e}")
+    if len(found) > BULK_MAX_QUOTES:
+        raise BulkError(f'Too many quotes: at most {BULK_MAX_QUOTES} per request')
+    return found
+
+
+def _set_flag(ids, field, value):
+    targets = Quote.objects.filter(id__in=ids).exclude(**{field: value}).order_by()
+    changed = list(targets.values_list('id', flat=True))
+    if changed:
+        Quote.objects.filter(id__in=changed).update(**{field: value, 'updated': timezone.now()})
+    return set(changed)
+
+
+def _tag(ids, titles):
+    tags = resolve_tags(titles)
+    existing = set(QuoteTag.objects.filter(quote_id__in=ids, tag__in=tags.values()).values_list('quote_id', 'tag_id'))
+    rows = [
+        QuoteTag(quote_id=quote_id, tag=tag)
+        for quote_id in ids for tag in tags.values()
+        if (quote_id, tag.pk) not in existing
+    ]
+    QuoteTag.objects.bulk_create(rows, ignore_conflicts=True)
+    return {row.quote_id for row in rows}
+
+
+def _untag(ids, titles):
+    rows = list(QuoteTag.objects.filter(quote_id__in=ids, tag__title__in=titles).values_list('pk', 'quote_id'))
+    _raw_delete(QuoteTag.objects.filter(pk__in=[pk for pk, _ in rows]))
+    return {quote_id for _, quote_id in rows}
+
+
+def _move_to_list(user, ids, list_id, from_list_id=None):
+    owned = QuoteList.objects.filter(owner=user)
+    if not owned.filter(pk=list_id).exists():
+        raise BulkError('List not found')
+    if from_list_id is not None and not owned.filter(pk=from_list_id).exists():
+        raise BulkError('Source list not found')
+    changed = set(append_quotes(list_id, ids))
+    touched = [list_id]
+    if from_list_id is not None and from_list_id != list_id:
+        removed = QuoteListQuote.objects.filter(quote_list_id=from_list_id, quote_id__in=ids)
+        changed.update(removed.values_list('quote_id', flat=True))
+        _raw_delete(removed)
+        touched.append(from_list_id)
+    if changed:
+        QuoteList.objects.filter(pk__in=touched).update(updated=timezone.now())
+        bump_list_versions(touched)
+    return changed
+
+
+def _delete(user, ids):
+    quotes = Quote.objects.filter(id__in=ids)
+    # Rollup rows to decrement, one per (day, platform)
+    per_day = list(quotes.order_by().values('created', 'source_platform').annotate(n=Count('id')))
+    lists = set(QuoteListQuote.objects.filter(quote_id__in=ids).values_list('quote_list_id', flat=True))
+    for model, lookup in QUOTE_DEPENDENTS:
+        _raw_delete(model.objects.filter(**{f'{lookup}__in': ids}))
+    _raw_delete(quotes)
+    for row in per_day:
+        record_activity(user.pk, row['created'], row['source_platform'], quotes_count=-row['n'])
+    bump_activity_version(user.pk)
+    if lists:
+        bump_list_versions(lists)
+    return set(ids)
+
+
+def bulk_update_quotes(user, action, ids=None, filters=None, tags=None, value=True, list_id=None,
+                       from_list_id=None):
+    """
+    Apply ``action`` to the targeted quotes of ``user`` in one transaction.
+    Returns ``{action, matched, updated, results: [{id, status}]}`` with a
+    status per requested id (per matched id for filters): 'updated',
+    'unchanged' or 'not_found'.
+    """
+    if action not in ACTIONS:
+        raise BulkError(f"Unknown action '{action}'. Use one of: {', '.join(ACTIONS)}")
+    if action in ('tag', 'untag'):
+        if not isinstance(tags, list) or not tags or not all(isinstance(title, str) for title in tags):
+            raise BulkError("'tags' must be a non-empty list of tag titles")
+    if action == 'move_to_list' and not isinstance(list_id, int):
+        raise BulkError("'list_id' is required")
+    if action == 'move_to_list' and from_list_id is not None and not isinstance(from_list_id, int):
+        raise BulkError("'from_list_id' must be a list id")
+    if action in FLAGS and not isinstance(value, bool):
+        raise BulkError("'value' must be true or false")
+
+    with transaction.atomic():
+        found = select_quotes(user, ids, filters)
+        # Read before a delete takes the shares and list rows with it
+        viewers = quote_viewers(found) if action == 'delete' else None
+        if action in FLAGS:
+            changed = _set_flag(found, FLAGS[action], value)
+        elif action == 'tag':
+            changed = _tag(found, tags)
+        elif action == 'untag':
+            changed = _untag(found, tags)
+        elif action == 'move_to_list':
+            changed = _move_to_list(user, found, list_id, from_list_id)
+        else:
+            changed = _delete(user, found)
+
+        if changed:
+            # One invalidation per batch (the per-row signals didn't fire)
+            if action in ('tag', 'untag'):
+                update_search_vectors(Quote.objects.filter(id__in=changed))
+            invalidate_stats([user.pk])
+            if viewers is None:
+                viewers = quote_viewers(changed)
+            bump_version('quotes', viewers | {user.pk})
+
+    found_set = set(found)
+    requested = ids if ids is not None else found
+    results = [
+        {'id': pk, 'status': 'not_found' if pk not in found_set else 'updated' if pk in changed else 'unchanged'}
+        for pk in dict.fromkeys(requested)
+    ]
+    return {'action': action, 'matched': len(found), 'updated': len(changed), 'results': results}
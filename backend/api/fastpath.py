@@ -0,0 +1,275 @@
+# api/fastpath.py
+"""
+Read-only fast path for the hottest GET endpoints.
+
+A serializer (after field selection, see SparseFieldsMixin) is compiled once
+into a plan: the columns to fetch with ``values_list()`` and, per output key,
+the row index and converter of its value. Converters are resolved once: plain
+text, integer and boolean columns are copied as is, everything else goes
+through the DRF field's ``to_representation``. Responses are then built from
+plain tuples without model instances or per-object field introspection, and
+are identical to what the serializer would produce.
+
+Serializers using features the plan can't express (method fields other than
+declared counts, dotted sources, nested many-to-many below the top level...)
+fall back to the regular serializer.
+"""
+from django.conf import settings
+from django.db import models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+FAST_SERIALIZERS = getattr(settings, 'FAST_SERIALIZERS', True)
+
+# Compiled plans are cached per serializer class and field selection
+MAX_PLANS = 256
+
+_plans = {}
+
+# (serializer field, model field) pairs whose database value is already the
+# representation (CharField -> str(value), IntegerField -> int(value), ...)
+PASSTHROUGH = (
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.IntegerField, (models.IntegerField, models.AutoField)),
+    (serializers.BooleanField, (models.BooleanField,)),
+)
+
+
+class Unsupported(Exception):
+    """The serializer can't be expressed as a values() plan."""
+
+
+def count_expression(model, lookup, outer, **filters):
+    """
+    Number of ``model`` rows whose ``lookup`` is the row at ``outer`` (scalar
+    subquery), among those matching ``filters``.
+    """
+    rows = model.objects.filter(**{lookup: OuterRef(outer)}, **filters).order_by().values(lookup)
+    return Coalesce(
+        Subquery(rows.annotate(n=Count('pk')).values('n'), output_field=IntegerField()),
+        Value(0),
+    )
+
+
+def request_user(serializer):
+    """The user of the serializer's request, or None."""
+    return getattr(serializer.context.get('request'), 'user', None)
+
+
+def owned_by(serializer, lookup=None):
+    """
+    ``{lookup: user}`` limiting a count to the requesting user's rows, or {}
+    when there is no lookup or no authenticated request.
+    """
+    user = request_user(serializer)
+    if lookup is None or user is None or not user.is_authenticated:
+        return {}
+    return {lookup: user}
+
+
+class OwnedCount:
+    """
+    Count column limited to the requesting user's rows. Plans are shared by
+    every user, so the expression is only built per fetch (see Plan.rows()).
+    """
+
+    def __init__(self, model, lookup, outer, owner=None):
+        self.model, self.lookup, self.outer, self.owner = model, lookup, outer, owner
+
+    def resolve(self, user):
+        filters = {} if self.owner is None or user is None or not user.is_authenticated else {self.owner: user}
+        return count_expression(self.model, self.lookup, self.outer, **filters)
+
+
+def converter(field, model_field):
+    """Function formatting a non-null raw value like ``field``, or None to copy it."""
+    for field_class, model_classes in PASSTHROUGH:
+        if isinstance(field, field_class) and isinstance(model_field, model_classes):
+            if type(field).to_representation is field_class.to_representation:
+                return None
+    return field.to_representation
+
+
+class Plan:
+    """Columns and output mappers for one serializer over one model."""
+
+    def __init__(self, serializer, model, prefix='', annotations=(), columns=None):
+        self.serializer = serializer
+        self.columns = {} if columns is None else columns
+        self.outputs = []  # (key, kind, payload)
+        self.many = []     # (key, plan, related query name)
+        self.finish = getattr(serializer, 'fast_representation', None)
+        if self.finish is None and type(serializer).to_representation is not serializers.ModelSerializer.to_representation:
+            raise Unsupported(f'{type(serializer).__name__} overrides to_representation')
+
+        concrete = {f.name: f for f in model._meta.concrete_fields}
+        counts = getattr(serializer, 'fast_counts', {})
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in counts:
+                    raise Unsupported(f'{name}: method field')
+                count_model, lookup, *owner = counts[name]
+                key = self._column(OwnedCount(count_model, lookup, f'{prefix}pk', *owner))
+                self.outputs.append((name, 'raw', key))
+                continue
+            if '.' in source or source == '*':
+                raise Unsupported(f'{name}: source {source!r}')
+
+            if isinstance(field, serializers.ListSerializer):
+                model_field = model._meta.get_field(source)
+                if prefix or not model_field.many_to_many:
+                    raise Unsupported(f'{name}: only top-level many-to-many lists')
+                child = Plan(field.child, model_field.related_model)
+                self.many.append((name, child, model_field.related_query_name()))
+            elif isinstance(field, serializers.BaseSerializer):
+                model_field = concrete.get(source)
+                if model_field is None or not model_field.many_to_one:
+                    raise Unsupported(f'{name}: nested serializer on {source!r}')
+                key = self._column(f'{prefix}{source}')
+                child = Plan(field, model_field.related_model, f'{prefix}{source}__', columns=self.columns)
+                self.outputs.append((name, 'nested', (key, child)))
+            elif isinstance(field, PrimaryKeyRelatedField):
+                if source not in concrete:
+                    raise Unsupported(f'{name}: related field {source!r}')
+                self.outputs.append((name, 'raw', self._column(f'{prefix}{source}')))
+            elif isinstance(field, (ManyRelatedField, serializers.FileField, serializers.HiddenField)):
+                raise Unsupported(f'{name}: {type(field).__name__}')
+            elif source in concrete or (not prefix and source in annotations):
+                convert = converter(field, concrete.get(source))
+                key = self._column(f'{prefix}{source}')
+                self.outputs.append((name, 'raw', key) if convert is None else (name, 'field', (key, convert)))
+            else:
+                raise Unsupported(f'{name}: unknown source {source!r}')
+
+        if not getattr(serializer, 'fast_path_supported', lambda: True)():
+            raise Unsupported(f'{type(serializer).__name__} field selection')
+
+    def _column(self, expression):
+        alias = f'c{len(self.columns)}'
+        self.columns[alias] = F(expression) if isinstance(expression, str) else expression
+        return alias
+
+    def compile(self, index):
+        """Resolve column aliases to positions in the fetched tuples (``index``)."""
+        self.steps = []
+        for name, kind, payload in self.outputs:
+            if kind == 'raw':
+                self.steps.append((name, kind, index[payload], None))
+            elif kind == 'field':
+                self.steps.append((name, kind, index[payload[0]], payload[1]))
+            else:
+                payload[1].compile(index)
+                self.steps.append((name, kind, index[payload[0]], payload[1]))
+
+    def build(self, row):
+        rep = {}
+        for name, kind, position, extra in self.steps:
+            value = row[position]
+            if value is None or kind == 'raw':
+                rep[name] = value
+            elif kind == 'field':
+                rep[name] = extra(value)
+            else:
+                rep[name] = extra.build(row)
+        if self.finish and not self.many:
+            rep = self.finish(rep)
+        return rep
+
+    def rows(self, queryset, key_expression, user=None):
+        """
+        Tuples ``(key, *columns)`` of ``queryset``, with positions compiled
+        once; counts are limited to ``user``'s rows.
+        """
+        if not hasattr(self, 'steps'):
+            self.compile({alias: i + 1 for i, alias in enumerate(self.columns)})
+        columns = {
+            alias: column.resolve(user) if isinstance(column, OwnedCount) else column
+            for alias, column in self.columns.items()
+        }
+        return queryset.annotate(**columns).values_list(key_expression, *columns)
+
+    def fetch(self, queryset, user=None):
+        """Representations of every row of ``queryset``, in order (counts as seen by ``user``)."""
+        rows = list(self.rows(queryset.prefetch_related(None), 'pk', user))
+        results = [self.build(row) for row in rows]
+        if not self.many:
+            return results
+
+        ids = [row[0] for row in rows]
+        for name, child, query_name in self.many:
+            grouped = {pk: [] for pk in ids}
+            related = child.serializer.Meta.model.objects.filter(**{f'{query_name}__in': ids})
+            for item in child.rows(related, F(query_name), user):
+                grouped[item[0]].append(child.build(item))
+            for row, rep in zip(rows, results):
+                rep[name] = grouped[row[0]]
+        # Put the many-to-many keys back in serializer order
+        order = [key for key in self.serializer.fields if key in results[0]] if results else []
+        results = [{key: rep[key] for key in order} for rep in results]
+        if self.finish:
+            results = [self.finish(rep) for rep in results]
+        return results
+
+
+def _plan_key(serializer, queryset):
+    request = serializer.context.get('request')
+    params = request.query_params if request is not None else {}
+    return (
+        type(serializer),
+        bool(serializer.context.get('compact')),
+        params.get('fields'),
+        params.get('expand'),
+        tuple(sorted(queryset.query.annotations)),
+    )
+
+
+def get_plan(serializer, queryset):
+    """Compiled plan of ``serializer`` (a ``many=True`` serializer) over ``queryset``, or None."""
+    if not FAST_SERIALIZERS:
+        return None
+    child = getattr(serializer, 'child', serializer)
+    key = _plan_key(child, queryset)
+    plan = _plans.get(key)
+    if plan is None:
+        try:
+            plan = Plan(child, queryset.model, annotations=queryset.query.annotations)
+        except Unsupported:
+            plan = False
+        if len(_plans) >= MAX_PLANS:
+            _plans.clear()
+        _plans[key] = plan
+    return plan or None
+
+
+def fast_data(serializer, queryset):
+    """
+    Serialized data for ``queryset`` through the values() fast path, or None
+    when ``serializer`` (a ``many=True`` serializer without instance) isn't
+    supported. Equal to ``serializer.__class__(queryset, many=True, ...).data``.
+    """
+    plan = get_plan(serializer, queryset)
+    return None if plan is None else plan.fetch(queryset, request_user(serializer))
+
+
+class FastListMixin:
+    """
+    ViewSet mixin serving list() through the values() fast path when possible.
+    Works with paginators providing ``slice_queryset()`` (api/pagination.py).
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = get_plan(self.get_serializer(many=True), queryset)
+        if plan is None or not (self.paginator is None or hasattr(self.paginator, 'slice_queryset')):
+            return super().list(request, *args, **kwargs)
+        page = None if self.paginator is None else self.paginator.slice_queryset(queryset, request, view=self)
+        if page is None:
+            return Response(plan.fetch(queryset, request.user))
+        return self.paginator.get_paginated_response(plan.fetch(page, request.user))
@@ -0,0 +1,107 @@
+# api/feed.py
+"""
+"What's new in my groups": the quotes shared into the groups of a user.
+
+The feed is materialized on write. Sharing a quote copies one
+GroupFeedEntry row to every member of the group (one ``bulk_create``), and
+joining a group copies its latest ``GROUP_FEED_BACKFILL`` shares. Leaving
+the group deletes the member's rows for it, and removing a share, a quote
+or a group deletes the rows through their foreign keys. Reading a feed
+page is then one range scan of the (user, shared_at, id) index, whatever
+the number of groups the user is in. It is paginated with an opaque keyset
+cursor, so deep pages cost the same as the first one.
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import GroupFeedEntry, QuoteGroupMembership, QuoteGroupShare
+
+GROUP_FEED_PAGE_SIZE = getattr(settings, 'GROUP_FEED_PAGE_SIZE', 20)
+GROUP_FEED_MAX_PAGE_SIZE = getattr(settings, 'GROUP_FEED_MAX_PAGE_SIZE', 100)
+# Shares copied into the feed of a new member
+GROUP_FEED_BACKFILL = getattr(settings, 'GROUP_FEED_BACKFILL', 200)
+
+
+class FeedError(ValueError):
+    """Raised for an invalid cursor or page size."""
+
+
+def fan_out_share(share):
+    """Copy ``share`` into the feed of every member of its group."""
+    members = QuoteGroupMembership.objects.filter(group_id=share.group_id).values_list('user_id', flat=True)
+    GroupFeedEntry.objects.bulk_create([
+        GroupFeedEntry(user_id=user_id, share=share, group_id=share.group_id, shared_at=share.shared_at)
+        for user_id in members
+    ], ignore_conflicts=True)
+
+
+def backfill_feed(group_id, user_ids):
+    """Copy the latest GROUP_FEED_BACKFILL shares of the group into the feed of ``user_ids``."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    shares = QuoteGroupShare.objects.filter(group_id=group_id).order_by('-shared_at', '-id').values_list(
+        'id', 'shared_at')[:GROUP_FEED_BACKFILL]
+    GroupFeedEntry.objects.bulk_create([
+        GroupFeedEntry(user_id=user_id, share_id=share_id, group_id=group_id, shared_at=shared_at)
+        for share_id, shared_at in shares
+        for user_id in user_ids
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def drop_feed(group_id, user_ids=None):
+    """Remove the group's entries from the feed of ``user_ids`` (of every member by default)."""
+    entries = GroupFeedEntry.objects.filter(group_id=group_id)
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=list(user_ids))
+    entries.delete()
+
+
+def encode_cursor(entry):
+    raw = f'{entry.shared_at.isoformat()}|{entry.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(shared_at, id) of the last entry of the previous page."""
+    try:
+        shared_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(shared_at), int(pk)
+    except (ValueError, UnicodeError):
+        raise FeedError('Invalid cursor')
+
+
+def parse_page_size(value):
+    if not value:
+        return GROUP_FEED_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise FeedError('page_size must be an integer')
+    if page_size < 1:
+        raise FeedError('page_size must be positive')
+    return min(page_size, GROUP_FEED_MAX_PAGE_SIZE)
+
+
+def feed_page(user, cursor=None, page_size=GROUP_FEED_PAGE_SIZE):
+    """
+    (entries, next cursor) of ``user``'s feed, newest first, starting after
+    ``cursor``. The entries come with their share, quote, book, owner and
+    group in the same query. The next cursor is None on the last page.
+    """
+    entries = GroupFeedEntry.objects.filter(user=user)
+    if cursor:
+        shared_at, pk = decode_cursor(cursor)
+        # The first condition bounds the index range, the second breaks ties
+        entries = entries.filter(Q(shared_at__lte=shared_at), Q(shared_at__lt=shared_at) | Q(id__lt=pk))
+    entries = list(
+        entries.select_related('group', 'share__quote__book', 'share__quote__owner')
+        .order_by('-shared_at', '-id')[:page_size + 1]
+    )
+    if len(entries) <= page_size:
+        return entries, None
+    entries = entries[:page_size]
+    return entries, encode_cursor(entries[-1])
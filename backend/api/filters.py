@@ -0,0 +1,139 @@
+# api/filters.py
+"""
+Per-field filters for the paginated quote listing.
+
+Text filters go through pg_trgm: substring filters use ``ILIKE`` on the bare
+column and fuzzy filters use word similarity. Both are served by the GIN
+``gin_trgm_ops`` indexes declared on the models, so they stay index-backed
+however large the ``quotes`` table grows.
+"""
+from django.db.models import CharField, Count, Exists, OuterRef, Subquery, TextField
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import IContains
+
+from .models import QuoteTag
+
+
+class TrigramIContains(IContains):
+    """
+    Case-insensitive substring match written as ``col ILIKE '%value%'``.
+
+    Django's ``icontains`` compiles to ``UPPER(col::text) LIKE UPPER(...)``,
+    which a trigram index on ``col`` cannot serve; ``ILIKE`` can.
+    """
+    lookup_name = 'trigram_icontains'
+
+    def get_rhs_op(self, connection, rhs):
+        return 'ILIKE %s' % rhs
+
+
+CharField.register_lookup(TrigramIContains)
+TextField.register_lookup(TrigramIContains)
+
+
+class FilterError(ValueError):
+    """Raised for unknown filter/sort fields or match modes."""
+
+
+# Query parameters that are not field filters
+RESERVED_PARAMS = {'page', 'limit', 'sort_field', 'sort_order', 'search', 'format', 'fields', 'expand'}
+
+# Filterable text fields: query parameter -> ORM path. All of them have a
+# trigram index (see Quote/Book/Author/Tag Meta.indexes).
+QUOTE_TEXT_FILTERS = {
+    'title': 'title',
+    'body': 'body',
+    'chapter': 'chapter',
+    'location': 'location',
+    'book.title': 'book__title',
+    'book.author.name': 'book__author__name',
+    'tags': 'tag__title',
+    'tags.title': 'tag__title',
+}
+
+# Match modes, selected with a ``__<mode>`` suffix (``body__fuzzy=amor``)
+MATCH_LOOKUPS = {
+    'contains': 'trigram_icontains',
+    'fuzzy': 'trigram_word_similar',
+}
+
+# Sortable fields: sort_field value -> ORM path
+QUOTE_SORT_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'body': 'body',
+    'chapter': 'chapter',
+    'location': 'location',
+    'source_platform': 'source_platform',
+    'created': 'created',
+    'created_at': 'created',  # name used by the frontend tables
+    'updated': 'updated',
+    'is_favorite': 'is_favorite',
+    'book.title': 'book__title',
+    'book.author.name': 'book__author__name',
+    'tags': 'num_tags',
+}
+
+
+def _tag_count():
+    return Coalesce(Subquery(
+        QuoteTag.objects.filter(quote=OuterRef('pk')).order_by()
+        .values('quote').annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+# Sort keys computed per quote: ORM name -> expression factory
+QUOTE_SORT_ANNOTATIONS = {
+    'num_tags': _tag_count,
+}
+
+
+def parse_filter_param(param):
+    """Split ``book.title__fuzzy`` into (ORM path, lookup)."""
+    field, _, mode = param.partition('__')
+    if field not in QUOTE_TEXT_FILTERS:
+        raise FilterError(f"Unknown filter field '{field}'")
+    if (mode or 'contains') not in MATCH_LOOKUPS:
+        raise FilterError(f"Unknown match mode '{mode}' for filter '{field}'")
+    return QUOTE_TEXT_FILTERS[field], MATCH_LOOKUPS[mode or 'contains']
+
+
+def apply_quote_filters(queryset, params):
+    """
+    Apply every non-reserved query parameter of ``params`` as a field filter.
+    Raises FilterError before touching the queryset if any field is unknown.
+    """
+    filters = [
+        (*parse_filter_param(param), value)
+        for param, value in params.items()
+        if param not in RESERVED_PARAMS and value
+    ]
+    for path, lookup, value in filters:
+        if path.startswith('tag__'):
+            # Tags are matched through the join table so no DISTINCT is needed
+            queryset = queryset.filter(Exists(QuoteTag.objects.filter(
+                quote=OuterRef('pk'), **{f'{path}__{lookup}': value}
+            )))
+        else:
+            queryset = queryset.filter(**{f'{path}__{lookup}': value})
+    return queryset
+
+
+def quote_ordering(sort_field, sort_order='asc'):
+    """Translate sort_field/sort_order into an order_by() argument."""
+    if sort_field not in QUOTE_SORT_FIELDS:
+        raise FilterError(f"Unknown sort field '{sort_field}'")
+    prefix = '-' if (sort_order or '').lower() == 'desc' else ''
+    return f'{prefix}{QUOTE_SORT_FIELDS[sort_field]}'
+
+
+def order_quotes(queryset, sort_field, sort_order='asc'):
+    """
+    Order ``queryset`` by sort_field/sort_order, annotating computed sort
+    keys (tag count) first. Ties are broken by id so pages stay stable.
+    """
+    ordering = quote_ordering(sort_field, sort_order)
+    name = ordering.lstrip('-')
+    if name in QUOTE_SORT_ANNOTATIONS:
+        queryset = queryset.annotate(**{name: QUOTE_SORT_ANNOTATIONS[name]()})
+    return queryset.order_by(ordering, 'id')
@@ -0,0 +1,271 @@
+# api/instrumentation.py
+"""
+Per-request performance instrumentation.
+
+InstrumentationMiddleware measures every request and records:
+
+* wall time,
+* SQL query count and time,
+* duplicate queries (the same SQL with the same parameters run again), and
+* time spent in external services.
+
+External calls are timed by wrapping them with ``external_call('ollama')``
+(a context manager) or ``@timed_external('ollama')``.
+
+Each request produces:
+
+* A ``Server-Timing`` header (``app``, ``db`` and one ``ext-<service>``
+  entry per service), shown by the browser's dev tools. Only with
+  ``PERF_SERVER_TIMING``, which defaults to ``DEBUG``.
+* One JSON line on the ``api.perf`` logger.
+* Entries on the ``api.perf.slow`` logger for queries slower than
+  ``PERF_SLOW_QUERY_MS`` and requests slower than ``PERF_SLOW_REQUEST_MS``.
+  These carry the SQL and the project code that issued it.
+
+Metrics live in a context variable, so code running outside a request
+(commands, tests calling functions directly) is not measured and pays
+nothing but a lookup. The body of a streaming response is produced after
+the middleware returns and is not measured either.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import inspect
+import json
+import logging
+import os
+import time
+import traceback
+
+from django.conf import settings
+from django.db import connections
+
+PERF_INSTRUMENTATION_ENABLED = getattr(settings, 'PERF_INSTRUMENTATION_ENABLED', True)
+# Off by default outside development: the header exposes timings to every client
+PERF_SERVER_TIMING = getattr(settings, 'PERF_SERVER_TIMING', settings.DEBUG)
+PERF_SLOW_REQUEST_MS = getattr(settings, 'PERF_SLOW_REQUEST_MS', 1000)
+PERF_SLOW_QUERY_MS = getattr(settings, 'PERF_SLOW_QUERY_MS', 100)
+# Slowest queries listed with a slow request, and how much of their SQL is kept
+PERF_SLOW_REQUEST_QUERIES = getattr(settings, 'PERF_SLOW_REQUEST_QUERIES', 5)
+PERF_SQL_MAX_CHARS = getattr(settings, 'PERF_SQL_MAX_CHARS', 2000)
+
+logger = logging.getLogger('api.perf')
+slow_logger = logging.getLogger('api.perf.slow')
+
+_metrics = ContextVar('request_metrics', default=None)
+
+_PROJECT_ROOT = str(getattr(settings, 'BASE_DIR', os.getcwd()))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class RequestMetrics:
+    """Counters of one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.duplicate_queries = 0
+        self.external_ms = {}
+        self.external_calls = {}
+        self.view = None
+        self._seen = set()
+        # (ms, sql, origin) of the slowest queries
+        self._slowest = []
+
+    @property
+    def wall_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def add_query(self, sql, params, ms):
+        self.queries += 1
+        self.db_ms += ms
+        try:
+            key = hash((sql, repr(params)))
+        except TypeError:
+            key = None
+        if key is not None:
+            if key in self._seen:
+                self.duplicate_queries += 1
+            self._seen.add(key)
+
+        origin = None
+        if ms >= PERF_SLOW_QUERY_MS:
+            origin = stack_origin()
+            slow_logger.warning(json.dumps({
+                'event': 'slow_query',
+                'view': self.view,
+                'ms': round(ms, 1),
+                'sql': _truncate(sql),
+                'origin': origin,
+            }))
+        if len(self._slowest) < PERF_SLOW_REQUEST_QUERIES or ms > self._slowest[-1][0]:
+            self._slowest.append((ms, sql, origin))
+            self._slowest.sort(key=lambda item: -item[0])
+            del self._slowest[PERF_SLOW_REQUEST_QUERIES:]
+
+    def add_external(self, service, ms):
+        self.external_ms[service] = self.external_ms.get(service, 0.0) + ms
+        self.external_calls[service] = self.external_calls.get(service, 0) + 1
+
+    def slowest_queries(self):
+        return [
+            {'ms': round(ms, 1), 'sql': _truncate(sql), 'origin': origin}
+            for ms, sql, origin in self._slowest
+        ]
+
+
+def _truncate(sql):
+    return sql if len(sql) <= PERF_SQL_MAX_CHARS else sql[:PERF_SQL_MAX_CHARS] + '...'
+
+
+def current_metrics():
+    """Metrics of the request being served, or None outside a request."""
+    return _metrics.get()
+
+
+def stack_origin():
+    """``path:line in function`` of the innermost project frame of the current stack."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE
+                and 'site-packages' not in filename):
+            return f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def _query_timer(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, params, (time.perf_counter() - start) * 1000)
+
+
+@contextmanager
+def external_call(service):
+    """Time the block as a call to ``service`` (e.g. 'ollama', 'anthropic')."""
+    metrics = _metrics.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_external(service, (time.perf_counter() - start) * 1000)
+
+
+def timed_external(service):
+    """
+    Decorator form of external_call(). Generator functions are timed while
+    they produce items, not while the caller handles them.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def generator(*args, **kwargs):
+                items = func(*args, **kwargs)
+                while True:
+                    with external_call(service):
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                    yield item
+            return generator
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def coroutine(*args, **kwargs):
+                with external_call(service):
+                    return await func(*args, **kwargs)
+            return coroutine
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with external_call(service):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(metrics, wall_ms):
+    """Server-Timing header value for ``metrics``."""
+    entries = [
+        f'app;dur={wall_ms:.1f}',
+        f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries"',
+    ]
+    entries += [f'ext-{service};dur={ms:.1f}' for service, ms in sorted(metrics.external_ms.items())]
+    return ', '.join(entries)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class InstrumentationMiddleware:
+    """Measures each request; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not PERF_INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            with _ExecuteWrappers():
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+
+        wall_ms = metrics.wall_ms
+        metrics.view = metrics.view or _view_name(request)
+        if PERF_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(metrics, wall_ms)
+
+        record = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'view': metrics.view,
+            'status': response.status_code,
+            'wall_ms': round(wall_ms, 1),
+            'db_ms': round(metrics.db_ms, 1),
+            'queries': metrics.queries,
+            'duplicate_queries': metrics.duplicate_queries,
+            'external_ms': {service: round(ms, 1) for service, ms in metrics.external_ms.items()},
+            'external_calls': metrics.external_calls,
+        }
+        logger.info(json.dumps(record))
+        if wall_ms >= PERF_SLOW_REQUEST_MS:
+            slow_logger.warning(json.dumps({
+                **record, 'event': 'slow_request', 'slowest_queries': metrics.slowest_queries(),
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # The view is known here already, so slow queries can name it
+        metrics = _metrics.get()
+        if metrics is not None:
+            metrics.view = _view_name(request)
+
+
+class _ExecuteWrappers:
+    """Installs the query timer on every database connection of this thread."""
+
+    def __enter__(self):
+        self.wrappers = [connection.execute_wrapper(_query_timer) for connection in connections.all()]
+        for wrapper in self.wrappers:
+            wrapper.__enter__()
+
+    def __exit__(self, *exc_info):
+        for wrapper in reversed(self.wrappers):
+            wrapper.__exit__(*exc_info)
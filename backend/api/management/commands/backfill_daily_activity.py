@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from api.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily activity rollup from the quotes and import logs tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='users', metavar='USERNAME',
+            help="Only rebuild this user's rows (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        owner_ids = None
+        if options['users']:
+            users = get_user_model().objects.filter(username__in=options['users'])
+            owner_ids = list(users.values_list('pk', flat=True))
+            if len(owner_ids) != len(set(options['users'])):
+                found = set(users.values_list('username', flat=True))
+                missing = sorted(set(options['users']) - found)
+                raise CommandError(f"Unknown users: {', '.join(missing)}")
+
+        rows = backfill(owner_ids)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} daily activity rows"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.benchmark import benchmark_encoding, benchmark_quote_page, seed_benchmark_dataset
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic library in a rolled-back transaction and benchmark the API serialization paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = seed_benchmark_dataset(users=1, quotes_per_user=max(400, options['page_size']))['users'][0]
+                self.report(
+                    f"Quote page ({options['page_size']} quotes)",
+                    benchmark_quote_page(user, options['page_size'], options['repeat']),
+                )
+                self.report('Encoding and compression', benchmark_encoding(user, options['repeat']))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def report(self, title, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        columns = list(rows[0])
+        widths = [max(len(str(column)), *(len(str(row[column])) for row in rows)) for column in columns]
+        self.stdout.write('  '.join(str(c).ljust(w) for c, w in zip(columns, widths)))
+        for row in rows:
+            self.stdout.write('  '.join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+        self.stdout.write('')
@@ -0,0 +1,25 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.response_cache import cache_metrics, reset_cache_metrics
+
+
+class Command(BaseCommand):
+    help = "Show the response cache hits, misses and hit ratio per endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        # The cached endpoints register themselves when the views are imported
+        import_module(settings.ROOT_URLCONF)
+        metrics = cache_metrics()
+        width = max(len(endpoint) for endpoint in metrics)
+        self.stdout.write(f"{'endpoint'.ljust(width)}  {'hits':>8}  {'misses':>8}  {'ratio':>6}")
+        for endpoint, row in metrics.items():
+            ratio = '-' if row['hit_ratio'] is None else f"{row['hit_ratio']:.1%}"
+            self.stdout.write(f"{endpoint.ljust(width)}  {row['hits']:>8}  {row['misses']:>8}  {ratio:>6}")
+        if options['reset']:
+            reset_cache_metrics()
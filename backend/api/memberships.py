@@ -0,0 +1,75 @@
+# api/memberships.py
+"""
+Adding many members to a group at once.
+
+All emails are resolved with one ``IN`` query and the memberships inserted
+with one ``bulk_create``, so inviting a 300-person reading club costs the
+same few queries as inviting one person. bulk_create sends no signals: the
+caches the membership signals maintain (dashboard counters, ``lists``
+version stamps, group feeds) are refreshed once for the added users.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .feed import backfill_feed
+from .models import QuoteGroupMembership
+from .stats import invalidate_stats
+from .versions import bump_version
+
+GROUP_MAX_INVITES = getattr(settings, 'GROUP_MAX_INVITES', 1000)
+
+ROLES = tuple(role for role, _ in QuoteGroupMembership.ROLE_CHOICES)
+
+
+class MembershipError(ValueError):
+    """Raised for an invalid invitation request."""
+
+
+def clean_emails(emails):
+    """(unique emails, repeated emails) of a request, stripped and in order."""
+    if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+        raise MembershipError('emails must be a list of strings')
+    if len(emails) > GROUP_MAX_INVITES:
+        raise MembershipError(f'Too many emails: at most {GROUP_MAX_INVITES} per request')
+    unique, duplicates = {}, []
+    for email in (email.strip() for email in emails):
+        if email:
+            if email in unique:
+                duplicates.append(email)
+            unique[email] = None
+    return list(unique), duplicates
+
+
+def bulk_add_members(group, emails, role='reader'):
+    """
+    Add the users with ``emails`` to ``group`` as ``role``. Returns the
+    emails by outcome: ``added``, ``already_members``, ``unknown`` (no such
+    user) and ``duplicates`` (repeated in ``emails``), plus ``added_ids``,
+    the ids of the users added (in the order of ``added``).
+    """
+    if role not in ROLES:
+        raise MembershipError(f"Invalid role '{role}'. Use one of: {', '.join(ROLES)}")
+    unique, duplicates = clean_emails(emails)
+
+    users = dict(get_user_model().objects.filter(email__in=unique).values_list('email', 'pk'))
+    members = set(
+        QuoteGroupMembership.objects.filter(group=group, user_id__in=users.values()).values_list('user_id', flat=True)
+    )
+    added = [email for email in unique if email in users and users[email] not in members]
+    # ignore_conflicts: a concurrent request may add the same user meanwhile
+    QuoteGroupMembership.objects.bulk_create([
+        QuoteGroupMembership(group=group, user_id=users[email], role=role) for email in added
+    ], ignore_conflicts=True)
+
+    if added:
+        added_ids = [users[email] for email in added]
+        invalidate_stats(added_ids)
+        bump_version('lists', added_ids)
+        backfill_feed(group.pk, added_ids)
+    return {
+        'added': added,
+        'added_ids': [users[email] for email in added],
+        'already_members': [email for email in unique if email in users and users[email] in members],
+        'unknown': [email for email in unique if email not in users],
+        'duplicates': duplicates,
+    }
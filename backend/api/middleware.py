@@ -0,0 +1,79 @@
+# api/middleware.py
+"""
+Response compression negotiated from Accept-Encoding.
+
+Brotli is used when the client accepts it and the ``brotli`` package is
+installed, gzip otherwise. Responses smaller than ``COMPRESSION_MIN_SIZE``
+bytes are sent as is: below roughly one TCP packet compression costs more
+CPU than it saves on the wire.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSION_MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+# 4-6 is the usual trade-off for dynamic content; 11 is meant for static assets
+BROTLI_QUALITY = getattr(settings, 'BROTLI_QUALITY', 5)
+
+
+def accepted_encodings(header):
+    """{encoding: q} parsed from an Accept-Encoding header."""
+    encodings = {}
+    for item in header.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[name.lower()] = q
+    return encodings
+
+
+def negotiate_encoding(header):
+    """'br', 'gzip' or None for an Accept-Encoding header."""
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get('*', 0)
+    if brotli is not None and encodings.get('br', wildcard) > 0:
+        return 'br'
+    if encodings.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware with brotli support and a configurable size threshold."""
+
+    def process_response(self, request, response):
+        if response.streaming:
+            return super().process_response(request, response)
+        if len(response.content) < COMPRESSION_MIN_SIZE or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding == 'gzip':
+            return super().process_response(request, response)
+        if encoding != 'br':
+            return response
+
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Case, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Lower, Trim
+from django.db.models.lookups import In
+
+# Search configurations and Book.language values as api.search had them when
+# this migration was written (frozen here). The first one is the default.
+SEARCH_CONFIGS = ['spanish', 'english']
+LANGUAGE_VARIANTS = {
+    'english': ['en', 'eng', 'english', 'inglés', 'ingles'],
+}
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """Fill the search vector of every quote with one UPDATE (see api.search.search_vector_expression)."""
+    Quote = apps.get_model('api', 'Quote')
+    Book = apps.get_model('api', 'Book')
+    QuoteTag = apps.get_model('api', 'QuoteTag')
+
+    book = Book.objects.filter(pk=OuterRef('book_id'))
+    language = Case(
+        *[When(In(Lower(Trim('language')), variants), then=Value(config))
+          for config, variants in LANGUAGE_VARIANTS.items()],
+        default=Value(SEARCH_CONFIGS[0]),
+    )
+    config = Coalesce(Subquery(book.annotate(config=language).values('config')[:1]), Value(SEARCH_CONFIGS[0]))
+    tag_titles = Subquery(
+        QuoteTag.objects.filter(quote=OuterRef('pk'))
+        .values('quote')
+        .annotate(titles=StringAgg('tag__title', ' '))
+        .values('titles')
+    )
+    Quote.objects.update(search_vector=(
+        SearchVector('body', config=config, weight='A')
+        + SearchVector('title', config=config, weight='B')
+        + SearchVector(
+            Subquery(book.values('title')[:1]),
+            Subquery(book.values('author__name')[:1]),
+            config=config, weight='C',
+        )
+        + SearchVector(tag_titles, config=config, weight='D')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_user_subscription_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quote',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, help_text='Vector de búsqueda de texto completo (mantenido por api.search)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='quotes_search_vector_gin'),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:04
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so large tables stay writable
+    atomic = False
+
+    dependencies = [
+        ('api', '0029_quote_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='author',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='authors_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='books_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['body'], name='quotes_body_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='quotes_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['chapter'], name='quotes_chapter_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['location'], name='quotes_location_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='tags_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:05
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0030_trigram_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='author',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='authors_name_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('title'), name='text_pattern_ops'), name='books_title_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('title'), name='text_pattern_ops'), name='tags_title_prefix'),
+        ),
+    ]
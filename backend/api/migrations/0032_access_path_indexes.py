@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0031_prefix_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='importlog',
+            index=models.Index(fields=['owner', '-created_at'], name='import_logs_owner_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=models.Index(fields=['owner', '-is_favorite', 'created', 'title'], name='quotes_owner_listing_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=models.Index(condition=models.Q(('is_favorite', True)), fields=['owner', 'id'], name='quotes_owner_fav_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=models.Index(fields=['owner', 'created'], name='quotes_owner_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='quote',
+            index=models.Index(fields=['owner', 'book'], name='quotes_owner_book_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='quotenote',
+            index=models.Index(fields=['quote', 'created'], name='quote_notes_quote_created_idx'),
+        ),
+        # The single-column FK indexes are redundant once the composites exist.
+        # Only the indexes are dropped; letting AlterField do it would also
+        # drop and re-validate the foreign key constraints.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='importlog',
+                    name='owner',
+                    field=models.ForeignKey(db_index=False, help_text='Usuario que realizó la importación', on_delete=django.db.models.deletion.CASCADE, related_name='import_logs', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='quote',
+                    name='owner',
+                    field=models.ForeignKey(db_index=False, help_text='Propietario de la cita', on_delete=django.db.models.deletion.CASCADE, related_name='quotes', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='quotenote',
+                    name='quote',
+                    field=models.ForeignKey(db_index=False, help_text='Cita a la que pertenece la nota', on_delete=django.db.models.deletion.CASCADE, related_name='notes', to='api.quote'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "import_logs_owner_id_3c594c95";',
+                    'CREATE INDEX CONCURRENTLY "import_logs_owner_id_3c594c95" ON "import_logs" ("owner_id");',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "quotes_owner_id_92a5c699";',
+                    'CREATE INDEX CONCURRENTLY "quotes_owner_id_92a5c699" ON "quotes" ("owner_id");',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "quote_notes_quote_id_9008c5ff";',
+                    'CREATE INDEX CONCURRENTLY "quote_notes_quote_id_9008c5ff" ON "quote_notes" ("quote_id");',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+# ImportLog.platform -> DailyActivity.source_platform, as api.rollups mapped
+# them when this migration was written (frozen here).
+IMPORT_PLATFORMS = {
+    'kindle': 'Kindle',
+    'google_books': 'Google Books',
+    'google_books_batch': 'Google Books',
+    'apple_books': 'Apple Books',
+}
+
+
+def backfill_daily_activity(apps, schema_editor):
+    """
+    Fill the new rollup from the quotes and completed import logs, as
+    api.rollups.backfill() does, so the activity and import charts are
+    right as soon as the table exists.
+    """
+    Quote = apps.get_model('api', 'Quote')
+    ImportLog = apps.get_model('api', 'ImportLog')
+    DailyActivity = apps.get_model('api', 'DailyActivity')
+
+    rows = {}
+
+    def row(owner_id, day, platform):
+        key = (owner_id, day, platform or '')
+        if key not in rows:
+            rows[key] = DailyActivity(owner_id=owner_id, day=day, source_platform=platform or '')
+        return rows[key]
+
+    for item in (
+        Quote.objects.order_by()
+        .values('owner_id', 'created', platform=Coalesce('source_platform', Value('')))
+        .annotate(count=Count('id'))
+    ):
+        row(item['owner_id'], item['created'], item['platform']).quotes_count = item['count']
+
+    for item in (
+        ImportLog.objects.filter(status='completed').order_by()
+        .values('owner_id', 'platform', day=TruncDate('created_at'))
+        .annotate(count=Count('id'), added=Sum('quotes_added'), skipped=Sum('duplicates_skipped'))
+    ):
+        target = row(item['owner_id'], item['day'], IMPORT_PLATFORMS.get(item['platform'], item['platform'] or ''))
+        target.imports_count += item['count']
+        target.imported_quotes += item['added'] or 0
+        target.duplicates_skipped += item['skipped'] or 0
+
+    DailyActivity.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Día')),
+                ('source_platform', models.CharField(blank=True, default='', help_text='Plataforma de origen (vacío si no se conoce)', max_length=50)),
+                ('quotes_count', models.IntegerField(default=0, help_text='Citas añadidas ese día que siguen en la biblioteca')),
+                ('imports_count', models.IntegerField(default=0, help_text='Importaciones completadas ese día')),
+                ('imported_quotes', models.IntegerField(default=0, help_text='Citas añadidas por las importaciones de ese día')),
+                ('duplicates_skipped', models.IntegerField(default=0, help_text='Duplicados omitidos por las importaciones de ese día')),
+                ('owner', models.ForeignKey(db_index=False, help_text='Usuario al que pertenece la actividad', on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'daily_activity',
+                'ordering': ('day', 'source_platform'),
+                'constraints': [models.UniqueConstraint(fields=('owner', 'day', 'source_platform'), name='daily_activity_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, migrations.RunPython.noop),
+    ]
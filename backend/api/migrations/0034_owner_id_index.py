@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:13
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0033_daily_activity'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='quote',
+            index=models.Index(fields=['owner', 'id'], name='quotes_owner_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_owner_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quote',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, help_text='Fecha y hora de última actualización'),
+        ),
+    ]
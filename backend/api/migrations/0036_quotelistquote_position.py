@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:37
+
+from django.db import migrations, models
+
+# Gap between consecutive positions, as api.ranking.RANK_GAP was when this
+# migration was written (frozen here, the setting may change later).
+RANK_GAP = 1024
+
+# The implicit QuoteList.quotes table as created by 0001_initial, refilled
+# from quote_list_quotes when migrating backwards.
+RECREATE_IMPLICIT_TABLE = [
+    'CREATE TABLE "quote_lists_quotes" ('
+    '"id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY, '
+    '"quotelist_id" bigint NOT NULL, "quote_id" bigint NOT NULL)',
+    'ALTER TABLE "quote_lists_quotes" ADD CONSTRAINT "quote_lists_quotes_quotelist_id_quote_id_7ae3c08e_uniq" '
+    'UNIQUE ("quotelist_id", "quote_id")',
+    'ALTER TABLE "quote_lists_quotes" ADD CONSTRAINT "quote_lists_quotes_quotelist_id_5bf8b88a_fk_quote_lists_id" '
+    'FOREIGN KEY ("quotelist_id") REFERENCES "quote_lists" ("id") DEFERRABLE INITIALLY DEFERRED',
+    'ALTER TABLE "quote_lists_quotes" ADD CONSTRAINT "quote_lists_quotes_quote_id_80b2e0be_fk_quotes_id" '
+    'FOREIGN KEY ("quote_id") REFERENCES "quotes" ("id") DEFERRABLE INITIALLY DEFERRED',
+    'CREATE INDEX "quote_lists_quotes_quotelist_id_5bf8b88a" ON "quote_lists_quotes" ("quotelist_id")',
+    'CREATE INDEX "quote_lists_quotes_quote_id_80b2e0be" ON "quote_lists_quotes" ("quote_id")',
+    'INSERT INTO "quote_lists_quotes" ("quotelist_id", "quote_id") '
+    'SELECT "quote_list_id", "quote_id" FROM "quote_list_quotes" ORDER BY "quote_list_id", "position", "id" '
+    'ON CONFLICT DO NOTHING',
+]
+
+
+def merge_list_quotes(apps, schema_editor):
+    """
+    Move the rows of the implicit QuoteList.quotes table into
+    quote_list_quotes, numbering every list with spaced positions: rows
+    already in quote_list_quotes first, then the others, by insertion order.
+    """
+    QuoteList = apps.get_model('api', 'QuoteList')
+    QuoteListQuote = apps.get_model('api', 'QuoteListQuote')
+    Implicit = QuoteList._meta.get_field('quotes').remote_field.through
+
+    rows = {}
+    for row in QuoteListQuote.objects.order_by('quote_list_id', 'id'):
+        rows.setdefault(row.quote_list_id, {})[row.quote_id] = row
+    for list_id, quote_id in Implicit.objects.order_by('quotelist_id', 'id').values_list('quotelist_id', 'quote_id'):
+        rows.setdefault(list_id, {}).setdefault(quote_id, QuoteListQuote(quote_list_id=list_id, quote_id=quote_id))
+
+    existing, new = [], []
+    for list_rows in rows.values():
+        for index, row in enumerate(list_rows.values(), 1):
+            row.position = index * RANK_GAP
+            (existing if row.pk else new).append(row)
+    QuoteListQuote.objects.bulk_update(existing, ['position'], batch_size=1000)
+    QuoteListQuote.objects.bulk_create(new, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_quote_updated_datetime'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quotelistquote',
+            name='position',
+            field=models.BigIntegerField(default=0, help_text='Posición de la cita en la lista (rangos espaciados)'),
+        ),
+        # Before the data migration: no DDL on a table with pending trigger events
+        migrations.AddIndex(
+            model_name='quotelistquote',
+            index=models.Index(fields=['quote_list', 'position'], name='quote_list_quotes_pos_idx'),
+        ),
+        migrations.RunPython(merge_list_quotes, migrations.RunPython.noop),
+        # QuoteList.quotes now goes through quote_list_quotes; the implicit
+        # table has been merged into it and is dropped. Backwards it is
+        # recreated with every list row (quote_list_quotes keeps them too).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='quotelist',
+                    name='quotes',
+                    field=models.ManyToManyField(blank=True, help_text='Citas incluidas en la lista', related_name='lists', through='api.QuoteListQuote', to='api.quote'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL('DROP TABLE quote_lists_quotes', RECREATE_IMPLICIT_TABLE),
+            ],
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Shares copied per group, as api.feed.GROUP_FEED_BACKFILL defaulted to when
+# this migration was written (frozen here).
+GROUP_FEED_BACKFILL = 200
+
+
+def fill_feeds(apps, schema_editor):
+    """Copy the latest shares of every group into the feeds of its members."""
+    QuoteGroupShare = apps.get_model('api', 'QuoteGroupShare')
+    QuoteGroupMembership = apps.get_model('api', 'QuoteGroupMembership')
+    GroupFeedEntry = apps.get_model('api', 'GroupFeedEntry')
+
+    members = {}
+    for group_id, user_id in QuoteGroupMembership.objects.values_list('group_id', 'user_id'):
+        members.setdefault(group_id, []).append(user_id)
+    for group_id, user_ids in members.items():
+        shares = QuoteGroupShare.objects.filter(group_id=group_id).order_by('-shared_at', '-id').values_list(
+            'id', 'shared_at')[:GROUP_FEED_BACKFILL]
+        GroupFeedEntry.objects.bulk_create([
+            GroupFeedEntry(user_id=user_id, share_id=share_id, group_id=group_id, shared_at=shared_at)
+            for share_id, shared_at in shares
+            for user_id in user_ids
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0036_quotelistquote_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shared_at', models.DateTimeField(help_text='Fecha de compartición (copiada de la compartición)')),
+                ('group', models.ForeignKey(help_text='Grupo en el que se compartió', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='api.quotegroup')),
+                ('share', models.ForeignKey(help_text='Cita compartida', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='api.quotegroupshare')),
+                ('user', models.ForeignKey(db_index=False, help_text='Miembro en cuyo feed aparece la cita', on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'group_feed_entries',
+                'indexes': [models.Index(fields=['user', '-shared_at', '-id'], name='group_feed_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'share'), name='group_feed_unique')],
+            },
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:05
+
+from django.db import migrations
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest, TruncDate
+
+# ImportLog.platform -> DailyActivity.source_platform, as api.rollups mapped
+# them when this migration was written (frozen here).
+IMPORT_PLATFORMS = {
+    'kindle': 'Kindle',
+    'google_books': 'Google Books',
+    'google_books_batch': 'Google Books',
+    'apple_books': 'Apple Books',
+}
+
+
+def fix_import_log_counts(apps, schema_editor):
+    """
+    Import logs that report as many quotes added as duplicates skipped added
+    nothing: every quote was a duplicate (ImportLog.save() enforces it for new
+    rows). Set quotes_added to 0 and take the difference off the daily rollup.
+    """
+    ImportLog = apps.get_model('api', 'ImportLog')
+    DailyActivity = apps.get_model('api', 'DailyActivity')
+
+    inconsistent = ImportLog.objects.filter(duplicates_skipped__gt=0, quotes_added=F('duplicates_skipped'))
+    rollup = (
+        inconsistent.filter(status='completed').order_by()
+        .values('owner_id', 'platform', day=TruncDate('created_at'))
+        .annotate(added=Sum('quotes_added'))
+    )
+    for item in rollup:
+        DailyActivity.objects.filter(
+            owner_id=item['owner_id'], day=item['day'], source_platform=IMPORT_PLATFORMS.get(item['platform'], item['platform'] or ''),
+        ).update(imported_quotes=Greatest(F('imported_quotes') - item['added'], 0))
+    inconsistent.update(quotes_added=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_group_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_import_log_counts, migrations.RunPython.noop),
+    ]
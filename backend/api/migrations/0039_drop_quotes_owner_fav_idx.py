@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_fix_import_log_counts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quote',
+            name='quotes_owner_fav_idx',
+        ),
+    ]
@@ -2,6 +2,9 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 
 
 # -------------------------------------------------------------------------
@@ -73,6 +76,11 @@ class Author(models.Model):
     class Meta:
         ordering = ('-is_favorite', 'name')
         db_table = 'authors'
+        indexes = [
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='authors_name_trgm'),
+            # Prefix index for type-ahead suggestions (api/search.py)
+            models.Index(OpClass(Lower('name'), name='text_pattern_ops'), name='authors_name_prefix'),
+        ]
 
 
 class Book(models.Model):
@@ -104,6 +112,11 @@ class Book(models.Model):
     class Meta:
         ordering = ('-is_favorite', 'title')
         db_table = 'books'
+        indexes = [
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='books_title_trgm'),
+            # Prefix index for type-ahead suggestions (api/search.py)
+            models.Index(OpClass(Lower('title'), name='text_pattern_ops'), name='books_title_prefix'),
+        ]
 
 
 class Tag(models.Model):
@@ -116,6 +129,11 @@ class Tag(models.Model):
     class Meta:
         ordering = ('-is_favorite', 'title')
         db_table = 'tags'
+        indexes = [
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='tags_title_trgm'),
+            # Prefix index for type-ahead suggestions (api/search.py)
+            models.Index(OpClass(Lower('title'), name='text_pattern_ops'), name='tags_title_prefix'),
+        ]
 
     def __str__(self):
         return self.title
@@ -126,13 +144,14 @@ class Quote(models.Model):
         settings.AUTH_USER_MODEL,
         related_name="quotes",
         on_delete=models.CASCADE,
+        db_index=False,  # Covered by the (owner, ...) composite indexes below
         help_text="Propietario de la cita"
     )
     title = models.CharField(max_length=1024, help_text="Título de la cita")
     body = models.TextField(blank=True, null=True, help_text="Contenido de la cita")
     archive = models.BooleanField(default=False, help_text="Indicador de archivado")
     created = models.DateField(auto_now_add=True, help_text="Fecha de creación")
-    updated = models.DateField(auto_now=True, help_text="Fecha de última actualización")
+    updated = models.DateTimeField(auto_now=True, help_text="Fecha y hora de última actualización")
     hash = models.SlugField(blank=True, null=True, help_text="Hash para evitar duplicados")
     book = models.ForeignKey(
         Book,
@@ -150,6 +169,8 @@ class Quote(models.Model):
     chapter = models.CharField(max_length=200, blank=True, null=True,
                               help_text="Capítulo del libro al que pertenece la cita")
     book_url = models.URLField(blank=True, null=True, help_text="URL al libro en plataformas externas (Google Books, etc.)")
+    search_vector = SearchVectorField(blank=True, null=True, editable=False,
+                                      help_text="Vector de búsqueda de texto completo (mantenido por api.search)")
 
     # Many-to-many relation to Tag. Django will auto-create the join table
     # but we also provide an explicit through model if you want more control.
@@ -172,6 +193,22 @@ class Quote(models.Model):
     class Meta:
         ordering = ('-is_favorite', 'created', 'title')
         db_table = 'quotes'
+        indexes = [
+            # Library listing: owner filter + default ordering, read straight off the index
+            models.Index(fields=['owner', '-is_favorite', 'created', 'title'], name='quotes_owner_listing_idx'),
+            # random_favorites: id probes over the library, favorites or not (api/sampling.py)
+            models.Index(fields=['owner', 'id'], name='quotes_owner_id_idx'),
+            # Activity charts: quotes per day for one owner
+            models.Index(fields=['owner', 'created'], name='quotes_owner_created_idx'),
+            # Duplicate detection on import (owner, book, body)
+            models.Index(fields=['owner', 'book'], name='quotes_owner_book_idx'),
+            GinIndex(fields=['search_vector'], name='quotes_search_vector_gin'),
+            # Trigram indexes for the per-field filters (api/filters.py)
+            GinIndex(fields=['body'], opclasses=['gin_trgm_ops'], name='quotes_body_trgm'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='quotes_title_trgm'),
+            GinIndex(fields=['chapter'], opclasses=['gin_trgm_ops'], name='quotes_chapter_trgm'),
+            GinIndex(fields=['location'], opclasses=['gin_trgm_ops'], name='quotes_location_trgm'),
+        ]
 
 
 # Optionally, if you want to control the join table for Quote-Tag relation explicitly:
@@ -254,6 +291,35 @@ class QuoteGroupShare(models.Model):
         )
 
 
+# Group feed, one row per (member, share): fan-out on write (see api/feed.py)
+class GroupFeedEntry(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="feed_entries",
+        on_delete=models.CASCADE,
+        db_index=False,  # Covered by group_feed_user_idx
+        help_text="Miembro en cuyo feed aparece la cita"
+    )
+    share = models.ForeignKey(QuoteGroupShare, related_name="feed_entries", on_delete=models.CASCADE,
+                              help_text="Cita compartida")
+    group = models.ForeignKey(QuoteGroup, related_name="feed_entries", on_delete=models.CASCADE,
+                              help_text="Grupo en el que se compartió")
+    shared_at = models.DateTimeField(help_text="Fecha de compartición (copiada de la compartición)")
+
+    class Meta:
+        db_table = 'group_feed_entries'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'share'], name='group_feed_unique'),
+        ]
+        indexes = [
+            # The feed of a user, newest first, read as one range (keyset pagination)
+            models.Index(fields=['user', '-shared_at', '-id'], name='group_feed_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Feed de {self.user_id}: compartición {self.share_id}"
+
+
 # -------------------------------------------------------------------------
 # Models for Thematic Quote Lists (Playlists)
 # -------------------------------------------------------------------------
@@ -286,7 +352,8 @@ class QuoteList(models.Model):
         Quote,
         blank=True,
         related_name="lists",
-        help_text="Citas incluidas en la lista"
+        help_text="Citas incluidas en la lista",
+        through='QuoteListQuote'
     )
     created = models.DateTimeField(auto_now_add=True, help_text="Fecha de creación de la lista")
     updated = models.DateTimeField(auto_now=True, help_text="Fecha de actualización de la lista")
@@ -298,14 +365,19 @@ class QuoteList(models.Model):
         db_table = 'quote_lists'
 
 
-# If you wish to explicitly control the join table for QuoteList<->Quote relationship:
+# Join table of QuoteList.quotes, with the manual order of the list (see api/ranking.py)
 class QuoteListQuote(models.Model):
     quote_list = models.ForeignKey(QuoteList, on_delete=models.CASCADE)
     quote = models.ForeignKey(Quote, on_delete=models.CASCADE)
+    position = models.BigIntegerField(default=0, help_text="Posición de la cita en la lista (rangos espaciados)")
 
     class Meta:
         unique_together = ('quote_list', 'quote')
         db_table = 'quote_list_quotes'
+        indexes = [
+            # Ordered reads of a list and neighbour lookups when moving a quote
+            models.Index(fields=['quote_list', 'position'], name='quote_list_quotes_pos_idx'),
+        ]
 
     def __str__(self):
         return f"Lista: {self.quote_list} - Cita: {self.quote}"
@@ -345,6 +417,7 @@ class ImportLog(models.Model):
         settings.AUTH_USER_MODEL,
         related_name="import_logs",
         on_delete=models.CASCADE,
+        db_index=False,  # Covered by import_logs_owner_created_idx
         help_text="Usuario que realizó la importación"
     )
     platform = models.CharField(max_length=50, choices=PLATFORM_CHOICES, help_text="Plataforma de origen")
@@ -365,6 +438,41 @@ class ImportLog(models.Model):
 
     class Meta:
         db_table = 'import_logs'
+        indexes = [
+            # Import history: one owner, newest first
+            models.Index(fields=['owner', '-created_at'], name='import_logs_owner_created_idx'),
+        ]
+
+
+# -------------------------------------------------------------------------
+# Daily activity rollup (maintained by api.rollups)
+# -------------------------------------------------------------------------
+
+class DailyActivity(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="daily_activity",
+        on_delete=models.CASCADE,
+        db_index=False,  # Covered by daily_activity_unique
+        help_text="Usuario al que pertenece la actividad"
+    )
+    day = models.DateField(help_text="Día")
+    source_platform = models.CharField(max_length=50, blank=True, default='',
+                                       help_text="Plataforma de origen (vacío si no se conoce)")
+    quotes_count = models.IntegerField(default=0, help_text="Citas añadidas ese día que siguen en la biblioteca")
+    imports_count = models.IntegerField(default=0, help_text="Importaciones completadas ese día")
+    imported_quotes = models.IntegerField(default=0, help_text="Citas añadidas por las importaciones de ese día")
+    duplicates_skipped = models.IntegerField(default=0, help_text="Duplicados omitidos por las importaciones de ese día")
+
+    def __str__(self):
+        return f"Actividad de {self.owner_id} el {self.day} ({self.source_platform or '-'})"
+
+    class Meta:
+        db_table = 'daily_activity'
+        ordering = ('day', 'source_platform')
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'day', 'source_platform'], name='daily_activity_unique'),
+        ]
 
 
 # -------------------------------------------------------------------------
@@ -376,6 +484,7 @@ class QuoteNote(models.Model):
         Quote,
         related_name="notes",
         on_delete=models.CASCADE,
+        db_index=False,  # Covered by quote_notes_quote_created_idx
         help_text="Cita a la que pertenece la nota"
     )
     user = models.ForeignKey(
@@ -395,6 +504,10 @@ class QuoteNote(models.Model):
     class Meta:
         ordering = ('created',)
         db_table = 'quote_notes'
+        indexes = [
+            # Notes of a quote in display order
+            models.Index(fields=['quote', 'created'], name='quote_notes_quote_created_idx'),
+        ]
 
 
 # Add a UserGoals model to store user goals
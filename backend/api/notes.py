@@ -0,0 +1,51 @@
+# api/notes.py
+"""
+Notes of many quotes at once (``GET /api/quote-notes/by_quote/?quote_ids=``).
+
+A reading view asks for the notes of all its quotes in one request, answered
+with one query: the visible notes (see visibility.visible_notes()) of the
+requested quotes with their authors joined in, read through the
+(quote, created) index and grouped by quote in Python.
+"""
+from django.conf import settings
+from django.db.models import Prefetch, Q
+
+from .models import QuoteNote
+from .visibility import visible_notes
+
+NOTES_MAX_QUOTES = getattr(settings, 'NOTES_MAX_QUOTES', 200)
+
+
+class NotesError(ValueError):
+    """Raised for an invalid ``quote_ids`` parameter."""
+
+
+def parse_quote_ids(value):
+    """Quote ids of a ``1,2,3`` parameter, without repetitions and in order."""
+    if not value:
+        raise NotesError('quote_ids parameter is required')
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise NotesError('quote_ids must be a comma-separated list of integers')
+    if len(ids) > NOTES_MAX_QUOTES:
+        raise NotesError(f'Too many quotes: at most {NOTES_MAX_QUOTES} per request')
+    return ids
+
+
+def notes_by_quote(user, quote_ids):
+    """{quote id: [notes in display order]} for every id in ``quote_ids``."""
+    grouped = {quote_id: [] for quote_id in quote_ids}
+    notes = visible_notes(user, QuoteNote.objects.filter(quote_id__in=quote_ids)).select_related('user')
+    for note in notes.order_by('quote_id', 'created', 'pk'):
+        grouped[note.quote_id].append(note)
+    return grouped
+
+
+def prefetch_visible_notes(user):
+    """
+    Prefetch of the notes ``user`` can see on quotes they can already open,
+    into ``visible_notes`` (read by QuoteSerializer.get_notes()).
+    """
+    notes = QuoteNote.objects.filter(Q(user=user) | Q(is_private=False)).select_related('user')
+    return Prefetch('notes', queryset=notes.order_by('created', 'pk'), to_attr='visible_notes')
@@ -0,0 +1,94 @@
+# api/pagination.py
+"""
+Default pagination of every ModelViewSet list.
+
+Lists are paginated with ``?page=`` / ``?page_size=`` (50 items by default,
+at most ``API_MAX_PAGE_SIZE``) and answered with the usual
+``{count, next, previous, results}`` envelope.
+
+Compatibility path: clients that still expect plain arrays (the bundled
+frontend) send ``X-Plain-Lists: 1`` and get a plain JSON array instead. It
+is bounded as well: at most ``PLAIN_LIST_LIMIT`` items, and when the list
+was cut the response carries ``X-Total-Count`` and a ``Link: rel="next"``
+header pointing at the paginated form.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+API_PAGE_SIZE = getattr(settings, 'API_PAGE_SIZE', 50)
+API_MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+PLAIN_LIST_LIMIT = getattr(settings, 'PLAIN_LIST_LIMIT', 1000)
+
+# The Link header of a cut plain list points at the page of API_MAX_PAGE_SIZE
+# items that starts right after the cut, which only exists for multiples.
+if PLAIN_LIST_LIMIT % API_MAX_PAGE_SIZE:
+    raise ImproperlyConfigured(
+        f'PLAIN_LIST_LIMIT ({PLAIN_LIST_LIMIT}) must be a multiple of API_MAX_PAGE_SIZE ({API_MAX_PAGE_SIZE}).'
+    )
+
+PLAIN_LISTS_HEADER = 'HTTP_X_PLAIN_LISTS'
+
+
+def wants_plain_list(request):
+    """True when the client asked for plain arrays and no explicit page."""
+    return (
+        request.META.get(PLAIN_LISTS_HEADER, '') not in ('', '0')
+        and 'page' not in request.query_params
+        and 'page_size' not in request.query_params
+    )
+
+
+class DefaultPagination(PageNumberPagination):
+    page_size = API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = API_MAX_PAGE_SIZE
+    # False for endpoints whose envelope carries more than the page (always paginated)
+    allow_plain_lists = True
+
+    def slice_queryset(self, queryset, request, view=None):
+        """
+        Like ``paginate_queryset()`` but returns the page as an unevaluated
+        queryset slice, so callers can fetch it their own way (see
+        api/fastpath.py).
+        """
+        self.request = request
+        self.plain = self.allow_plain_lists and wants_plain_list(request)
+        if self.plain:
+            self.queryset = queryset
+            # One extra row tells whether the list was cut
+            return queryset[:PLAIN_LIST_LIMIT + 1]
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return self.page.object_list
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.slice_queryset(queryset, request, view)
+        return None if page is None else list(page)
+
+    def get_paginated_response(self, data):
+        if not self.plain:
+            return super().get_paginated_response(data)
+        if len(data) <= PLAIN_LIST_LIMIT:
+            return Response(data)
+        response = Response(data[:PLAIN_LIST_LIMIT])
+        response['X-Total-Count'] = str(self.queryset.count())
+        # PLAIN_LIST_LIMIT is a multiple of the page size, so the next page starts right after the cut
+        url = replace_query_param(self.request.build_absolute_uri(), self.page_size_query_param, self.max_page_size)
+        next_page = PLAIN_LIST_LIMIT // self.max_page_size + 1
+        response['Link'] = '<%s>; rel="next"' % replace_query_param(url, self.page_query_param, next_page)
+        return response
@@ -0,0 +1,147 @@
+# api/ranking.py
+"""
+Manual order of the quotes of a list.
+
+Every QuoteListQuote row has an integer ``position``; positions are spaced
+``RANK_GAP`` apart. Moving a quote rewrites only its own row, which takes
+the midpoint between its new neighbours. When there is no integer left
+between two neighbours the list is rebalanced (renumbered with the full gap
+again), which takes at least log2(RANK_GAP) moves into the same spot.
+Ordered reads use the (quote_list, position) index.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+
+from .models import Quote, QuoteListQuote
+from .versions import bump_list_versions
+
+RANK_GAP = getattr(settings, 'LIST_RANK_GAP', 1024)
+# Quotes shown in a list summary, and their length
+LIST_PREVIEW_SIZE = getattr(settings, 'LIST_PREVIEW_SIZE', 3)
+LIST_PREVIEW_CHARS = getattr(settings, 'LIST_PREVIEW_CHARS', 160)
+
+
+class RankError(ValueError):
+    """Raised when a quote or an anchor isn't in the list."""
+
+
+def ordered_quotes(quote_list):
+    """Quotes of ``quote_list`` in the list's order."""
+    return Quote.objects.filter(quotelistquote__quote_list=quote_list).order_by(
+        'quotelistquote__position', 'quotelistquote__id',
+    )
+
+
+def list_preview_rows(rows):
+    """The first LIST_PREVIEW_SIZE rows of a QuoteListQuote queryset, with quote and book."""
+    return rows.select_related('quote__book').order_by('position', 'id')[:LIST_PREVIEW_SIZE]
+
+
+def next_position(list_id):
+    """Position after the last quote of the list."""
+    last = QuoteListQuote.objects.filter(quote_list_id=list_id).aggregate(last=Max('position'))['last']
+    return (last or 0) + RANK_GAP
+
+
+def append_quotes(list_id, quote_ids):
+    """Add ``quote_ids`` missing from the list at its end. Returns the added ids."""
+    existing = set(
+        QuoteListQuote.objects.filter(quote_list_id=list_id, quote_id__in=quote_ids).values_list('quote_id', flat=True)
+    )
+    added = [quote_id for quote_id in dict.fromkeys(quote_ids) if quote_id not in existing]
+    if added:
+        start = next_position(list_id)
+        QuoteListQuote.objects.bulk_create([
+            QuoteListQuote(quote_list_id=list_id, quote_id=quote_id, position=start + index * RANK_GAP)
+            for index, quote_id in enumerate(added)
+        ], ignore_conflicts=True)
+    return added
+
+
+def _renumber(rows):
+    """Give ``rows`` (in order) spaced positions, writing only the rows that change."""
+    changed = []
+    for index, row in enumerate(rows, 1):
+        if row.position != index * RANK_GAP:
+            row.position = index * RANK_GAP
+            changed.append(row)
+    QuoteListQuote.objects.bulk_update(changed, ['position'], batch_size=1000)
+    return changed
+
+
+def rebalance(list_id):
+    """Renumber the list with the full gap between consecutive quotes."""
+    rows = QuoteListQuote.objects.filter(quote_list_id=list_id).order_by('position', 'id').only('id', 'position')
+    return _renumber(list(rows))
+
+
+def move_quote(quote_list, quote_id, after_id=None, before_id=None):
+    """
+    Place ``quote_id`` right after ``after_id``, right before ``before_id``,
+    or at the end of the list when no anchor is given. Only the moved row is
+    written unless the list has to be rebalanced. Returns the new position.
+    """
+    rows = QuoteListQuote.objects.filter(quote_list=quote_list)
+    with transaction.atomic():
+        row = rows.select_for_update().filter(quote_id=quote_id).first()
+        if row is None:
+            raise RankError('Quote not in list')
+        anchor_id = after_id if after_id is not None else before_id
+        if anchor_id == quote_id:
+            return row.position
+        others = rows.exclude(pk=row.pk)
+
+        if anchor_id is None:
+            low = others.aggregate(last=Max('position'))['last']
+            high = None
+        else:
+            anchor = others.filter(quote_id=anchor_id).values_list('position', 'id').first()
+            if anchor is None:
+                raise RankError('Anchor quote not in list')
+            position, pk = anchor
+            if after_id is not None:
+                low = position
+                high = others.filter(Q(position__gt=position) | Q(position=position, id__gt=pk)).order_by(
+                    'position', 'id').values_list('position', flat=True).first()
+            else:
+                high = position
+                low = others.filter(Q(position__lt=position) | Q(position=position, id__lt=pk)).order_by(
+                    '-position', '-id').values_list('position', flat=True).first()
+
+        if low is None and high is None:
+            new_position = RANK_GAP
+        elif high is None:
+            new_position = low + RANK_GAP
+        elif low is None:
+            new_position = high - RANK_GAP
+        elif high - low >= 2:
+            new_position = (low + high) // 2
+        else:
+            # No room between the neighbours: spread the list out and retry
+            rebalance(quote_list.pk)
+            return move_quote(quote_list, quote_id, after_id, before_id)
+
+        row.position = new_position
+        row.save(update_fields=['position'])
+    return new_position
+
+
+def reorder(quote_list, quote_ids):
+    """
+    Put the list in the order of ``quote_ids``; quotes of the list that
+    aren't mentioned keep their relative order after them. Ids not in the
+    list are ignored. Returns the number of rows written.
+    """
+    with transaction.atomic():
+        rows = {
+            row.quote_id: row
+            for row in QuoteListQuote.objects.select_for_update().filter(quote_list=quote_list).order_by(
+                'position', 'id').only('id', 'quote_id', 'position')
+        }
+        ordered = [rows.pop(quote_id) for quote_id in dict.fromkeys(quote_ids) if quote_id in rows]
+        changed = _renumber(ordered + list(rows.values()))
+    if changed:
+        # bulk_update sends no signals
+        bump_list_versions([quote_list.pk])
+    return len(changed)
@@ -0,0 +1,151 @@
+# api/response_cache.py
+"""
+Per-user cache of read-heavy API responses.
+
+Entries are keyed on the endpoint, the user, the normalized query string
+and the version stamps of the scopes the endpoint depends on (see
+api/versions.py). Writes bump those stamps from the model signals, so a
+stale entry is never read again and simply expires; nothing has to be
+deleted. Only the data (and pagination headers) of 200 responses is stored,
+rendering still happens per request.
+
+Hits and misses are counted per endpoint in the cache as well, so the
+numbers are shared by every worker when the backend is (Redis in
+production, see CACHES in settings.py). ``manage.py response_cache_stats``
+prints them.
+
+Entries are keyed on the version stamps, which are only current when every
+worker shares the cache, so ``RESPONSE_CACHE_ENABLED`` defaults to
+``cache_is_shared()``: off with the per-process LocMemCache.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .pagination import PLAIN_LISTS_HEADER
+from .versions import cache_is_shared, get_versions
+
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 10)
+RESPONSE_CACHE_ENABLED = getattr(settings, 'RESPONSE_CACHE_ENABLED', cache_is_shared())
+
+# Endpoints using the cache, for the metrics
+ENDPOINTS = set()
+
+# Response headers stored with the data (set by api/pagination.py)
+CACHED_HEADERS = ('X-Total-Count', 'Link')
+
+
+def normalized_params(request):
+    """Query string with keys and repeated values sorted."""
+    params = request.query_params
+    return '&'.join(
+        f'{key}={value}' for key in sorted(params) for value in sorted(params.getlist(key))
+    )
+
+
+def _counter_key(endpoint, outcome):
+    return f'response_cache_stats:{endpoint}:{outcome}'
+
+
+def _count(endpoint, outcome):
+    key = _counter_key(endpoint, outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cache_metrics():
+    """{endpoint: {'hits', 'misses', 'hit_ratio'}} for every cached endpoint."""
+    keys = [_counter_key(endpoint, outcome) for endpoint in ENDPOINTS for outcome in ('hits', 'misses')]
+    counters = cache.get_many(keys)
+    metrics = {}
+    for endpoint in sorted(ENDPOINTS):
+        hits = counters.get(_counter_key(endpoint, 'hits'), 0)
+        misses = counters.get(_counter_key(endpoint, 'misses'), 0)
+        total = hits + misses
+        metrics[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 3) if total else None,
+        }
+    return metrics
+
+
+def reset_cache_metrics():
+    cache.delete_many([
+        _counter_key(endpoint, outcome) for endpoint in ENDPOINTS for outcome in ('hits', 'misses')
+    ])
+
+
+def cached_response(endpoint, request, scopes, compute, user_id=None, extra=''):
+    """
+    Response for ``request`` from the cache, or from ``compute()`` (stored when
+    it is a 200). ``user_id`` selects whose stamps are used (the requesting
+    user by default); ``extra`` adds URL arguments to the key.
+    """
+    if not RESPONSE_CACHE_ENABLED or request.method != 'GET':
+        return compute()
+    user_id = request.user.pk if user_id is None else user_id
+    versions = get_versions(scopes, user_id)
+    variant = '|'.join([
+        str(request.user.pk), extra, normalized_params(request), request.META.get(PLAIN_LISTS_HEADER, ''),
+        *(f'{scope}={versions[scope]!r}' for scope in scopes),
+    ])
+    key = f'response:{endpoint}:' + hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()
+
+    entry = cache.get(key)
+    if entry is not None:
+        _count(endpoint, 'hits')
+        data, headers = entry
+        return Response(data, headers=headers)
+    _count(endpoint, 'misses')
+    response = compute()
+    if response.status_code == 200:
+        headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+        cache.set(key, (response.data, headers), RESPONSE_CACHE_TIMEOUT)
+    return response
+
+
+def cache_response(*scopes, user_kwarg=None):
+    """
+    Decorator caching a function view (under ``@api_view``) or a viewset
+    action per user. ``scopes`` are the version scopes whose writes change the
+    response; ``user_kwarg`` names a URL argument holding the user the
+    response is about, when it isn't the requesting user.
+    """
+    def decorator(view):
+        endpoint = view.__qualname__
+        ENDPOINTS.add(endpoint)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            user_id = kwargs.get(user_kwarg) if user_kwarg else None
+            extra = '&'.join(f'{key}={value}' for key, value in sorted(kwargs.items()))
+            return cached_response(
+                endpoint, request, scopes, lambda: view(*args, **kwargs), user_id=user_id, extra=extra,
+            )
+        return wrapper
+    return decorator
+
+
+class CachedListMixin:
+    """ViewSet mixin caching list() per user, invalidated by ``version_scopes``."""
+
+    version_scopes = ('library', 'quotes')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        ENDPOINTS.add(f'{cls.__name__}.list')
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            f'{type(self).__name__}.list', request, self.version_scopes,
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs),
+        )
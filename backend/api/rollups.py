@@ -0,0 +1,177 @@
+# api/rollups.py
+"""
+Daily activity rollup: one DailyActivity row per (owner, day, source platform).
+
+Rows are updated incrementally by the receivers in api/signals.py (quote
+created/deleted, import completed) and can be rebuilt from the source tables
+with ``manage.py backfill_daily_activity``. Long-range charts aggregate these
+rows instead of scanning ``quotes`` and ``import_logs``.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum, Value
+from django.db.models.functions import Coalesce, Trunc, TruncDate
+from django.utils import timezone
+
+from .activity import bucket_start
+from .models import DailyActivity, ImportLog, Quote
+
+# ImportLog.platform values mapped to the labels stored in Quote.source_platform
+IMPORT_PLATFORMS = {
+    'kindle': 'Kindle',
+    'google_books': 'Google Books',
+    'google_books_batch': 'Google Books',
+    'apple_books': 'Apple Books',
+}
+
+COUNTERS = ('quotes_count', 'imports_count', 'imported_quotes', 'duplicates_skipped')
+
+
+def import_platform(platform):
+    return IMPORT_PLATFORMS.get(platform, platform or '')
+
+
+def record_activity(owner_id, day, source_platform, **deltas):
+    """
+    Add ``deltas`` (counter name -> increment) to the rollup row of
+    (owner, day, platform), creating it if needed. Negative-only deltas never
+    create a row.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    key = {'owner_id': owner_id, 'day': day, 'source_platform': source_platform or ''}
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if DailyActivity.objects.filter(**key).update(**updates):
+        return
+    if all(value < 0 for value in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            DailyActivity.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Created concurrently: fall back to the increment
+        DailyActivity.objects.filter(**key).update(**updates)
+
+
+def import_contribution(log):
+    """Rollup counters contributed by an ImportLog (nothing unless completed)."""
+    if log.status != 'completed':
+        return {}
+    return {
+        'imports_count': 1,
+        'imported_quotes': log.quotes_added,
+        'duplicates_skipped': log.duplicates_skipped,
+    }
+
+
+def record_import(log, previous=None, sign=1):
+    """
+    Apply the change between ``previous`` (an older copy of ``log``, or None)
+    and ``log`` to the rollup. ``sign=-1`` removes ``log``'s contribution.
+    """
+    day = timezone.localdate(log.created_at)
+    platform = import_platform(log.platform)
+    current = import_contribution(log)
+    before = import_contribution(previous) if previous is not None else {}
+    record_activity(log.owner_id, day, platform, **{
+        name: sign * current.get(name, 0) - before.get(name, 0)
+        for name in ('imports_count', 'imported_quotes', 'duplicates_skipped')
+    })
+
+
+def backfill(owner_ids=None):
+    """
+    Rebuild the rollup rows of ``owner_ids`` (all users if None) from the
+    source tables with two GROUP BY queries. Returns the number of rows written.
+    """
+    quotes = Quote.objects.all()
+    imports = ImportLog.objects.filter(status='completed')
+    existing = DailyActivity.objects.all()
+    if owner_ids is not None:
+        quotes = quotes.filter(owner_id__in=owner_ids)
+        imports = imports.filter(owner_id__in=owner_ids)
+        existing = existing.filter(owner_id__in=owner_ids)
+
+    rows = {}
+
+    def row(owner_id, day, platform):
+        key = (owner_id, day, platform or '')
+        if key not in rows:
+            rows[key] = DailyActivity(owner_id=owner_id, day=day, source_platform=platform or '')
+        return rows[key]
+
+    for item in (
+        quotes.order_by()
+        .values('owner_id', 'created', platform=Coalesce('source_platform', Value('')))
+        .annotate(count=Count('id'))
+    ):
+        row(item['owner_id'], item['created'], item['platform']).quotes_count = item['count']
+
+    for item in (
+        imports.order_by()
+        .values('owner_id', 'platform', day=TruncDate('created_at'))
+        .annotate(count=Count('id'), added=Sum('quotes_added'), skipped=Sum('duplicates_skipped'))
+    ):
+        target = row(item['owner_id'], item['day'], import_platform(item['platform']))
+        # Several ImportLog platforms can share a label
+        target.imports_count += item['count']
+        target.imported_quotes += item['added'] or 0
+        target.duplicates_skipped += item['skipped'] or 0
+
+    with transaction.atomic():
+        existing.delete()
+        DailyActivity.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def activity_history(user, start, end, bucket='day'):
+    """
+    Rollup totals per bucket (day, week or month) and platform between
+    ``start`` and ``end`` (inclusive), read from the DailyActivity rows only.
+    """
+    start = bucket_start(start, bucket)
+    rows = (
+        DailyActivity.objects.filter(owner=user, day__range=(start, end))
+        .annotate(bucket=Trunc('day', bucket, output_field=DateField()))
+        .order_by('bucket', 'source_platform')
+        .values('bucket', 'source_platform')
+        # Aliased: annotations may not reuse the model's field names
+        .annotate(**{f'sum_{name}': Sum(name) for name in COUNTERS})
+    )
+    return [
+        {
+            'date': row['bucket'].isoformat(),
+            'source_platform': row['source_platform'],
+            **{name: row[f'sum_{name}'] for name in COUNTERS},
+        }
+        for row in rows
+    ]
+
+
+def import_totals(user):
+    """
+    Completed imports of ``user``, with the quotes they added and the
+    duplicates they skipped, per platform and overall: one GROUP BY over the
+    user's rollup rows.
+    """
+    rows = (
+        DailyActivity.objects.filter(owner=user, imports_count__gt=0)
+        .order_by('source_platform')
+        .values('source_platform')
+        .annotate(imports=Sum('imports_count'), added=Sum('imported_quotes'), skipped=Sum('duplicates_skipped'))
+    )
+    platforms = [
+        {
+            'platform': row['source_platform'],
+            'imports': row['imports'],
+            'quotes_added': row['added'],
+            'duplicates_skipped': row['skipped'],
+        }
+        for row in rows
+    ]
+    return {
+        'imports': sum(row['imports'] for row in platforms),
+        'quotes_added': sum(row['quotes_added'] for row in platforms),
+        'duplicates_skipped': sum(row['duplicates_skipped'] for row in platforms),
+        'platforms': platforms,
+    }
@@ -0,0 +1,53 @@
+# api/sampling.py
+"""
+Random sampling of quotes that only touches a handful of rows.
+
+Instead of loading a whole library and shuffling it, random ids between the
+smallest and largest id of the pool are probed with ``id >= x ORDER BY id
+LIMIT 1`` on an (owner, id) index. All probes of a round run as one UNION ALL
+query. Ids that follow a gap are slightly more likely to be picked, which is
+fine for a "random quotes" widget.
+"""
+import random
+
+from django.db.models import Max, Min
+
+# Pools up to this size are read whole (bounded) and sampled in Python
+SMALL_POOL = 50
+MAX_ROUNDS = 3
+
+
+def random_ids(queryset, k, rng=random):
+    """Up to ``k`` distinct random ids from ``queryset``, in random order."""
+    if k <= 0:
+        return []
+    queryset = queryset.order_by()
+    head = list(queryset.order_by('id').values_list('id', flat=True)[:SMALL_POOL])
+    if len(head) < SMALL_POOL:
+        return rng.sample(head, min(k, len(head)))
+
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    picked = []
+    for _ in range(MAX_ROUNDS):
+        probes = [
+            queryset.filter(id__gte=rng.randint(bounds['low'], bounds['high']))
+            .order_by('id').values_list('id', flat=True)[:1]
+            for _ in range(k - len(picked))
+        ]
+        for quote_id in probes[0].union(*probes[1:], all=True):
+            if quote_id not in picked:
+                picked.append(quote_id)
+        if len(picked) >= k:
+            break
+    return picked[:k]
+
+
+def random_quotes(queryset, k=5, rng=random):
+    """
+    ``k`` random quotes from ``queryset``, favorites first: random favorites,
+    then random non-favorites to fill the remaining slots.
+    """
+    ids = random_ids(queryset.filter(is_favorite=True), k, rng)
+    ids += random_ids(queryset.filter(is_favorite=False), k - len(ids), rng)
+    quotes = queryset.order_by().in_bulk(ids)
+    return [quotes[quote_id] for quote_id in ids if quote_id in quotes]
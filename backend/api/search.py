@@ -0,0 +1,256 @@
+# api/search.py
+"""
+Full-text search over quotes, and type-ahead suggestions.
+
+Every quote keeps a precomputed ``search_vector`` (GIN indexed) built from its
+body, title, book title, author name and tag titles. The text search
+configuration used for each quote depends on the language of its book, so
+Spanish and English quotes are stemmed with the right dictionary.
+
+Signals refresh the vector of a quote after every write that feeds it. Code
+writing many quotes at once (the importers) runs inside
+``defer_search_vectors()`` so the refreshes are collected and issued as one
+UPDATE when the block ends.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import reduce
+import hashlib
+import operator
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.core.cache import cache
+from django.db.models import Case, CharField, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Left, Lower, Trim
+from django.db.models.lookups import In
+
+from . import filters  # noqa: F401 (registers the trigram_icontains lookup)
+from .models import Author, Book, Quote, QuoteTag, Tag
+
+
+# PostgreSQL text search configurations we index with. The first one is the
+# default for books without a (known) language.
+SEARCH_CONFIGS = getattr(settings, 'SEARCH_CONFIGS', ['spanish', 'english'])
+
+# Free-form values found in Book.language mapped to a search configuration
+LANGUAGE_CONFIGS = {
+    'es': 'spanish',
+    'spa': 'spanish',
+    'spanish': 'spanish',
+    'español': 'spanish',
+    'espanol': 'spanish',
+    'castellano': 'spanish',
+    'en': 'english',
+    'eng': 'english',
+    'english': 'english',
+    'inglés': 'english',
+    'ingles': 'english',
+}
+
+HEADLINE_OPTIONS = {
+    'start_sel': '<mark>',
+    'stop_sel': '</mark>',
+    'max_words': 35,
+    'min_words': 15,
+    'max_fragments': 2,
+    'fragment_delimiter': ' … ',
+}
+
+
+def config_expression(language_field='book__language'):
+    """
+    Search configuration for a book language, as an SQL expression. Unknown or
+    empty languages fall back to the default configuration.
+    """
+    whens = []
+    for config in SEARCH_CONFIGS[1:]:
+        variants = [key for key, value in LANGUAGE_CONFIGS.items() if value == config]
+        whens.append(When(In(Lower(Trim(language_field)), variants), then=Value(config)))
+    return Case(*whens, default=Value(SEARCH_CONFIGS[0]))
+
+
+def search_vector_expression():
+    """
+    Expression computing the search vector of a quote from its own row, so it
+    can be used in a single ``UPDATE`` over any set of quotes.
+    """
+    book = Book.objects.filter(pk=OuterRef('book_id'))
+    config = Coalesce(
+        Subquery(book.annotate(config=config_expression('language')).values('config')[:1]),
+        Value(SEARCH_CONFIGS[0]),
+    )
+    tag_titles = Subquery(
+        QuoteTag.objects.filter(quote=OuterRef('pk'))
+        .values('quote')
+        .annotate(titles=StringAgg('tag__title', ' '))
+        .values('titles')
+    )
+    return (
+        SearchVector('body', config=config, weight='A')
+        + SearchVector('title', config=config, weight='B')
+        + SearchVector(
+            Subquery(book.values('title')[:1]),
+            Subquery(book.values('author__name')[:1]),
+            config=config, weight='C',
+        )
+        + SearchVector(tag_titles, config=config, weight='D')
+    )
+
+
+def update_search_vectors(quotes):
+    """Refresh the search vectors of a queryset of quotes with one UPDATE."""
+    return quotes.update(search_vector=search_vector_expression())
+
+
+# Quote ids waiting for a refresh inside defer_search_vectors(), or None
+_deferred_quotes = ContextVar('deferred_search_vectors', default=None)
+
+
+@contextmanager
+def defer_search_vectors():
+    """
+    Collect the search vector refreshes requested inside the block (see
+    refresh_search_vectors()) and run them as one UPDATE at its end. Nested
+    blocks join the outermost one. Also usable as a decorator.
+
+    Nothing is flushed when the block raises: its writes are being rolled
+    back, and an UPDATE in a broken transaction would hide the original error.
+    """
+    if _deferred_quotes.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _deferred_quotes.set(pending)
+    try:
+        yield
+    finally:
+        _deferred_quotes.reset(token)
+    if pending:
+        update_search_vectors(Quote.objects.filter(pk__in=pending))
+
+
+def refresh_search_vectors(quote_ids):
+    """
+    Refresh the search vectors of the quotes with ``quote_ids``: now, or at
+    the end of the enclosing defer_search_vectors() block.
+    """
+    pending = _deferred_quotes.get()
+    if pending is not None:
+        pending.update(quote_ids)
+    elif quote_ids:
+        update_search_vectors(Quote.objects.filter(pk__in=quote_ids))
+
+
+def parse_query(text):
+    """
+    Turn user input into a query matching any of the search configurations.
+    Uses websearch syntax, so quotes, ``or`` and ``-word`` work as expected.
+    """
+    return reduce(operator.or_, [
+        SearchQuery(text, config=config, search_type='websearch')
+        for config in SEARCH_CONFIGS
+    ])
+
+
+def search_quotes(queryset, text, headline=True):
+    """
+    Filter ``queryset`` to the quotes matching ``text``, annotated with their
+    ``rank`` and (optionally) a highlighted ``headline`` of the body, ordered by
+    rank.
+    """
+    query = parse_query(text)
+    queryset = queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query),
+    )
+    if headline:
+        queryset = queryset.annotate(
+            headline=SearchHeadline('body', query, config=config_expression(), **HEADLINE_OPTIONS),
+        )
+    return queryset.order_by('-rank', 'id')
+
+
+# -------------------------------------------------------------------------
+# Type-ahead suggestions
+# -------------------------------------------------------------------------
+
+AUTOCOMPLETE_CACHE_TIMEOUT = getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 60)
+AUTOCOMPLETE_MAX_LENGTH = 100
+AUTOCOMPLETE_TYPES = ('book', 'author', 'tag', 'quote')
+
+
+def normalize_autocomplete_query(text):
+    """Lowercase, collapse whitespace and cap the length of user input."""
+    return ' '.join((text or '').lower().split())[:AUTOCOMPLETE_MAX_LENGTH]
+
+
+def _named_suggestions(queryset, kind, field, text, limit):
+    """
+    Suggestions whose ``field`` starts with ``text`` (lower() prefix index)
+    or contains a word similar to it (trigram index). Prefix matches first.
+    """
+    prefix = Q(label_lower__startswith=text)
+    return (
+        queryset.annotate(
+            type=Value(kind, output_field=CharField()),
+            label=F(field),
+            label_lower=Lower(field),
+            score=Case(
+                When(prefix, then=Value(1.0)),
+                default=TrigramWordSimilarity(text, field),
+                output_field=FloatField(),
+            ),
+        )
+        .filter(prefix | Q(**{f'{field}__trigram_word_similar': text}))
+        .order_by('-score', 'label')
+        .values('id', 'type', 'label', 'score')[:limit]
+    )
+
+
+def _quote_suggestions(user, text, limit):
+    """The user's quotes whose body contains ``text`` or a word similar to it."""
+    return (
+        Quote.objects.filter(owner=user)
+        .annotate(
+            type=Value('quote', output_field=CharField()),
+            label=Left('body', 80),
+            score=TrigramWordSimilarity(text, 'body'),
+        )
+        .filter(Q(body__trigram_icontains=text) | Q(body__trigram_word_similar=text))
+        .order_by('-score', 'id')
+        .values('id', 'type', 'label', 'score')[:limit]
+    )
+
+
+def autocomplete(user, text, limit=5):
+    """
+    Compact ``{id, type, label}`` suggestions for books, authors, tags and the
+    user's quotes, fetched with a single UNION ALL query. Results are cached
+    per user and normalized query for AUTOCOMPLETE_CACHE_TIMEOUT seconds.
+    """
+    text = normalize_autocomplete_query(text)
+    if not text:
+        return []
+
+    digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+    cache_key = f'autocomplete:{user.pk}:{limit}:{digest}'
+    suggestions = cache.get(cache_key)
+    if suggestions is not None:
+        return suggestions
+
+    rows = _named_suggestions(Book.objects.all(), 'book', 'title', text, limit).union(
+        _named_suggestions(Author.objects.all(), 'author', 'name', text, limit),
+        _named_suggestions(Tag.objects.all(), 'tag', 'title', text, limit),
+        _quote_suggestions(user, text, limit),
+        all=True,
+    )
+    rows = sorted(rows, key=lambda row: (AUTOCOMPLETE_TYPES.index(row['type']), -row['score']))
+    suggestions = [
+        {'id': row['id'], 'type': row['type'], 'label': row['label']}
+        for row in rows
+    ]
+    cache.set(cache_key, suggestions, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return suggestions
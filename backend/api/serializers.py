@@ -2,31 +2,117 @@
 from rest_framework import serializers
 from .models import (
     User, Author, Book, Tag, Quote, QuoteTag,
-    QuoteGroup, QuoteGroupMembership, QuoteGroupShare,
+    QuoteGroup, QuoteGroupMembership, QuoteGroupShare, GroupFeedEntry,
     QuoteList, QuoteListQuote, Document, ImportLog, QuoteNote
 )
+from .fastpath import owned_by
+from .ranking import LIST_PREVIEW_CHARS, list_preview_rows
+from .tagging import resolve_tags, set_quote_tags
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils.text import slugify
+from django.utils.text import Truncator, slugify
 from django.db.models import Q
 
 
+def parse_field_paths(value):
+    """Turn ``'id,book.title,book.author'`` into ``{'id': {}, 'book': {'title': {}, 'author': {}}}``."""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class SparseFieldsMixin:
+    """
+    Field selection for serializer output.
+
+    - ``?fields=id,body,book.title`` keeps only the listed fields; dotted paths
+      select inside nested objects.
+    - ``?expand=notes`` adds back fields left out of the compact form.
+    - With ``compact`` in the context (list views) only ``Meta.compact_fields``
+      are returned, and nested serializers are compact as well.
+    - ``Meta.expand_fields`` are left out of every form unless expanded or
+      selected explicitly.
+
+    Write-only fields are never removed, so the same serializer keeps accepting
+    input.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, expand = self._field_selection()
+        compact = getattr(self.Meta, 'compact_fields', None) if self.context.get('compact') else None
+        expand_only = getattr(self.Meta, 'expand_fields', ())
+
+        self.selected_fields = set()
+        for name in list(fields):
+            if selected:
+                keep = name in selected
+            elif name in expand_only:
+                keep = name in expand
+            else:
+                keep = compact is None or name in compact or name in expand
+            if keep:
+                self.selected_fields.add(name)
+            elif not fields[name].write_only:
+                del fields[name]
+
+        for name, field in fields.items():
+            child = getattr(field, 'child', field)
+            if isinstance(child, SparseFieldsMixin):
+                child.field_selection = (selected.get(name, {}), expand.get(name, {}))
+        return fields
+
+    def _field_selection(self):
+        if hasattr(self, 'field_selection'):
+            return self.field_selection
+        request = self.context.get('request')
+        if request is None or not self._is_root():
+            return {}, {}
+        params = request.query_params
+        return parse_field_paths(params.get('fields')), parse_field_paths(params.get('expand'))
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'first_name', 'last_name', 'avatar', 'date_joined', 'last_login', 'is_staff', 'bio', 'location', 'website', 'twitter', 'github', 'subscription_type']
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class CompactUserSerializer(serializers.ModelSerializer):
+    """Author of a note, as shown next to it."""
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'avatar']
+
+
+class AuthorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     quotes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Author
         fields = ['id', 'name', 'cover', 'bio', 'is_favorite', 'gradient_primary_color', 'gradient_secondary_color', 'quotes_count']
+        compact_fields = ['id', 'name']
         
     def get_quotes_count(self, obj):
-        return Quote.objects.filter(book__author=obj).count()
+        # Annotated by the views (num_quotes) to avoid one COUNT per author
+        if hasattr(obj, 'num_quotes'):
+            return obj.num_quotes
+        return Quote.objects.filter(book__author=obj, **owned_by(self, 'owner')).count()
+
+    # quotes_count for the values() fast path (api/fastpath.py): (model, lookup
+    # to count, lookup of the owner the count is limited to)
+    fast_counts = {'quotes_count': (Quote, 'book__author', 'owner')}
         
     def update(self, instance, validated_data):
         # Update the fields directly
@@ -37,17 +123,22 @@ class AuthorSerializer(serializers.ModelSerializer):
         return instance
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = AuthorSerializer()
     quotes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Book
         fields = ['id', 'title', 'author', 'cover', 'description', 'published', 'is_favorite', 'gradient_primary_color', 'gradient_secondary_color', 'quotes_count']
+        compact_fields = ['id', 'title', 'author', 'cover', 'is_favorite', 'gradient_primary_color', 'gradient_secondary_color']
         read_only_fields = ['id']
         
     def get_quotes_count(self, obj):
-        return obj.quotes.count()
+        if hasattr(obj, 'num_quotes'):
+            return obj.num_quotes
+        return obj.quotes.filter(**owned_by(self, 'owner')).count()
+
+    fast_counts = {'quotes_count': (Quote, 'book', 'owner')}
         
     def update(self, instance, validated_data):
         # If author data is present, it requires special handling
@@ -63,15 +154,20 @@ class BookSerializer(serializers.ModelSerializer):
         return instance
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     quotes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Tag
         fields = '__all__'
+        compact_fields = ['id', 'title', 'is_favorite', 'gradient_primary_color', 'gradient_secondary_color']
 
     def get_quotes_count(self, obj):
-        return obj.quotes.count()
+        if hasattr(obj, 'num_quotes'):
+            return obj.num_quotes
+        return obj.quotes.filter(**owned_by(self, 'owner')).count()
+
+    fast_counts = {'quotes_count': (QuoteTag, 'tag', 'quote__owner')}
 
 class QuoteUpdateSerializer(serializers.ModelSerializer):
     # Se espera un array de strings (ej. ["Amor"])
@@ -88,15 +184,8 @@ class QuoteUpdateSerializer(serializers.ModelSerializer):
         instance.save()
         print(validated_data)
         if tags_data is not None:
-            # Limpiamos la relación actual
-            instance.tags.clear()
-            for tag_title in tags_data:
-                # En este ejemplo usamos el título tal cual; 
-                # si necesitas usar slugify, aplica la transformación
-                tag_slug = tag_title
-                tag_obj, created = Tag.objects.get_or_create(title=tag_slug)
-                # Al agregar con add, Django crea la instancia de QuoteTag en el fondo
-                instance.tags.add(tag_obj)
+            # Solo se añaden/quitan las etiquetas que cambian
+            set_quote_tags(instance, tags_data)
         return instance
 
     def to_representation(self, instance):
@@ -106,7 +195,7 @@ class QuoteUpdateSerializer(serializers.ModelSerializer):
 from django.contrib.auth import get_user_model
 from .models import Quote, Tag, Book
 
-class QuoteSerializer(serializers.ModelSerializer):
+class QuoteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
     # Permitir recibir el ID del libro y del autor en la creación/actualización
     book_id = serializers.IntegerField(write_only=True, required=True)
@@ -115,7 +204,7 @@ class QuoteSerializer(serializers.ModelSerializer):
     tags = serializers.ListField(child=serializers.CharField(), write_only=True, required=False)
     # Campo para la lectura: representación completa de cada Tag
     tags_data = TagSerializer(source='tags', read_only=True, many=True)
-    # Notes for the quote (read-only)
+    # Notes for the quote (read-only, only with ?expand=notes; see api/notes.py)
     notes = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
@@ -128,24 +217,28 @@ class QuoteSerializer(serializers.ModelSerializer):
             'location', 'source_platform', 'is_favorite',
             'chapter', 'book_url', 'notes'
         ]
+        # Quote cards: no notes, no hash, compact book/author/tags
+        compact_fields = [
+            'id', 'body', 'book', 'tags', 'tags_data', 'title',
+            'owner', 'archive', 'created', 'updated',
+            'location', 'source_platform', 'is_favorite',
+            'chapter', 'book_url',
+        ]
+        # Reading views load the notes of all their quotes at once instead
+        expand_fields = ['notes']
     
     def get_notes(self, obj):
         """Get visible notes for the quote"""
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return []
-            
-        try:
-            # Get notes that this user can see
+        # Prefetched by the view (notes.prefetch_visible_notes())
+        notes = getattr(obj, 'visible_notes', None)
+        if notes is None:
             notes = obj.notes.filter(
                 Q(user=request.user) | Q(is_private=False)
-            ).order_by('created')
-            
-            return QuoteNoteSerializer(notes, many=True, context=self.context).data
-        except Exception as e:
-            # If there's any error (like the table not existing yet), return empty list
-            print(f"Error fetching notes: {e}")
-            return []
+            ).select_related('user').order_by('created', 'pk')
+        return QuoteNoteCompactSerializer(notes, many=True, context=self.context).data
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
@@ -158,9 +251,8 @@ class QuoteSerializer(serializers.ModelSerializer):
             User = get_user_model()
             validated_data['owner'] = User.objects.get(id=owner_id)
         quote = Quote.objects.create(**validated_data)
-        for tag_title in tags_data:
-            tag_obj, created = Tag.objects.get_or_create(title=tag_title)
-            quote.tags.add(tag_obj)
+        if tags_data:
+            quote.tags.add(*resolve_tags(tags_data).values())
         return quote
 
     def update(self, instance, validated_data):
@@ -177,18 +269,38 @@ class QuoteSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         if tags_data is not None:
-            instance.tags.clear()
-            for tag_title in tags_data:
-                tag_obj, created = Tag.objects.get_or_create(title=tag_title)
-                instance.tags.add(tag_obj)
+            set_quote_tags(instance, tags_data)
         return instance
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
         # Reemplazar el campo 'tags' por la representación completa de cada Tag
-        rep['tags'] = TagSerializer(instance.tags.all(), many=True).data
+        if 'tags' in self.selected_fields:
+            if 'tags_data' in rep:
+                rep['tags'] = rep['tags_data']
+            else:
+                rep['tags'] = TagSerializer(instance.tags.all(), many=True, context=self.context).data
+        return rep
+
+    # values() fast path (api/fastpath.py): same output as to_representation()
+    def fast_path_supported(self):
+        return 'tags' not in self.selected_fields or 'tags_data' in self.fields
+
+    def fast_representation(self, rep):
+        if 'tags' in self.selected_fields:
+            rep['tags'] = rep['tags_data']
         return rep
 
+class QuoteSearchResultSerializer(QuoteSerializer):
+    """Quote matched by full-text search, with its rank and highlighted snippet."""
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True, allow_null=True)
+
+    class Meta(QuoteSerializer.Meta):
+        fields = QuoteSerializer.Meta.fields + ['rank', 'headline']
+        compact_fields = QuoteSerializer.Meta.compact_fields + ['rank', 'headline']
+
+
 class QuoteTagSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuoteTag
@@ -217,15 +329,72 @@ class QuoteGroupShareSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class GroupFeedEntrySerializer(serializers.ModelSerializer):
+    """A quote shared into one of the user's groups (read from api/feed.py)."""
+    group = serializers.SerializerMethodField()
+    permission = serializers.CharField(source='share.permission')
+    quote = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GroupFeedEntry
+        fields = ['id', 'shared_at', 'group', 'permission', 'quote']
+
+    def get_group(self, obj):
+        return {'id': obj.group_id, 'name': obj.group.name}
+
+    def get_quote(self, obj):
+        quote = obj.share.quote
+        return {
+            'id': quote.pk,
+            'body': quote.body,
+            'book_title': quote.book.title if quote.book else None,
+            'cover': quote.book.cover if quote.book else None,
+            'owner': {'id': quote.owner_id, 'username': quote.owner.username, 'avatar': quote.owner.avatar},
+        }
+
+
 class QuoteListSerializer(serializers.ModelSerializer):
-    quotes = QuoteSerializer(many=True, read_only=True)
+    """
+    List summary: counts and the first few quotes as previews. The quotes
+    themselves come paginated from /api/quote-lists/<id>/quotes/.
+    """
     owner = UserSerializer(read_only=True)
-    
+    quotes_count = serializers.SerializerMethodField()
+    previews = serializers.SerializerMethodField()
+    # Only with ?quote=<id>: whether that quote is in the list
+    has_quote = serializers.SerializerMethodField()
+
     class Meta:
         model = QuoteList
-        fields = ['id', 'title', 'description', 'owner', 'visibility', 'group', 'quotes', 'created', 'updated']
+        fields = [
+            'id', 'title', 'description', 'owner', 'visibility', 'group',
+            'quotes_count', 'previews', 'has_quote', 'created', 'updated',
+        ]
         read_only_fields = ['owner', 'created', 'updated']
 
+    # quotes_count / preview_rows / has_quote are set by views.with_list_summaries()
+    def get_quotes_count(self, obj):
+        if hasattr(obj, 'quotes_count'):
+            return obj.quotes_count
+        return obj.quotelistquote_set.count()
+
+    def get_previews(self, obj):
+        rows = getattr(obj, 'preview_rows', None)
+        if rows is None:
+            rows = list(list_preview_rows(obj.quotelistquote_set.all()))
+        return [
+            {
+                'id': row.quote_id,
+                'body': Truncator(row.quote.body or '').chars(LIST_PREVIEW_CHARS),
+                'book_title': row.quote.book.title if row.quote.book else None,
+                'cover': row.quote.book.cover if row.quote.book else None,
+            }
+            for row in rows
+        ]
+
+    def get_has_quote(self, obj):
+        return getattr(obj, 'has_quote', None)
+
 
 class QuoteListQuoteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -265,3 +434,12 @@ class QuoteNoteSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         validated_data['user'] = user
         return super().create(validated_data)
+
+
+class QuoteNoteCompactSerializer(serializers.ModelSerializer):
+    """Note with its author in compact form, as embedded or grouped by quote."""
+    user = CompactUserSerializer(read_only=True)
+
+    class Meta:
+        model = QuoteNote
+        fields = ['id', 'quote', 'user', 'content', 'created', 'updated', 'is_private']
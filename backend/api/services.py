@@ -5,6 +5,8 @@ import httpx
 from typing import List, Dict, Any, Optional
 import numpy as np
 
+from .instrumentation import timed_external
+
 class OllamaService:
     """Service for interacting with Ollama API for DeepSeek model."""
     
@@ -12,6 +14,7 @@ class OllamaService:
         self.base_url = settings.OLLAMA_API_URL
         self.model = settings.OLLAMA_MODEL
     
+    @timed_external('ollama')
     async def get_embeddings_async(self, text: str) -> List[float]:
         """Get embeddings for a text using DeepSeek model (async version)."""
         url = f"{self.base_url}/api/embeddings"
@@ -26,6 +29,7 @@ class OllamaService:
             data = response.json()
             return data["embedding"]
     
+    @timed_external('ollama')
     def get_embeddings(self, text: str) -> List[float]:
         """Get embeddings for a text using DeepSeek model (synchronous version)."""
         url = f"{self.base_url}/api/embeddings"
@@ -39,6 +43,7 @@ class OllamaService:
         data = response.json()
         return data["embedding"]
     
+    @timed_external('ollama')
     def generate_tags(self, quote_text: str) -> List[str]:
         """Generate tags for a quote using DeepSeek model."""
         url = f"{self.base_url}/api/generate"
@@ -120,6 +125,7 @@ class OllamaService:
         # Return top N results
         return results[:max_results]
 
+    @timed_external('ollama')
     def chat(self, messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> str:
         """Generate a chat response from DeepSeek model."""
         url = f"{self.base_url}/api/chat"
@@ -148,6 +154,7 @@ class OllamaService:
         
         return data["message"]["content"]
     
+    @timed_external('ollama')
     def stream_chat(self, messages: List[Dict[str, str]], system_prompt: Optional[str] = None):
         """Stream a chat response from DeepSeek model."""
         url = f"{self.base_url}/api/chat"
@@ -0,0 +1,448 @@
+# api/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save, m2m_changed
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .activity import bump_activity_version
+from .feed import backfill_feed, drop_feed, fan_out_share
+from .models import (
+    Author, Book, GroupFeedEntry, ImportLog, Quote, QuoteGroup, QuoteGroupMembership, QuoteGroupShare,
+    QuoteList, QuoteListQuote, QuoteNote, QuoteTag, Tag,
+)
+from .rollups import record_activity, record_import
+from .search import refresh_search_vectors, update_search_vectors
+from .stats import invalidate_stats
+from .versions import bump_quote_versions, bump_version, list_viewers, quote_viewers
+
+# Fields that feed the search vector of a quote / of the quotes of a book
+QUOTE_SEARCH_FIELDS = {'body', 'title', 'book', 'book_id'}
+BOOK_SEARCH_FIELDS = {'title', 'author', 'author_id', 'language'}
+
+# Fields that feed the dashboard counters
+QUOTE_STATS_FIELDS = {'owner', 'owner_id', 'book', 'book_id'}
+BOOK_STATS_FIELDS = {'cover', 'author', 'author_id'}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+# -------------------------------------------------------------------------
+# Full-text search vector maintenance
+# -------------------------------------------------------------------------
+
+@receiver(post_save, sender=Quote)
+def quote_saved(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not _touches(update_fields, QUOTE_SEARCH_FIELDS):
+        return
+    refresh_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or not _touches(update_fields, BOOK_SEARCH_FIELDS):
+        return
+    update_search_vectors(Quote.objects.filter(book=instance))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or not _touches(update_fields, {'name'}):
+        return
+    update_search_vectors(Quote.objects.filter(book__author=instance))
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or not _touches(update_fields, {'title'}):
+        return
+    update_search_vectors(Quote.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=QuoteTag)
+@receiver(post_delete, sender=QuoteTag)
+def quote_tag_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_search_vectors([instance.quote_id])
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def quote_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_search_vectors([instance.pk])
+    elif pk_set:
+        # instance is a Tag: refresh the quotes that were (un)linked
+        refresh_search_vectors(pk_set)
+
+
+# -------------------------------------------------------------------------
+# Dashboard statistics cache (api/stats.py)
+# -------------------------------------------------------------------------
+
+def _quote_owners(quotes):
+    return quotes.order_by().values_list('owner_id', flat=True).distinct()
+
+
+@receiver(post_save, sender=Quote)
+def quote_saved_stats(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or not (created or _touches(update_fields, QUOTE_STATS_FIELDS)):
+        return
+    invalidate_stats([instance.owner_id])
+
+
+@receiver(post_delete, sender=Quote)
+def quote_deleted_stats(sender, instance, **kwargs):
+    invalidate_stats([instance.owner_id])
+
+
+@receiver(post_save, sender=QuoteTag)
+@receiver(post_delete, sender=QuoteTag)
+def quote_tag_changed_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_stats(_quote_owners(Quote.objects.filter(pk=instance.quote_id)))
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def quote_tags_changed_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_stats([instance.owner_id])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidate_stats(_quote_owners(Quote.objects.filter(pk__in=pk_set)))
+    elif action == 'pre_clear':
+        invalidate_stats(_quote_owners(instance.quotes.all()))
+
+
+@receiver(post_save, sender=Book)
+def book_saved_stats(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or not _touches(update_fields, BOOK_STATS_FIELDS):
+        return
+    invalidate_stats(_quote_owners(Quote.objects.filter(book=instance)))
+
+
+# Deleting a book or an author detaches quotes/books with a bulk UPDATE (SET_NULL)
+# that sends no signals, so the affected owners are collected beforehand.
+@receiver(pre_delete, sender=Book)
+def book_deleting_stats(sender, instance, **kwargs):
+    instance._stats_owners = list(_quote_owners(Quote.objects.filter(book=instance)))
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting_stats(sender, instance, **kwargs):
+    instance._stats_owners = list(_quote_owners(Quote.objects.filter(book__author=instance)))
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+def book_or_author_deleted_stats(sender, instance, **kwargs):
+    invalidate_stats(getattr(instance, '_stats_owners', []))
+
+
+@receiver(post_save, sender=QuoteList)
+def quote_list_saved_stats(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    invalidate_stats([instance.owner_id])
+
+
+@receiver(post_delete, sender=QuoteList)
+def quote_list_deleted_stats(sender, instance, **kwargs):
+    invalidate_stats([instance.owner_id])
+
+
+@receiver(post_save, sender=QuoteGroupMembership)
+@receiver(post_delete, sender=QuoteGroupMembership)
+def membership_changed_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_stats([instance.user_id])
+
+
+@receiver(m2m_changed, sender=QuoteGroup.members.through)
+def group_members_changed_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_stats([instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidate_stats(pk_set)
+    elif action == 'pre_clear':
+        invalidate_stats(instance.members.values_list('pk', flat=True))
+
+
+# -------------------------------------------------------------------------
+# Activity timeline cache (api/activity.py)
+# -------------------------------------------------------------------------
+
+# Only deletions and late status changes can alter a bucket that is already
+# over; new quotes and imports always land in today's (uncached) bucket.
+
+@receiver(post_delete, sender=Quote)
+@receiver(post_delete, sender=ImportLog)
+def activity_row_deleted(sender, instance, **kwargs):
+    bump_activity_version(instance.owner_id)
+
+
+@receiver(post_save, sender=ImportLog)
+def import_log_saved_activity(sender, instance, created, raw=False, **kwargs):
+    if raw or created or instance.created_at.date() >= timezone.now().date():
+        return
+    bump_activity_version(instance.owner_id)
+
+
+# -------------------------------------------------------------------------
+# Daily activity rollup (api/rollups.py)
+# -------------------------------------------------------------------------
+
+@receiver(post_save, sender=Quote)
+def quote_saved_rollup(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    record_activity(instance.owner_id, instance.created, instance.source_platform, quotes_count=1)
+
+
+@receiver(post_delete, sender=Quote)
+def quote_deleted_rollup(sender, instance, **kwargs):
+    record_activity(instance.owner_id, instance.created, instance.source_platform, quotes_count=-1)
+
+
+@receiver(pre_save, sender=ImportLog)
+def import_log_saving_rollup(sender, instance, raw=False, **kwargs):
+    # Keep the stored row so post_save can apply only the difference
+    instance._rollup_previous = None
+    if not raw and instance.pk:
+        instance._rollup_previous = ImportLog.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=ImportLog)
+def import_log_saved_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_import(instance, previous=getattr(instance, '_rollup_previous', None))
+
+
+@receiver(post_delete, sender=ImportLog)
+def import_log_deleted_rollup(sender, instance, **kwargs):
+    record_import(instance, sign=-1)
+
+
+# -------------------------------------------------------------------------
+# Conditional GET version stamps (api/versions.py)
+# -------------------------------------------------------------------------
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Tag)
+def library_changed_version(sender, raw=False, **kwargs):
+    if not raw:
+        bump_version('library')
+
+
+@receiver(post_save, sender=Quote)
+def quote_saved_version(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        # Nobody else can see a new quote yet
+        bump_version('quotes', [instance.owner_id])
+    else:
+        bump_quote_versions([instance.pk], [instance.owner_id])
+
+
+@receiver(pre_delete, sender=Quote)
+def quote_deleting_version(sender, instance, **kwargs):
+    # Its shares and list rows are gone by post_delete
+    instance._viewers = quote_viewers([instance.pk])
+
+
+@receiver(post_delete, sender=Quote)
+def quote_deleted_version(sender, instance, **kwargs):
+    bump_version('quotes', getattr(instance, '_viewers', set()) | {instance.owner_id})
+
+
+@receiver(post_save, sender=QuoteTag)
+@receiver(post_delete, sender=QuoteTag)
+@receiver(post_save, sender=QuoteNote)
+@receiver(post_delete, sender=QuoteNote)
+@receiver(post_save, sender=QuoteGroupShare)
+@receiver(post_delete, sender=QuoteGroupShare)
+def quote_part_changed_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_quote_versions([instance.quote_id])
+
+
+@receiver(m2m_changed, sender=Quote.tags.through)
+def quote_tags_changed_version(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_quote_versions([instance.pk])
+    # instance is a Tag: the quotes that were (un)linked
+    elif action in ('post_add', 'post_remove') and pk_set:
+        bump_quote_versions(pk_set)
+    elif action == 'pre_clear':
+        instance._viewers = quote_viewers(instance.quotes.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        bump_version('quotes', getattr(instance, '_viewers', set()))
+
+
+def _list_viewers(quote_list):
+    """Users who can see ``quote_list``: its owner and the members of its group."""
+    viewers = {quote_list.owner_id}
+    if quote_list.group_id:
+        viewers.update(
+            QuoteGroupMembership.objects.filter(group_id=quote_list.group_id).values_list('user_id', flat=True)
+        )
+    return viewers
+
+
+@receiver(pre_save, sender=QuoteList)
+def quote_list_saving_version(sender, instance, raw=False, **kwargs):
+    # Members of the previous group lose access when the group changes
+    instance._previous_viewers = set()
+    if not raw and instance.pk:
+        previous = QuoteList.objects.filter(pk=instance.pk).first()
+        if previous is not None:
+            instance._previous_viewers = _list_viewers(previous)
+
+
+@receiver(post_save, sender=QuoteList)
+def quote_list_saved_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_version('lists', _list_viewers(instance) | getattr(instance, '_previous_viewers', set()))
+
+
+@receiver(post_delete, sender=QuoteList)
+def quote_list_deleted_version(sender, instance, **kwargs):
+    bump_version('lists', _list_viewers(instance))
+
+
+@receiver(post_save, sender=QuoteListQuote)
+@receiver(post_delete, sender=QuoteListQuote)
+def quote_list_quote_changed_version(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    quote_list = QuoteList.objects.filter(pk=instance.quote_list_id).first()
+    if quote_list is not None:
+        bump_version('lists', _list_viewers(quote_list))
+
+
+@receiver(m2m_changed, sender=QuoteList.quotes.through)
+def quote_list_quotes_changed_version(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_version('lists', _list_viewers(instance))
+    elif pk_set:
+        viewers = set()
+        for quote_list in QuoteList.objects.filter(pk__in=pk_set):
+            viewers |= _list_viewers(quote_list)
+        bump_version('lists', viewers)
+    else:
+        # instance is a Quote whose lists were cleared (see pre_clear below)
+        bump_version('lists', getattr(instance, '_list_viewers', set()))
+
+
+@receiver(m2m_changed, sender=QuoteList.quotes.through)
+def quote_list_quotes_clearing_version(sender, instance, action, reverse, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._list_viewers = list_viewers(instance.lists.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=QuoteGroupMembership)
+@receiver(post_delete, sender=QuoteGroupMembership)
+def membership_changed_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version('lists', [instance.user_id])
+
+
+@receiver(m2m_changed, sender=QuoteGroup.members.through)
+def group_members_changed_version(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_version('lists', [instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        bump_version('lists', pk_set)
+    elif action == 'pre_clear':
+        bump_version('lists', instance.members.values_list('pk', flat=True))
+
+
+# Deleting a group detaches its lists with a bulk UPDATE (SET_NULL) that sends
+# no signals; members are covered by their memberships' post_delete.
+@receiver(pre_delete, sender=QuoteGroup)
+def group_deleting_version(sender, instance, **kwargs):
+    instance._list_owners = list(QuoteList.objects.filter(group=instance).values_list('owner_id', flat=True))
+
+
+@receiver(post_delete, sender=QuoteGroup)
+def group_deleted_version(sender, instance, **kwargs):
+    bump_version('lists', getattr(instance, '_list_owners', []))
+
+
+@receiver(post_save, sender=ImportLog)
+@receiver(post_delete, sender=ImportLog)
+def import_log_changed_version(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version('imports', [instance.owner_id])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved_version(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not _touches(update_fields, {'subscription_type'}):
+        return
+    bump_version('profile', [instance.pk])
+
+
+# -------------------------------------------------------------------------
+# Group feed fan-out (api/feed.py)
+# -------------------------------------------------------------------------
+
+# Deleting a share, a quote or a group removes the feed entries through their
+# foreign keys.
+
+@receiver(post_save, sender=QuoteGroupShare)
+def group_share_saved_feed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        # The share may have moved to another group
+        GroupFeedEntry.objects.filter(share=instance).exclude(group_id=instance.group_id).delete()
+    fan_out_share(instance)
+
+
+@receiver(post_save, sender=QuoteGroupMembership)
+def membership_saved_feed(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    backfill_feed(instance.group_id, [instance.user_id])
+
+
+@receiver(post_delete, sender=QuoteGroupMembership)
+def membership_deleted_feed(sender, instance, **kwargs):
+    drop_feed(instance.group_id, [instance.user_id])
+
+
+@receiver(m2m_changed, sender=QuoteGroup.members.through)
+def group_members_changed_feed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # instance is a user, pk_set are groups
+        if action == 'post_add' and pk_set:
+            for group_id in pk_set:
+                backfill_feed(group_id, [instance.pk])
+        elif action == 'post_remove' and pk_set:
+            GroupFeedEntry.objects.filter(user=instance, group_id__in=pk_set).delete()
+        elif action == 'pre_clear':
+            GroupFeedEntry.objects.filter(user=instance).delete()
+    elif action == 'post_add' and pk_set:
+        backfill_feed(instance.pk, pk_set)
+    elif action == 'post_remove' and pk_set:
+        drop_feed(instance.pk, pk_set)
+    elif action == 'pre_clear':
+        drop_feed(instance.pk)
@@ -0,0 +1,72 @@
+# api/stats.py
+"""
+Dashboard counters for a user.
+
+All counters are computed by a single query (one scalar subquery per counter
+on the user's row) and cached per user. The cache entry is dropped by the
+receivers in api/signals.py whenever something it counts changes, so the
+timeout is only a safety net.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Quote, QuoteGroupMembership, QuoteList, QuoteTag
+
+STATS_CACHE_TIMEOUT = getattr(settings, 'STATS_CACHE_TIMEOUT', 60 * 60)
+
+
+def stats_cache_key(user_id):
+    return f'dashboard_stats:{user_id}'
+
+
+def _counter(queryset, group_by, aggregate):
+    """Scalar subquery returning ``aggregate`` over ``queryset`` (0 if empty)."""
+    subquery = queryset.order_by().values(group_by).annotate(n=aggregate).values('n')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+
+def compute_stats(user_id):
+    """Compute every dashboard counter for ``user_id`` with one query."""
+    quotes = Quote.objects.filter(owner=OuterRef('pk'))
+    counters = dict(
+        total_quotes=_counter(quotes, 'owner', Count('id')),
+        total_books=_counter(quotes, 'owner', Count('book', distinct=True)),
+        books_without_covers=_counter(
+            quotes, 'owner', Count('book', distinct=True, filter=Q(book__cover__isnull=True))
+        ),
+        total_authors=_counter(quotes, 'owner', Count('book__author', distinct=True)),
+        total_tags=_counter(
+            QuoteTag.objects.filter(quote__owner=OuterRef('pk')), 'quote__owner',
+            Count('tag', distinct=True),
+        ),
+        quote_lists=_counter(QuoteList.objects.filter(owner=OuterRef('pk')), 'owner', Count('id')),
+        # (user, group) is unique: no DISTINCT needed
+        quote_groups=_counter(
+            QuoteGroupMembership.objects.filter(user=OuterRef('pk')), 'user', Count('pk'),
+        ),
+    )
+    # Prefixed aliases: some counter names clash with User relations (quote_lists)
+    row = get_user_model().objects.filter(pk=user_id).values(
+        **{f'stats_{name}': expression for name, expression in counters.items()}
+    ).get()
+    return {name: row[f'stats_{name}'] for name in counters}
+
+
+def get_stats(user):
+    """Dashboard counters for ``user``, served from the cache when possible."""
+    key = stats_cache_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats(user.pk)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_stats(user_ids):
+    """Drop the cached counters of the given users."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        cache.delete_many([stats_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,50 @@
+# api/tagging.py
+"""
+Tag assignment by title.
+
+Titles are resolved with one ``IN`` query (plus one bulk insert for the
+missing tags), and the tags of a quote are replaced by diffing against the
+current set: only the join rows that change are added or removed, so saving
+a quote with its tags unchanged writes nothing.
+"""
+from .models import Tag
+from .versions import bump_version
+
+
+def clean_titles(titles):
+    """Stripped, non-empty titles without duplicates, in order."""
+    return list(dict.fromkeys(title.strip() for title in titles if title and title.strip()))
+
+
+def resolve_tags(titles):
+    """
+    {title: Tag} for ``titles`` with one ``IN`` query, creating the missing
+    tags with one bulk insert.
+    """
+    titles = clean_titles(titles)
+    if not titles:
+        return {}
+    tags = {tag.title: tag for tag in Tag.objects.filter(title__in=titles)}
+    missing = [title for title in titles if title not in tags]
+    if missing:
+        # ignore_conflicts: another request may create the same tag meanwhile
+        Tag.objects.bulk_create([Tag(title=title) for title in missing], ignore_conflicts=True)
+        tags.update({tag.title: tag for tag in Tag.objects.filter(title__in=missing)})
+        # bulk_create sends no post_save
+        bump_version('library')
+    return tags
+
+
+def set_quote_tags(quote, titles):
+    """
+    Make ``titles`` the tags of ``quote``. The current tags are read from the
+    prefetch cache when the quote was loaded with ``prefetch_related('tags')``.
+    """
+    titles = clean_titles(titles)
+    current = {tag.title: tag for tag in quote.tags.all()}
+    removed = [tag for title, tag in current.items() if title not in titles]
+    added = [title for title in titles if title not in current]
+    if removed:
+        quote.tags.remove(*removed)
+    if added:
+        quote.tags.add(*resolve_tags(added).values())
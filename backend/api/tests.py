@@ -1,3 +1,1597 @@
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import gzip
+from importlib import import_module
+from io import BytesIO
+import json
+import re
+import time
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.db.models.signals import post_delete
+from django.http import HttpResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .activity import ActivityError, activity_timeline
+from .benchmark import seed_benchmark_dataset
+from .budgets import API_BUDGET_LATENCY_SCALE, BUDGET_DATASET, BUDGET_EXEMPT, BUDGET_REPEAT, ENDPOINT_BUDGETS
+from .bulk import _raw_delete
+from .fastpath import _plans, fast_data
+from .instrumentation import InstrumentationMiddleware, external_call, timed_external
+from .filters import QUOTE_SORT_FIELDS, QUOTE_TEXT_FILTERS, apply_quote_filters
+from .middleware import negotiate_encoding
+from .models import (
+    Author, Book, DailyActivity, Document, GroupFeedEntry, ImportLog, Quote, QuoteGroup, QuoteGroupMembership, QuoteGroupShare, QuoteList,
+    QuoteListQuote, QuoteNote, QuoteTag, Tag,
+)
+from .renderers import FastJSONParser, FastJSONRenderer
+from .response_cache import cache_metrics
+from .rollups import activity_history, backfill
+from .ranking import append_quotes, ordered_quotes
+from .sampling import random_quotes
+from .search import defer_search_vectors, search_quotes
+from .serializers import (
+    AuthorSerializer, BookSerializer, QuoteSearchResultSerializer, QuoteSerializer, QuoteUpdateSerializer,
+    TagSerializer,
+)
+from .stats import get_stats
+from .versions import cache_is_shared
+from .views import save_quotes_from_file
+from .visibility import (
+    shared_lists, visible_groups, visible_lists, visible_notes, visible_quotes, visible_shares,
+)
+
+
+class QueryPlanTests(TestCase):
+    """
+    The hot queries must be served by the index built for them on the
+    benchmark dataset. Sequential scans are disabled for each EXPLAIN so the
+    small dataset does not tip the planner; the plan must then name the
+    expected index, not just any index on the table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset()
+        cls.user = data['users'][0]
+        cls.book = data['books'][0]
+        Quote.objects.create(owner=cls.user, title='Rara', body='Así habló Zarathustra', book=cls.book)
+        # One of many small libraries, so the owner alone is selective
+        cls.small_user = get_user_model().objects.create_user(username='small', email='small@example.com')
+        Quote.objects.bulk_create([
+            Quote(owner=cls.small_user, title='Breve', body=f'Cita {i}', book=cls.book)
+            for i in range(4)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def scanned_indexes(self, plan):
+        indexes = [plan['Index Name']] if 'Index Name' in plan else []
+        for child in plan.get('Plans', []):
+            indexes.extend(self.scanned_indexes(child))
+        return indexes
+
+    def assertUsesIndex(self, queryset, index):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            output = queryset.explain(format='json')
+        plan = json.loads(output)[0]['Plan']
+        if index not in self.scanned_indexes(plan):
+            self.fail(f"{index} not used:\n{queryset.query}\n{json.dumps(plan, indent=2)}")
+
+    def test_library_listing(self):
+        self.assertUsesIndex(Quote.objects.filter(owner=self.user)[:10], 'quotes_owner_listing_idx')
+
+    def test_favorites(self):
+        queryset = Quote.objects.filter(owner=self.user, is_favorite=True)
+        self.assertUsesIndex(queryset, 'quotes_owner_listing_idx')
+
+    def test_activity_range(self):
+        queryset = Quote.objects.filter(owner=self.user, created__gte=date.today() - timedelta(days=30))
+        self.assertUsesIndex(queryset.values('created').order_by('created'), 'quotes_owner_created_idx')
+
+    def test_import_duplicate_lookup(self):
+        queryset = Quote.objects.filter(owner=self.user, book=self.book, body='Amor.')
+        self.assertUsesIndex(queryset, 'quotes_owner_book_idx')
+
+    def test_import_history(self):
+        queryset = ImportLog.objects.filter(owner=self.user).order_by('-created_at')
+        self.assertUsesIndex(queryset, 'import_logs_owner_created_idx')
+
+    def test_quote_notes(self):
+        quote = Quote.objects.filter(owner=self.user).first()
+        self.assertUsesIndex(QuoteNote.objects.filter(quote=quote), 'quote_notes_quote_created_idx')
+
+    def test_random_probe(self):
+        pool = Quote.objects.filter(owner=self.small_user, id__gte=self.book.pk)
+        self.assertUsesIndex(pool.order_by('id').values('id')[:1], 'quotes_owner_id_idx')
+
+    # On a few hundred quotes per owner the owner index wins, so the text
+    # indexes are checked on their own predicate: it must match the index
+    # expression (configuration, ILIKE rather than UPPER(...) LIKE).
+    def test_full_text_search(self):
+        self.assertUsesIndex(search_quotes(Quote.objects.all(), 'zarathustra'), 'quotes_search_vector_gin')
+
+    def test_trigram_filter(self):
+        queryset = apply_quote_filters(Quote.objects.all(), {'body': 'zarathustra'})
+        self.assertUsesIndex(queryset, 'quotes_body_trgm')
+
+
+class DashboardStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=50, books=10, authors=5, tags=8)
+        cls.user = data['users'][0]
+        cls.book = data['books'][0]
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self):
+        user = self.user
+        return {
+            'total_quotes': Quote.objects.filter(owner=user).count(),
+            'total_books': Book.objects.filter(quotes__owner=user).distinct().count(),
+            'books_without_covers': Book.objects.filter(quotes__owner=user, cover__isnull=True).distinct().count(),
+            'total_authors': Author.objects.filter(books__quotes__owner=user).distinct().count(),
+            'total_tags': Tag.objects.filter(quotes__owner=user).distinct().count(),
+            'quote_lists': QuoteList.objects.filter(owner=user).count(),
+            'quote_groups': QuoteGroup.objects.filter(members=user).distinct().count(),
+        }
+
+    def test_single_query_then_cached(self):
+        with self.assertNumQueries(1):
+            stats = get_stats(self.user)
+        self.assertEqual(stats, self.expected())
+        with self.assertNumQueries(0):
+            get_stats(self.user)
+
+    def test_invalidated_on_changes(self):
+        get_stats(self.user)
+        Quote.objects.create(owner=self.user, title='Nueva', body='Nueva cita', book=self.book)
+        self.assertEqual(get_stats(self.user), self.expected())
+
+        QuoteList.objects.create(title='Otra lista', owner=self.user)
+        self.assertEqual(get_stats(self.user)['quote_lists'], self.expected()['quote_lists'])
+
+        group = QuoteGroup.objects.create(name='Otro club', created_by=self.user)
+        group.members.add(self.user, through_defaults={'role': 'reader'})
+        self.assertEqual(get_stats(self.user)['quote_groups'], self.expected()['quote_groups'])
+
+        self.book.delete()
+        self.assertEqual(get_stats(self.user), self.expected())
+
+
+class ActivityTimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=1, quotes_per_user=300, books=10, authors=5, tags=8)
+        cls.user = data['users'][0]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_year_of_days_in_two_queries(self):
+        end = date.today()
+        start = end - timedelta(days=364)
+        with self.assertNumQueries(2):
+            timeline = activity_timeline(self.user, start, end)
+        self.assertEqual(len(timeline), 365)
+        self.assertEqual(
+            sum(row['quotes_count'] for row in timeline),
+            Quote.objects.filter(owner=self.user, created__gte=start).count(),
+        )
+
+    def test_past_buckets_cached(self):
+        end = date.today()
+        start = end - timedelta(days=120)
+        first = activity_timeline(self.user, start, end, 'week')
+        self.assertEqual(first[0]['date'], (start - timedelta(days=start.weekday())).isoformat())
+        with self.assertNumQueries(2):
+            # Only the current week is counted again
+            self.assertEqual(activity_timeline(self.user, start, end, 'week'), first)
+        Quote.objects.filter(
+            owner=self.user, created__range=(start, end - timedelta(days=30))
+        ).first().delete()
+        total = sum(row['quotes_count'] for row in activity_timeline(self.user, start, end, 'week'))
+        self.assertEqual(total, sum(row['quotes_count'] for row in first) - 1)
+
+    def test_invalid_bucket(self):
+        with self.assertRaises(ActivityError):
+            activity_timeline(self.user, date.today(), date.today(), 'year')
+
+
+class DailyActivityRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=120, books=10, authors=5, tags=8)
+        cls.user = data['users'][0]
+        cls.book = data['books'][0]
+        backfill()
+
+    def snapshot(self):
+        return sorted(DailyActivity.objects.exclude(
+            quotes_count=0, imports_count=0, imported_quotes=0, duplicates_skipped=0,
+        ).values_list(
+            'owner_id', 'day', 'source_platform',
+            'quotes_count', 'imports_count', 'imported_quotes', 'duplicates_skipped',
+        ))
+
+    def test_incremental_updates_match_backfill(self):
+        Quote.objects.create(owner=self.user, title='Nueva', body='Nueva cita', source_platform='Kindle')
+        Quote.objects.filter(pk__in=Quote.objects.filter(owner=self.user).order_by('id')[:5]).delete()
+        log = ImportLog.objects.create(owner=self.user, platform='kindle', file='imports/a.txt', status='pending')
+        log.status = 'completed'
+        log.quotes_added = 7
+        log.save()
+        ImportLog.objects.filter(owner=self.user).exclude(pk=log.pk).first().delete()
+        incremental = self.snapshot()
+
+        backfill([self.user.pk])
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_migration_backfill_matches_backfill(self):
+        expected = self.snapshot()
+        DailyActivity.objects.all().delete()
+        migration = import_module('api.migrations.0033_daily_activity')
+        migration.backfill_daily_activity(django_apps, None)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_history_from_rollup(self):
+        end = date.today()
+        start = end - timedelta(days=729)
+        with self.assertNumQueries(1):
+            history = activity_history(self.user, start, end, 'month')
+        self.assertEqual(
+            sum(row['quotes_count'] for row in history),
+            Quote.objects.filter(owner=self.user, created__gte=start.replace(day=1)).count(),
+        )
+
+
+class RandomFavoritesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=1, quotes_per_user=300, books=10, authors=5, tags=8)
+        cls.user = data['users'][0]
+        # Enough favorites that they are sampled by probing
+        Quote.objects.filter(owner=cls.user).update(is_favorite=Q(body__contains='a'))
+        # A small library: 2 favorites among 6 quotes
+        cls.small_user = get_user_model().objects.create(username='small', email='small@example.com')
+        Quote.objects.bulk_create([
+            Quote(owner=cls.small_user, title=f'Cita {i}', body=f'Cita {i}', is_favorite=i < 2)
+            for i in range(6)
+        ])
+
+    def test_favorites_first(self):
+        quotes = random_quotes(Quote.objects.filter(owner=self.small_user), 5)
+        self.assertEqual(len(quotes), 5)
+        self.assertEqual([q.is_favorite for q in quotes], [True, True, False, False, False])
+
+    def test_large_library_bounded_queries(self):
+        with self.assertNumQueries(4):
+            # favorites: head, bounds, probes; then one in_bulk fetch
+            quotes = random_quotes(Quote.objects.filter(owner=self.user), 5)
+        self.assertEqual(len({q.pk for q in quotes}), 5)
+        self.assertTrue(all(q.is_favorite and q.owner_id == self.user.pk for q in quotes))
+
+
+class SparseFieldsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=1, quotes_per_user=120, books=10, authors=5, tags=8)
+        cls.user = data['users'][0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_compact_list(self):
+        with self.assertNumQueries(3):
+            # count, page, tags prefetch
+            response = self.client.get('/api/quotes/paginated/', {'limit': 100})
+        quote = response.json()['results'][0]
+        self.assertNotIn('notes', quote)
+        self.assertNotIn('hash', quote)
+        self.assertEqual(set(quote['book']), {
+            'id', 'title', 'author', 'cover', 'is_favorite',
+            'gradient_primary_color', 'gradient_secondary_color',
+        })
+        self.assertEqual(set(quote['book']['author']), {'id', 'name'})
+        self.assertEqual(quote['tags'], quote['tags_data'])
+
+    def test_fields_and_expand(self):
+        response = self.client.get('/api/quotes/paginated/', {'fields': 'id,body,book.title'})
+        quote = response.json()['results'][0]
+        self.assertEqual(list(quote), ['id', 'body', 'book'])
+        self.assertEqual(list(quote['book']), ['title'])
+
+        response = self.client.get('/api/quotes/paginated/', {'expand': 'notes,book.author.bio'})
+        quote = response.json()['results'][0]
+        self.assertIn('notes', quote)
+        self.assertEqual(set(quote['book']['author']), {'id', 'name', 'bio'})
+
+    def test_detail_keeps_rich_form(self):
+        quote = Quote.objects.filter(owner=self.user).first()
+        data = self.client.get(f'/api/quotes/{quote.pk}/').json()
+        self.assertNotIn('notes', data)
+        self.assertIn('quotes_count', data['book'])
+        self.assertIn('notes', self.client.get(f'/api/quotes/{quote.pk}/', {'expand': 'notes'}).json())
+
+    def test_counts_annotated(self):
+        with self.assertNumQueries(1):
+            tags = self.client.get('/api/tags/', HTTP_X_PLAIN_LISTS='1').json()
+        self.assertTrue(all('quotes_count' in tag for tag in tags))
+        quote = Quote.objects.filter(owner=self.user).first()
+        with self.assertNumQueries(3):
+            # author, books with counts, authors with counts
+            self.client.get(f'/api/authors/{quote.book.author_id}/books/')
+
+
+class FastPathParityTests(TestCase):
+    """The values() fast path must render exactly the serializer's JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=1, quotes_per_user=60, books=8, authors=4, tags=6)
+        cls.user = data['users'][0]
+        # Edge cases: no book, book without author, empty body
+        orphan = Book.objects.create(title='Sin autor')
+        Quote.objects.create(owner=cls.user, title='Suelta', body=None)
+        Quote.objects.create(owner=cls.user, title='Huérfana', body='', book=orphan, is_favorite=True)
+
+    def request(self, **params):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = self.user
+        return request
+
+    def assertParity(self, serializer_class, queryset, context):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+        data = fast_data(serializer_class(many=True, context=context), queryset)
+        self.assertIsNotNone(data, 'fast path not supported')
+        self.assertEqual(JSONRenderer().render(data), expected)
+
+    def test_quotes(self):
+        quotes = Quote.objects.filter(owner=self.user).select_related('book__author')
+        for params in ({}, {'fields': 'id,body,book.title,tags,tags_data'}, {'expand': 'book.author.bio,hash'},
+                       {'fields': 'book.author,created,updated,owner'}):
+            with self.subTest(**params):
+                self.assertParity(QuoteSerializer, quotes, {'request': self.request(**params), 'compact': True})
+
+    def test_search_results(self):
+        quotes = search_quotes(Quote.objects.filter(owner=self.user), 'amor')[:20]
+        self.assertParity(QuoteSearchResultSerializer, quotes, {'compact': True})
+
+    def test_books_authors_tags(self):
+        self.assertParity(BookSerializer, Book.objects.all(), {})
+        self.assertParity(AuthorSerializer, Author.objects.all(), {})
+        self.assertParity(TagSerializer, Tag.objects.all(), {})
+        self.assertParity(BookSerializer, Book.objects.all(), {'request': self.request(fields='id,author.name')})
+
+    def test_unsupported_falls_back(self):
+        # Expanded notes come from a method field
+        context = {'request': self.request(expand='notes')}
+        self.assertIsNone(fast_data(QuoteSerializer(many=True, context=context), Quote.objects.all()))
+        response = APIClient()
+        response.force_authenticate(self.user)
+        self.assertEqual(response.get('/api/quotes/', {'expand': 'notes'}).status_code, 200)
+
+    def test_endpoints_use_fast_path(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(3):
+            # count, page, tags
+            client.get('/api/quotes/paginated/', {'limit': 100})
+        with self.assertNumQueries(1):
+            client.get('/api/books/', HTTP_X_PLAIN_LISTS='1')
+        with self.assertNumQueries(2):
+            # count, page
+            client.get('/api/books/', {'page_size': 5})
+
+
+class RendererCompressionTests(TestCase):
+    """orjson rendering must match JSONRenderer; large responses are compressed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_benchmark_dataset(users=1, quotes_per_user=60, books=8, authors=4, tags=6)['users'][0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_renderer_matches_drf(self):
+        quotes = QuoteSerializer(Quote.objects.filter(owner=self.user), many=True, context={}).data
+        data = {
+            'quotes': quotes,
+            'when': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2024, 5, 1),
+            'amount': Decimal('1.50'),
+            'text': 'canción «ñ»',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_parser(self):
+        body = json.dumps({'tags': ['amor'], 'body': 'canción'}).encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'tags': ['amor'], 'body': 'canción'})
+        response = self.client.post('/api/tags/', data=b'{"title": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertIsNone(negotiate_encoding('gzip;q=0, identity'))
+        self.assertIsNone(negotiate_encoding(''))
+        self.assertEqual(negotiate_encoding('*'), negotiate_encoding('br, gzip'))
+
+    def test_compression_threshold(self):
+        response = self.client.get('/api/quotes/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.client.get('/api/quotes/').json())
+
+        # Small responses are sent as is
+        response = self.client.get('/api/users/stats/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged library resources are answered with 304 from the version stamps alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=20, books=4, authors=2, tags=4)
+        cls.user, cls.other = data['users']
+        cls.group = data['group']
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNotModified(self, url, **headers):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag(self):
+        for url in ('/api/tags/', '/api/books/', '/api/authors/', '/api/quotes/', '/api/quote-lists/',
+                    f'/api/quotes/{Quote.objects.filter(owner=self.user).first().pk}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertNotModified(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                # Last-Modified once the second of the stamps is over
+                with mock.patch('api.versions.time.time', return_value=time.time() + 1):
+                    last_modified = self.client.get(url)['Last-Modified']
+                    self.assertNotModified(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    def test_writes_change_etag(self):
+        etag = self.client.get('/api/books/')['ETag']
+        self.assertNotEqual(self.client.get('/api/books/', {'fields': 'id'})['ETag'], etag)
+        Tag.objects.create(title='nueva')
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        quote = Quote.objects.filter(owner=self.user).first()
+        etag = self.client.get(f'/api/quotes/{quote.pk}/')['ETag']
+        quote.tags.add(Tag.objects.get(title='nueva'))
+        self.assertEqual(self.client.get(f'/api/quotes/{quote.pk}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_stamps_are_per_user(self):
+        etag = self.client.get('/api/quote-lists/')['ETag']
+        # A private list of another user is not visible
+        QuoteList.objects.create(title='Privada', owner=self.other)
+        self.assertNotModified('/api/quote-lists/', HTTP_IF_NONE_MATCH=etag)
+        # A list shared with one of the user's groups is
+        QuoteList.objects.create(title='Compartida', owner=self.other, visibility='group', group=self.group)
+        self.assertEqual(self.client.get('/api/quote-lists/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_no_last_modified_within_the_second_of_a_write(self):
+        url = '/api/tags/'
+        self.client.get(url)
+        with mock.patch('api.versions.time.time', return_value=time.time() + 1):
+            last_modified = self.client.get(url)['Last-Modified']
+        Tag.objects.create(title='nueva')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_quote_stamps_are_per_user(self):
+        urls = ('/api/quotes/', '/api/tags/', '/api/books/')
+        # Another user's quotes, tags and notes are not visible
+        quote = Quote.objects.create(owner=self.other, title='Ajena', body='Ajena', book=Book.objects.first())
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        quote.tags.add(Tag.objects.first())
+        QuoteNote.objects.create(quote=quote, user=self.other, content='Nota')
+        quote.save()
+        for url in urls:
+            self.assertNotModified(url, HTTP_IF_NONE_MATCH=etags[url])
+        # Until the quote is shared with one of the user's groups
+        share = QuoteGroupShare.objects.create(quote=quote, group=self.group, permission='read')
+        etag = self.client.get(f'/api/quotes/{quote.pk}/')['ETag']
+        QuoteNote.objects.create(quote=quote, user=self.other, content='Otra')
+        self.assertEqual(self.client.get(f'/api/quotes/{quote.pk}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # The user's own writes change the counts of the shared rows
+        Quote.objects.create(owner=self.user, title='Nueva', body='Nueva', book=Book.objects.first())
+        self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etags['/api/books/']).status_code, 200)
+        share.delete()
+
+    def test_counts_are_of_the_users_own_quotes(self):
+        book = Book.objects.first()
+        own = Quote.objects.filter(owner=self.user, book=book).count()
+        self.assertNotEqual(Quote.objects.filter(book=book).count(), own)
+        self.assertEqual(self.client.get(f'/api/books/{book.pk}/').json()['quotes_count'], own)
+        listed = {row['id']: row['quotes_count'] for row in self.client.get('/api/books/', {'page_size': 100}).json()['results']}
+        self.assertEqual(listed[book.pk], own)
+
+    def test_off_without_a_shared_cache(self):
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://x'}}
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with self.settings(CACHES=redis):
+            self.assertTrue(cache_is_shared())
+        with self.settings(CACHES=locmem):
+            self.assertFalse(cache_is_shared())
+        with mock.patch('api.versions.CONDITIONAL_GET_ENABLED', False):
+            response = self.client.get('/api/tags/')
+            self.assertNotIn('ETag', response)
+            self.assertEqual(self.client.get('/api/tags/', HTTP_IF_NONE_MATCH='"x"').status_code, 200)
+
+    def test_counts_differ_per_user_on_the_same_endpoint(self):
+        # The compiled fast-path plans are shared by every user; the counts must not be
+        book = Book.objects.first()
+        tag = Tag.objects.first()
+        Quote.objects.bulk_create([Quote(owner=self.other, book=book, title='Extra', body='Extra') for _ in range(3)])
+        QuoteTag.objects.bulk_create([
+            QuoteTag(quote=quote, tag=tag) for quote in Quote.objects.filter(owner=self.other, title='Extra')
+        ])
+        _plans.clear()
+        for user in (self.user, self.other):
+            with self.subTest(user=user.username):
+                self.client.force_authenticate(user)
+                quotes = Quote.objects.filter(owner=user)
+                expected = {
+                    '/api/books/': (book.pk, quotes.filter(book=book).count()),
+                    '/api/authors/': (book.author_id, quotes.filter(book__author=book.author_id).count()),
+                    '/api/tags/': (tag.pk, QuoteTag.objects.filter(quote__owner=user, tag=tag).count()),
+                }
+                for url, (pk, count) in expected.items():
+                    rows = self.client.get(url, {'page_size': 100}).json()['results']
+                    self.assertEqual({row['id']: row['quotes_count'] for row in rows}[pk], count, url)
+                found = self.client.get('/api/search/', {'query': book.title}).json()['books']
+                self.assertEqual({row['id']: row['quotes_count'] for row in found}[book.pk],
+                                 expected['/api/books/'][1])
+
+    def test_quote_updated_has_time(self):
+        quote = Quote.objects.filter(owner=self.user).first()
+        quote.save()
+        self.assertIn('T', self.client.get(f'/api/quotes/{quote.pk}/').json()['updated'])
+
+
+class ResponseCacheTests(TestCase):
+    """Read-heavy endpoints are cached per user until a relevant write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=20, books=4, authors=2, tags=4, imports_per_user=3)
+        cls.user, cls.other = data['users']
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertCached(self, url, params=None):
+        with self.assertNumQueries(0):
+            return self.client.get(url, params)
+
+    def test_statistics(self):
+        before = self.client.get('/api/statistics/').json()
+        self.assertEqual(self.assertCached('/api/statistics/').json(), before)
+        Quote.objects.create(owner=self.user, title='Nueva', body='Nueva')
+        self.assertEqual(self.client.get('/api/statistics/').json()['total_quotes'], before['total_quotes'] + 1)
+
+    def test_off_without_a_shared_cache(self):
+        with mock.patch('api.response_cache.RESPONSE_CACHE_ENABLED', False):
+            self.client.get('/api/import-history/')
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get('/api/import-history/')
+        self.assertTrue(queries)
+
+    def test_import_history(self):
+        self.assertEqual(self.client.get('/api/import-history/').json()['count'], 3)
+        self.assertCached('/api/import-history/')
+        ImportLog.objects.create(owner=self.user, platform='kindle', file='imports/x.txt', status='completed')
+        self.assertEqual(self.client.get('/api/import-history/').json()['count'], 4)
+        # Another user's imports don't invalidate the entry
+        ImportLog.objects.create(owner=self.other, platform='kindle', file='imports/y.txt', status='completed')
+        self.assertCached('/api/import-history/')
+
+    def test_listings_keyed_on_user_and_params(self):
+        self.client.get('/api/tags/', {'fields': 'id,title', 'title': 'x'})
+        self.assertCached('/api/tags/?title=x&fields=id,title')
+        self.client.force_authenticate(self.other)
+        with self.assertNumQueries(1):
+            self.client.get('/api/tags/', {'fields': 'id,title', 'title': 'x'})
+
+    def test_subscription_plan_and_shared_lists(self):
+        url = f'/api/subscription-plan/{self.user.pk}/'
+        self.assertEqual(self.client.get(url).json()['current_plan'], 'free')
+        self.assertCached(url)
+        self.user.subscription_type = 'reader'
+        self.user.save(update_fields=['subscription_type'])
+        self.assertEqual(self.client.get(url).json()['current_plan'], 'reader')
+
+        shared = len(self.client.get('/api/quote-lists/shared/').json())
+        self.assertCached('/api/quote-lists/shared/')
+        QuoteList.objects.create(
+            title='Nueva', owner=self.other, visibility='group', group=QuoteGroup.objects.get(members=self.user),
+        )
+        self.assertEqual(len(self.client.get('/api/quote-lists/shared/').json()), shared + 1)
+
+    def test_hit_ratio(self):
+        for _ in range(4):
+            self.client.get('/api/import-history/')
+        self.assertEqual(cache_metrics()['import_history'], {'hits': 3, 'misses': 1, 'hit_ratio': 0.75})
+
+
+class PaginationScopingTests(TestCase):
+    """Every list is paginated and bounded, and only shows the user's own rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=120, books=4, authors=2, tags=4, imports_per_user=3)
+        cls.user, cls.other = data['users']
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_envelope(self):
+        data = self.client.get('/api/quotes/').json()
+        self.assertEqual(data['count'], 120)
+        self.assertEqual(len(data['results']), 50)
+        self.assertIn('page=2', data['next'])
+        self.assertEqual(len(self.client.get('/api/quotes/', {'page_size': 10000}).json()['results']), 120)
+        with mock.patch('api.pagination.DefaultPagination.max_page_size', 100):
+            self.assertEqual(len(self.client.get('/api/quotes/', {'page_size': 10000}).json()['results']), 100)
+        self.assertEqual(self.client.get('/api/quotes/', {'page': 99}).status_code, 404)
+
+    def test_plain_lists(self):
+        data = self.client.get('/api/quotes/', HTTP_X_PLAIN_LISTS='1').json()
+        self.assertEqual(len(data), 120)
+        # An explicit page still gets the envelope
+        self.assertIn('results', self.client.get('/api/quotes/', {'page': 1}, HTTP_X_PLAIN_LISTS='1').json())
+
+        expected = [quote['id'] for quote in self.client.get('/api/quotes/', {'page_size': 60}).json()['results']]
+        with mock.patch('api.pagination.PLAIN_LIST_LIMIT', 40), \
+                mock.patch('api.pagination.DefaultPagination.max_page_size', 20):
+            response = self.client.get('/api/quotes/', HTTP_X_PLAIN_LISTS='1')
+            self.assertEqual(len(response.json()), 40)
+            self.assertEqual(response['X-Total-Count'], '120')
+            self.assertIn('page=3', response['Link'])
+            self.assertIn('page_size=20', response['Link'])
+            # The next page starts right after the cut
+            url = response['Link'].split(';')[0].strip('<>')
+            rest = self.client.get(url, HTTP_X_PLAIN_LISTS='1').json()
+            self.assertEqual(len(rest['results']), 20)
+            seen = [quote['id'] for quote in response.json()] + [quote['id'] for quote in rest['results']]
+            self.assertEqual(seen, expected)
+
+    def test_owner_scoping(self):
+        ids = {quote['id'] for quote in self.client.get('/api/quotes/', HTTP_X_PLAIN_LISTS='1').json()}
+        self.assertEqual(ids, set(Quote.objects.filter(owner=self.user).values_list('id', flat=True)))
+        self.assertEqual(
+            [user['id'] for user in self.client.get('/api/users/').json()['results']], [self.user.pk],
+        )
+        self.assertEqual(self.client.get('/api/import-logs/').json()['count'], 3)
+        self.assertTrue(all(
+            row['quote'] in ids for row in self.client.get('/api/quote-tags/', HTTP_X_PLAIN_LISTS='1').json()
+        ))
+
+    def test_shared_quote_detail(self):
+        other_quotes = Quote.objects.filter(owner=self.other)
+        private, shared = other_quotes[0], other_quotes[1]
+        self.assertEqual(self.client.get(f'/api/quotes/{private.pk}/').status_code, 404)
+        quote_list = QuoteList.objects.create(
+            title='Club', owner=self.other, visibility='group', group=QuoteGroup.objects.get(members=self.user),
+        )
+        quote_list.quotes.add(shared)
+        self.assertEqual(self.client.get(f'/api/quotes/{shared.pk}/').status_code, 200)
+        self.assertEqual(self.client.patch(f'/api/quotes/{shared.pk}/', {'body': 'x'}).status_code, 404)
+
+
+class BulkMutationTests(TestCase):
+    """Bulk quote actions run a fixed number of queries and invalidate once per batch."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=60, books=4, authors=2, tags=4, imports_per_user=1)
+        cls.user, cls.other = data['users']
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ids = list(Quote.objects.filter(owner=self.user).order_by('id').values_list('id', flat=True))
+
+    def bulk(self, **body):
+        return self.client.post('/api/quotes/bulk/', body, format='json')
+
+    def test_favorite(self):
+        Quote.objects.filter(id__in=self.ids).update(is_favorite=False)
+        Quote.objects.filter(id=self.ids[0]).update(is_favorite=True)
+        foreign = Quote.objects.filter(owner=self.other).first()
+        with self.assertNumQueries(6):
+            data = self.bulk(action='favorite', ids=self.ids[:3] + [foreign.pk]).json()
+        self.assertEqual(data['updated'], 2)
+        self.assertEqual(
+            [row['status'] for row in data['results']], ['unchanged', 'updated', 'updated', 'not_found'],
+        )
+        self.assertEqual(Quote.objects.filter(id__in=self.ids[:3], is_favorite=True).count(), 3)
+        self.assertEqual(Quote.objects.get(id=foreign.pk).is_favorite, foreign.is_favorite)
+
+    def test_tag_and_untag(self):
+        with self.assertNumQueries(10):
+            data = self.bulk(action='tag', ids=self.ids, tags=['bulk-new']).json()
+        self.assertEqual(data['updated'], len(self.ids))
+        self.assertEqual(Quote.objects.filter(tags__title='bulk-new').count(), len(self.ids))
+        self.assertEqual(search_quotes(Quote.objects.filter(owner=self.user), 'bulk-new').count(), len(self.ids))
+        # Second run: nothing changes
+        self.assertEqual(self.bulk(action='tag', ids=self.ids, tags=['bulk-new']).json()['updated'], 0)
+
+        data = self.bulk(action='untag', filter={'body': Quote.objects.get(id=self.ids[0]).body}, tags=['bulk-new']).json()
+        self.assertEqual(data['results'][0], {'id': self.ids[0], 'status': 'updated'})
+        self.assertEqual(Quote.objects.filter(tags__title='bulk-new').count(), len(self.ids) - data['updated'])
+
+    def test_move_to_list(self):
+        source = QuoteList.objects.create(title='A', owner=self.user)
+        target = QuoteList.objects.create(title='B', owner=self.user)
+        source.quotes.add(*self.ids[:5])
+        data = self.bulk(action='move_to_list', ids=self.ids[:5], list_id=target.pk, from_list_id=source.pk).json()
+        self.assertEqual(data['updated'], 5)
+        self.assertEqual(source.quotes.count(), 0)
+        self.assertEqual(target.quotes.count(), 5)
+        foreign = QuoteList.objects.create(title='C', owner=self.other)
+        self.assertEqual(self.bulk(action='move_to_list', ids=self.ids, list_id=foreign.pk).status_code, 400)
+
+    def test_delete(self):
+        quote_list = QuoteList.objects.create(title='A', owner=self.user)
+        quote_list.quotes.add(*self.ids[:3])
+        QuoteNote.objects.create(quote_id=self.ids[0], user=self.user, content='nota')
+        backfill([self.user.pk])
+        before = get_stats(self.user)['total_quotes']
+        rollup = DailyActivity.objects.filter(owner=self.user).aggregate(n=Sum('quotes_count'))['n']
+
+        data = self.bulk(action='delete', ids=self.ids[:10]).json()
+        self.assertEqual(data['updated'], 10)
+        self.assertFalse(Quote.objects.filter(id__in=self.ids[:10]).exists())
+        self.assertEqual(quote_list.quotes.count(), 0)
+        self.assertEqual(get_stats(self.user)['total_quotes'], before - 10)
+        self.assertEqual(
+            DailyActivity.objects.filter(owner=self.user).aggregate(n=Sum('quotes_count'))['n'], rollup - 10,
+        )
+
+    def test_errors(self):
+        self.assertEqual(self.bulk(action='explode', ids=self.ids).status_code, 400)
+        self.assertEqual(self.bulk(action='favorite').status_code, 400)
+        self.assertEqual(self.bulk(action='favorite', ids=self.ids, filter={'body': 'x'}).status_code, 400)
+        self.assertEqual(self.bulk(action='tag', ids=self.ids).status_code, 400)
+        self.assertEqual(self.bulk(action='favorite', filter={'nope': 'x'}).status_code, 400)
+        self.assertEqual(self.bulk(action='favorite', filter={'body': ['x']}).status_code, 400)
+        # Rejected by the database driver when the query runs
+        self.assertEqual(self.bulk(action='favorite', filter={'body': 'a\x00b'}).status_code, 400)
+        target = QuoteList.objects.create(title='B', owner=self.user)
+        self.assertEqual(
+            self.bulk(action='move_to_list', ids=self.ids, list_id=target.pk, from_list_id='x').status_code, 400,
+        )
+        with mock.patch('api.bulk.BULK_MAX_QUOTES', 10):
+            self.assertEqual(self.bulk(action='delete', ids=self.ids).status_code, 400)
+        self.assertEqual(Quote.objects.filter(id__in=self.ids).count(), len(self.ids))
+
+    def test_raw_delete(self):
+        # api.bulk._raw_delete relies on private Django API: one DELETE, no row fetch, no signals
+        rows = QuoteTag.objects.filter(quote_id__in=self.ids[:5])
+        expected = rows.count()
+        self.assertGreater(expected, 0)
+        handler = mock.Mock()
+        post_delete.connect(handler, sender=QuoteTag)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                deleted = _raw_delete(rows)
+        finally:
+            post_delete.disconnect(handler, sender=QuoteTag)
+        self.assertEqual(deleted, expected)
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['DELETE'])
+        handler.assert_not_called()
+        self.assertFalse(QuoteTag.objects.filter(quote_id__in=self.ids[:5]).exists())
+
+
+class TagDiffTests(TestCase):
+    """Saving a quote only writes the tag join rows that change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_benchmark_dataset(users=1, quotes_per_user=5, books=2, authors=1, tags=4)['users'][0]
+
+    def setUp(self):
+        quote = Quote.objects.filter(owner=self.user).first()
+        quote.tags.set(Tag.objects.all()[:3])
+        self.titles = sorted(quote.tags.values_list('title', flat=True))
+        # As loaded by QuoteViewSet.get_object()
+        self.quote = Quote.objects.prefetch_related('tags').get(pk=quote.pk)
+
+    def tag_queries(self, serializer_class, data):
+        serializer = serializer_class(self.quote, data=data, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+        # The search vector refresh reads quote_tags too; it isn't tag assignment
+        return [
+            query['sql'] for query in queries
+            if ('"tags"' in query['sql'] or '"quote_tags"' in query['sql'])
+            and not query['sql'].startswith('UPDATE "quotes"')
+        ]
+
+    def test_unchanged_tags(self):
+        for serializer_class in (QuoteUpdateSerializer, QuoteSerializer):
+            self.assertEqual(self.tag_queries(serializer_class, {'body': 'otro texto', 'tags': self.titles}), [])
+
+    def test_changed_tags(self):
+        queries = self.tag_queries(QuoteSerializer, {'tags': self.titles[1:] + ['nueva-etiqueta']})
+        self.assertEqual(
+            sorted(self.quote.tags.values_list('title', flat=True)), sorted(self.titles[1:] + ['nueva-etiqueta']),
+        )
+        self.assertEqual(sum(query.startswith('DELETE FROM "quote_tags"') for query in queries), 1)
+        self.assertEqual(sum(query.startswith('INSERT INTO "tags"') for query in queries), 1)
+        self.assertEqual(sum(query.startswith('INSERT INTO "quote_tags"') for query in queries), 1)
+        self.assertTrue(search_quotes(Quote.objects.all(), 'nueva-etiqueta').filter(pk=self.quote.pk).exists())
+
+
+class ListOrderTests(TestCase):
+    """Quotes of a list keep a manual order; moving one writes a single row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_benchmark_dataset(users=1, quotes_per_user=30, books=2, authors=1, tags=4)['users'][0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quote_list = QuoteList.objects.create(title='Orden', owner=self.user)
+        self.ids = list(Quote.objects.filter(owner=self.user).order_by('id').values_list('id', flat=True)[:6])
+        for quote_id in self.ids:
+            self.client.post(f'/api/quote-lists/{self.quote_list.pk}/add_quote/', {'quote_id': quote_id})
+
+    def order(self):
+        return list(ordered_quotes(self.quote_list).values_list('id', flat=True))
+
+    def move(self, **body):
+        return self.client.post(f'/api/quote-lists/{self.quote_list.pk}/move_quote/', body, format='json')
+
+    def test_add_appends(self):
+        self.assertEqual(self.order(), self.ids)
+        items = self.client.get(f'/api/quote-lists/{self.quote_list.pk}/quotes/', HTTP_X_PLAIN_LISTS='1').json()
+        self.assertEqual([quote['id'] for quote in items], self.ids)
+
+    def test_move(self):
+        a, b, c, d, e, f = self.ids
+        self.move(quote_id=e, after_id=a)
+        self.assertEqual(self.order(), [a, e, b, c, d, f])
+        self.move(quote_id=a, before_id=f)
+        self.assertEqual(self.order(), [e, b, c, d, a, f])
+        self.move(quote_id=e)
+        self.assertEqual(self.order(), [b, c, d, a, f, e])
+        self.move(quote_id=f, before_id=b)
+        self.assertEqual(self.order(), [f, b, c, d, a, e])
+        self.assertEqual(self.move(quote_id=a, after_id=999999).status_code, 404)
+
+    def test_move_writes_one_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.move(quote_id=self.ids[4], after_id=self.ids[0])
+        writes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "quote_list_quotes"')]
+        self.assertEqual(len(writes), 1)
+
+    def test_rebalance(self):
+        a, b = self.ids[:2]
+        # Keep inserting right after a until the gap is used up
+        for quote_id in self.ids[2:] * 3:
+            self.move(quote_id=quote_id, after_id=a)
+            self.assertEqual(self.order()[:2], [a, quote_id])
+        positions = list(QuoteListQuote.objects.filter(quote_list=self.quote_list).values_list('position', flat=True))
+        self.assertEqual(len(set(positions)), len(self.ids))
+
+    def test_update_order(self):
+        reversed_ids = self.ids[::-1]
+        response = self.client.post(
+            f'/api/quote-lists/{self.quote_list.pk}/update_order/', {'quote_ids': reversed_ids[:3]}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        # Unmentioned quotes keep their order after the given ones
+        self.assertEqual(self.order(), reversed_ids[:3] + self.ids[:3])
+        self.assertEqual(QuoteListQuote.objects.filter(quote_list=self.quote_list).count(), len(self.ids))
+
+
+class ListSummaryTests(TestCase):
+    """List summaries don't depend on list sizes; contents come paginated."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=80, books=4, authors=2, tags=4)
+        cls.user, cls.other = data['users']
+        cls.quote_ids = list(Quote.objects.filter(owner=cls.user).order_by('id').values_list('id', flat=True))
+        for size in (0, 5, 70):
+            quote_list = QuoteList.objects.create(title=f'Lista {size}', owner=cls.user)
+            append_quotes(quote_list.pk, cls.quote_ids[:size])
+        cls.big = quote_list
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_summaries(self):
+        # lists (with counts) + previews, whatever the number of quotes
+        with self.assertNumQueries(2):
+            lists = self.client.get('/api/quote-lists/', HTTP_X_PLAIN_LISTS='1').json()
+        by_title = {quote_list['title']: quote_list for quote_list in lists}
+        self.assertEqual(by_title['Lista 70']['quotes_count'], 70)
+        self.assertEqual(by_title['Lista 0']['previews'], [])
+        self.assertEqual([quote['id'] for quote in by_title['Lista 70']['previews']], self.quote_ids[:3])
+        self.assertNotIn('quotes', by_title['Lista 5'])
+
+        lists = self.client.get('/api/quote-lists/', {'quote': self.quote_ids[10]}, HTTP_X_PLAIN_LISTS='1').json()
+        has_quote = {quote_list['title']: quote_list['has_quote'] for quote_list in lists}
+        self.assertEqual([has_quote['Lista 0'], has_quote['Lista 5'], has_quote['Lista 70']], [False, False, True])
+
+    def test_list_quotes(self):
+        url = f'/api/quote-lists/{self.big.pk}/quotes/'
+        data = self.client.get(url, {'page_size': 20, 'page': 2}).json()
+        self.assertEqual(data['count'], 70)
+        self.assertEqual([quote['id'] for quote in data['results']], self.quote_ids[20:40])
+        # count, page (book/author joined), tags prefetch, plus the list lookup
+        with self.assertNumQueries(4):
+            self.client.get(url, {'page_size': 20, 'fields': 'id,body,tags'})
+        response = self.client.get(url, HTTP_X_PLAIN_LISTS='1')
+        self.assertEqual(
+            self.client.get(url, HTTP_X_PLAIN_LISTS='1', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+
+        private = QuoteList.objects.create(title='Privada', owner=self.other)
+        self.assertEqual(self.client.get(f'/api/quote-lists/{private.pk}/quotes/').status_code, 404)
+
+
+class VisibilityTests(TestCase):
+    """Group-based access is filtered with EXISTS, without DISTINCT or duplicate rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=3, quotes_per_user=30, books=2, authors=1, tags=4)
+        cls.member, cls.owner, cls.outsider = data['users']
+        # The seed puts every user in one club; keep the outsider out of it
+        QuoteGroupMembership.objects.filter(user=cls.outsider).delete()
+        cls.group = QuoteGroup.objects.get(members=cls.member)
+        cls.quotes = list(Quote.objects.filter(owner=cls.owner).order_by('id'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_no_distinct(self):
+        for queryset in (visible_lists(self.member), shared_lists(self.member), visible_groups(self.member),
+                         visible_shares(self.member), visible_notes(self.member), visible_quotes(self.member)):
+            self.assertNotIn('DISTINCT', str(queryset.query))
+
+    def test_lists_and_groups(self):
+        shared = set(QuoteList.objects.filter(visibility='group', group=self.group).values_list('pk', flat=True))
+        self.assertEqual(set(shared_lists(self.member).values_list('pk', flat=True)), shared)
+        self.assertFalse(shared_lists(self.outsider).exists())
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get('/api/quote-lists/').json()['count'], len(shared))
+        self.assertEqual(self.client.get('/api/quote-groups/').json()['count'], 1)
+        created = QuoteGroup.objects.create(name='Propio', created_by=self.outsider)
+        self.assertEqual(list(visible_groups(self.outsider)), [created])
+
+    def test_shared_quotes(self):
+        expected = set(QuoteListQuote.objects.filter(
+            quote_list__visibility='group', quote_list__group=self.group,
+        ).values_list('quote_id', flat=True))
+        self.assertTrue(expected)
+        self.client.force_authenticate(self.member)
+        with self.assertNumQueries(2):
+            quotes = self.client.get('/api/quote-lists/shared_quotes/', HTTP_X_PLAIN_LISTS='1').json()
+        ids = [quote['id'] for quote in quotes]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), expected)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get('/api/quote-lists/shared_quotes/').json()['count'], 0)
+
+    def test_quotes_and_notes(self):
+        shared_quote, private_quote = self.quotes[0], self.quotes[1]
+        QuoteListQuote.objects.filter(quote__in=[shared_quote, private_quote]).delete()
+        QuoteGroupShare.objects.create(quote=shared_quote, group=self.group, permission='read')
+        public = QuoteNote.objects.create(quote=shared_quote, user=self.owner, content='a')
+        hidden = QuoteNote.objects.create(quote=private_quote, user=self.owner, content='b')
+        private_note = QuoteNote.objects.create(quote=shared_quote, user=self.owner, content='c', is_private=True)
+
+        self.assertEqual(list(visible_quotes(self.member).filter(pk__in=[shared_quote.pk, private_quote.pk])),
+                         [shared_quote])
+        notes = set(visible_notes(self.member).values_list('pk', flat=True))
+        self.assertIn(public.pk, notes)
+        self.assertNotIn(hidden.pk, notes)
+        self.assertNotIn(private_note.pk, notes)
+        self.assertFalse(visible_notes(self.outsider).filter(pk__in=[public.pk, hidden.pk]).exists())
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(f'/api/quotes/{shared_quote.pk}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/quotes/{private_quote.pk}/').status_code, 404)
+
+
+class BulkMembershipTests(TestCase):
+    """Inviting many members costs a fixed number of queries and reports every email."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', password='x')
+        User.objects.bulk_create([
+            User(username=f'reader{i}', email=f'reader{i}@example.com') for i in range(300)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_create_with_members(self):
+        emails = [f'reader{i}@example.com' for i in range(300)] + ['nobody@example.com', 'reader0@example.com']
+        with self.assertNumQueries(11):
+            response = self.client.post(
+                '/api/quote-groups/', {'name': 'Club', 'created_by': self.admin.pk, 'members': emails}, format='json',
+            )
+        self.assertEqual(response.status_code, 201)
+        invitations = response.json()['invitations']
+        self.assertEqual(len(invitations['added']), 300)
+        self.assertEqual(invitations['unknown'], ['nobody@example.com'])
+        self.assertEqual(invitations['duplicates'], ['reader0@example.com'])
+        self.assertEqual(QuoteGroupMembership.objects.filter(group_id=response.json()['id']).count(), 301)
+
+    def test_add_members(self):
+        group = QuoteGroup.objects.create(name='Club', created_by=self.admin)
+        QuoteGroupMembership.objects.create(group=group, user=self.admin, role='admin')
+        url = f'/api/quote-groups/{group.pk}/add_members/'
+        report = self.client.post(url, {'emails': ['reader1@example.com', 'admin@example.com']}, format='json').json()
+        reader1 = get_user_model().objects.get(email='reader1@example.com')
+        self.assertEqual(report, {'added': ['reader1@example.com'], 'added_ids': [reader1.pk],
+                                  'already_members': ['admin@example.com'], 'unknown': [], 'duplicates': []})
+        self.assertEqual(self.client.post(url, {'emails': 'reader2@example.com'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'emails': [], 'role': 'owner'}, format='json').status_code, 400)
+
+        single = f'/api/quote-groups/{group.pk}/add_member/'
+        self.assertEqual(self.client.post(single, {'email': 'reader2@example.com'}).json()['role'], 'reader')
+        self.assertEqual(self.client.post(single, {'email': 'reader2@example.com'}).status_code, 400)
+        self.assertEqual(self.client.post(single, {'email': 'nobody@example.com'}).status_code, 404)
+
+        # The membership returned is the one of the user that was added
+        reader3 = get_user_model().objects.get(email='reader3@example.com')
+        with self.assertNumQueries(8):
+            response = self.client.post(single, {'email': ' reader3@example.com '})
+        self.assertEqual(response.json()['user']['id'], reader3.pk)
+
+
+class GroupFeedTests(TestCase):
+    """Shares are copied to the members' feeds; a feed page is one query."""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        self.outsider = User.objects.create_user(username='outsider', email='outsider@example.com', password='x')
+        self.group = QuoteGroup.objects.create(name='Club', created_by=self.owner)
+        QuoteGroupMembership.objects.create(group=self.group, user=self.owner, role='admin')
+        QuoteGroupMembership.objects.create(group=self.group, user=self.member, role='reader')
+        self.quotes = [Quote.objects.create(owner=self.owner, body=f'Cita {i}', hash=f'feed-{i}') for i in range(5)]
+        self.shares = [
+            QuoteGroupShare.objects.create(quote=quote, group=self.group, permission='read') for quote in self.quotes
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def feed_ids(self, user):
+        return list(GroupFeedEntry.objects.filter(user=user).values_list('share__quote_id', flat=True))
+
+    def test_cursor_pagination(self):
+        url, seen = '/api/quote-groups/feed/?page_size=2', []
+        while url:
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            seen += [entry['quote']['id'] for entry in page['results']]
+            url = page['next']
+        self.assertEqual(seen, [quote.pk for quote in reversed(self.quotes)])
+        self.assertEqual(page['results'][-1]['group'], {'id': self.group.pk, 'name': 'Club'})
+        self.assertEqual(self.client.get('/api/quote-groups/feed/?cursor=nope').status_code, 400)
+
+    def test_membership_changes(self):
+        self.assertEqual(self.feed_ids(self.outsider), [])
+        self.client.force_authenticate(self.owner)
+        self.client.post(f'/api/quote-groups/{self.group.pk}/add_members/', {'emails': ['outsider@example.com']},
+                         format='json')
+        self.assertEqual(len(self.feed_ids(self.outsider)), 5)
+
+        QuoteGroupMembership.objects.get(group=self.group, user=self.member).delete()
+        self.assertEqual(self.feed_ids(self.member), [])
+
+    def test_removed_shares_leave_the_feed(self):
+        self.shares[0].delete()
+        self.quotes[1].delete()
+        self.client.force_authenticate(self.owner)
+        response = self.client.post('/api/quotes/bulk/', {'action': 'delete', 'ids': [self.quotes[2].pk]},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(self.feed_ids(self.member), [quote.pk for quote in self.quotes[3:]])
+
+
+class BatchedNotesTests(TestCase):
+    """The notes of many quotes come in one request and one query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = seed_benchmark_dataset(users=2, quotes_per_user=30, books=5, authors=3, tags=3, imports_per_user=1)
+        cls.user, cls.other = data['users']
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_by_quote(self):
+        quotes = list(Quote.objects.filter(owner=self.other).values_list('pk', flat=True)[:20])
+        stranger = get_user_model().objects.create_user(username='stranger', email='stranger@example.com')
+        hidden = Quote.objects.create(owner=stranger, body='Oculta', hash='hidden-note')
+        QuoteNote.objects.create(quote=hidden, user=stranger, content='No se ve')
+        ids = ','.join(str(pk) for pk in quotes + [hidden.pk])
+
+        with self.assertNumQueries(1):
+            grouped = self.client.get('/api/quote-notes/by_quote/', {'quote_ids': ids}).json()
+        self.assertEqual(set(grouped), {str(pk) for pk in quotes + [hidden.pk]})
+        self.assertEqual(grouped[str(hidden.pk)], [])
+        expected = visible_notes(self.user).filter(quote_id__in=quotes)
+        self.assertEqual(sum(len(notes) for notes in grouped.values()), expected.count())
+        note = next(note for notes in grouped.values() for note in notes)
+        self.assertEqual(set(note['user']), {'id', 'username', 'avatar'})
+
+        self.assertEqual(self.client.get('/api/quote-notes/by_quote/').status_code, 400)
+        self.assertEqual(self.client.get('/api/quote-notes/by_quote/', {'quote_ids': '1,x'}).status_code, 400)
+
+    def test_expanded_notes_are_prefetched(self):
+        with self.assertNumQueries(4):
+            # count, page, tags, notes
+            quotes = self.client.get('/api/quotes/paginated/', {'expand': 'notes'}).json()['results']
+        stored = QuoteNote.objects.filter(quote__in=[quote['id'] for quote in quotes]).count()
+        self.assertEqual(sum(len(quote['notes']) for quote in quotes), stored)
+
+
+class ImportHistoryTests(TestCase):
+    """import_history only reads: a page of logs and the rollup totals."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def log(self, platform, added, skipped, status='completed'):
+        return ImportLog.objects.create(owner=self.user, platform=platform, file='imports/x.txt', status=status,
+                                        quotes_added=added, duplicates_skipped=skipped)
+
+    def test_page_and_totals(self):
+        self.log('kindle', 10, 2)
+        self.log('kindle', 5, 0)
+        self.log('google_books', 3, 1)
+        self.log('google_books_batch', 4, 0)
+        self.log('kindle', 7, 0, status='failed')
+        with self.assertNumQueries(3):
+            # count, page, totals
+            data = self.client.get('/api/import-history/', {'page_size': 2}, HTTP_X_PLAIN_LISTS='1').json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(data['totals'], {
+            'imports': 4, 'quotes_added': 22, 'duplicates_skipped': 3,
+            'platforms': [
+                {'platform': 'Google Books', 'imports': 2, 'quotes_added': 7, 'duplicates_skipped': 1},
+                {'platform': 'Kindle', 'imports': 2, 'quotes_added': 15, 'duplicates_skipped': 2},
+            ],
+        })
+
+    def test_inconsistent_logs_fixed_by_migration(self):
+        log = self.log('kindle', 0, 4)
+        # A legacy row, written before ImportLog.save() enforced the rule
+        ImportLog.objects.filter(pk=log.pk).update(quotes_added=4)
+        DailyActivity.objects.filter(owner=self.user).update(imported_quotes=4)
+
+        self.assertEqual(self.client.get('/api/import-history/').json()['results'][0]['quotes_added'], 4)
+        self.assertEqual(ImportLog.objects.get(pk=log.pk).quotes_added, 4)
+
+        migration = import_module('api.migrations.0038_fix_import_log_counts')
+        migration.fix_import_log_counts(django_apps, None)
+        self.assertEqual(ImportLog.objects.get(pk=log.pk).quotes_added, 0)
+        self.assertEqual(DailyActivity.objects.get(owner=self.user).imported_quotes, 0)
+
+
+class InstrumentationTests(TestCase):
+    """Requests report their wall, DB and external time."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com', password='x')
+
+    def run_middleware(self, view):
+        request = APIRequestFactory().get('/api/example/')
+        with self.assertLogs('api.perf', 'INFO') as logs:
+            response = InstrumentationMiddleware(lambda request: view())(request)
+        return response, [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_metrics(self):
+        @timed_external('ollama')
+        def stream():
+            yield from ('a', 'b')
+
+        def view():
+            for _ in range(2):
+                list(Quote.objects.filter(owner=self.user))
+            Tag.objects.count()
+            with external_call('anthropic'):
+                pass
+            self.assertEqual(list(stream()), ['a', 'b'])
+            return HttpResponse('ok')
+
+        with mock.patch('api.instrumentation.PERF_SERVER_TIMING', True):
+            response, records = self.run_middleware(view)
+        self.assertRegex(response['Server-Timing'],
+                         r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="3 queries", ext-anthropic;dur=[\d.]+, ext-ollama;dur=[\d.]+$')
+        record = records[-1]
+        self.assertEqual((record['event'], record['queries'], record['duplicate_queries']), ('request', 3, 1))
+        # One call for each item produced and one for the end of the generator
+        self.assertEqual(record['external_calls'], {'anthropic': 1, 'ollama': 3})
+
+    def test_slow_log(self):
+        def view():
+            Tag.objects.count()
+            return HttpResponse('ok')
+
+        with mock.patch('api.instrumentation.PERF_SLOW_QUERY_MS', 0), \
+                mock.patch('api.instrumentation.PERF_SLOW_REQUEST_MS', 0):
+            _, records = self.run_middleware(view)
+        slow_query, _, slow_request = records
+        self.assertEqual(slow_query['event'], 'slow_query')
+        self.assertIn('SELECT COUNT(*)', slow_query['sql'])
+        self.assertRegex(slow_query['origin'], r'^api/tests\.py:\d+ in view$')
+        self.assertEqual(slow_request['event'], 'slow_request')
+        self.assertEqual(slow_request['slowest_queries'][0]['origin'], slow_query['origin'])
+
+    def test_api_response_header(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('api.instrumentation.PERF_SERVER_TIMING', True):
+            self.assertIn('db;dur=', client.get('/api/tags/')['Server-Timing'])
+        with mock.patch('api.instrumentation.PERF_SERVER_TIMING', False):
+            self.assertNotIn('Server-Timing', client.get('/api/tags/'))
+
+
+def _route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if '_allauth' not in str(pattern.pattern):
+                yield from _route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            # The router's format suffix patterns share the name of the plain route
+            yield pattern.name
+
+
+def _duplicated_sql(queries):
+    """Statements run more than once (literals replaced by ?), most repeated first."""
+    shapes = Counter(
+        re.sub(r"'(?:[^']|'')*'|\b\d+\b", '?', query['sql']) for query in queries
+    )
+    return [f'{count}x {sql}' for sql, count in shapes.most_common() if count > 1]
+
+
+class EndpointBudgetTests(TestCase):
+    """
+    Every API route stays within its query and latency budget (api/budgets.py)
+    on a seeded library.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from . import urls
+
+        cls.route_names = set(_route_names(urls.urlpatterns))
+
+        data = seed_benchmark_dataset(**BUDGET_DATASET)
+        cls.user = user = data['users'][0]
+        User = get_user_model()
+        invitee = User.objects.create_user(username='invitado', email='invitado@example.com', password='x')
+        new_member = User.objects.create_user(username='nuevo', email='nuevo@example.com', password='x')
+
+        quotes = list(Quote.objects.filter(owner=user).order_by('pk'))
+        group = data['group']
+        for quote in quotes[:30]:
+            QuoteGroupShare.objects.create(quote=quote, group=group, permission='read')
+        quote_list = QuoteList.objects.filter(owner=user).get()
+        list_quotes = list(QuoteListQuote.objects.filter(quote_list=quote_list).order_by('position'))
+        in_list = {item.quote_id for item in list_quotes}
+        document = Document.objects.create(owner=user, file='documents/presupuesto.txt', title='Presupuesto')
+
+        cls.fixtures = {
+            'user': user.pk,
+            'author': data['authors'][0].pk,
+            'book': data['books'][0].pk,
+            'tag': data['tags'][0].pk,
+            'quote': quotes[0].pk,
+            'quotes': [quote.pk for quote in quotes[:50]],
+            'quote_ids': ','.join(str(quote.pk) for quote in quotes[:50]),
+            'quote_tag': QuoteTag.objects.filter(quote__owner=user).values_list('pk', flat=True).first(),
+            'note': QuoteNote.objects.filter(user=user).values_list('pk', flat=True).first(),
+            'group': group.pk,
+            'membership': QuoteGroupMembership.objects.get(group=group, user=user).pk,
+            'share': QuoteGroupShare.objects.filter(group=group).values_list('pk', flat=True).first(),
+            'quote_list': quote_list.pk,
+            'list_quote': list_quotes[0].pk,
+            'list_quote_quote': list_quotes[0].quote_id,
+            'list_quote_ids': [item.quote_id for item in reversed(list_quotes)],
+            'outside_quote': next(quote.pk for quote in quotes if quote.pk not in in_list),
+            'import_log': ImportLog.objects.filter(owner=user).values_list('pk', flat=True).first(),
+            'document': document.pk,
+            'new_member_email': new_member.email,
+            'invitee_email': invitee.email,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def resolve(self, value):
+        if isinstance(value, str) and value.startswith('@'):
+            return self.fixtures[value[1:]]
+        if isinstance(value, list):
+            return [self.resolve(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.resolve(item) for key, item in value.items()}
+        return value
+
+    def call(self, entry):
+        url = reverse(entry.route, kwargs=self.resolve(entry.kwargs))
+        params = self.resolve(entry.params)
+        if params:
+            url = f'{url}?{"&".join(f"{key}={value}" for key, value in params.items())}'
+        data = self.resolve(entry.data)
+        cache.clear()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, entry.method)(url, data, format='json', **entry.headers)
+        return response, queries.captured_queries, (time.perf_counter() - start) * 1000
+
+    def test_every_route_budgeted(self):
+        budgeted = {entry.route for entry in ENDPOINT_BUDGETS}
+        self.assertEqual(sorted(self.route_names - budgeted - set(BUDGET_EXEMPT)), [])
+        self.assertEqual(sorted((budgeted | set(BUDGET_EXEMPT)) - self.route_names), [])
+
+    def test_budgets(self):
+        for entry in ENDPOINT_BUDGETS:
+            with self.subTest(route=entry.route, method=entry.method, params=entry.params):
+                response, queries, ms = self.call(entry)
+                if entry.method == 'get':
+                    for _ in range(BUDGET_REPEAT - 1):
+                        ms = min(ms, self.call(entry)[2])
+                self.assertLess(response.status_code, 400, response.content[:500])
+                self.assertLessEqual(
+                    len(queries), entry.queries,
+                    '\n'.join([f'{len(queries)} queries, budget {entry.queries}. Duplicated:']
+                              + _duplicated_sql(queries)),
+                )
+                self.assertLessEqual(ms, entry.ms * API_BUDGET_LATENCY_SCALE,
+                                     f'{ms:.0f} ms, budget {entry.ms} ms')
+
+
+class FullTextSearchTests(TestCase):
+    """Ranking, highlighting, query syntax and per-language stemming of search_quotes()."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com', password='x')
+        author = Author.objects.create(name='Autora')
+        self.es_book = Book.objects.create(title='Poemas', author=author, language='es')
+        self.en_book = Book.objects.create(title='Essays', author=author, language='English')
+
+    def quote(self, body, book=None, tags=()):
+        quote = Quote.objects.create(owner=self.user, title='Cita', body=body, book=book or self.es_book)
+        for title in tags:
+            quote.tags.add(Tag.objects.get_or_create(title=title)[0])
+        return quote
+
+    def search(self, text, **kwargs):
+        return list(search_quotes(Quote.objects.filter(owner=self.user), text, **kwargs))
+
+    def test_body_matches_rank_above_tag_matches(self):
+        tagged = self.quote('Otra cosa distinta', tags=['amor'])
+        in_body = self.quote('El amor es eterno')
+        self.assertEqual([quote.pk for quote in self.search('amor')], [in_body.pk, tagged.pk])
+
+    def test_headline(self):
+        self.quote('El amor es eterno')
+        self.assertIn('<mark>amor</mark>', self.search('amor')[0].headline)
+        self.assertFalse(hasattr(self.search('amor', headline=False)[0], 'headline'))
+
+    def test_websearch_syntax(self):
+        phrase = self.quote('El amor eterno del mar')
+        other = self.quote('Bajo el sol, eterno es el mar y el amor')
+
+        def found(text):
+            return {quote.pk for quote in self.search(text)}
+
+        self.assertEqual(found('"amor eterno"'), {phrase.pk})
+        self.assertEqual(found('mar -sol'), {phrase.pk})
+        self.assertEqual(found('sol or nada'), {other.pk})
+
+    def test_language_of_the_book_selects_the_stemmer(self):
+        spanish = self.quote('Las canciones del mar')
+        english = self.quote('She was running home', book=self.en_book)
+        # Stemmed with the book's dictionary; the query is tried with every configuration
+        self.assertEqual([quote.pk for quote in self.search('cancion')], [spanish.pk])
+        self.assertEqual([quote.pk for quote in self.search('runs')], [english.pk])
+
+    def test_import_refreshes_search_vectors_once(self):
+        blocks = [
+            f'Poemas (Autora)\n- Tu subrayado | Añadido el lunes\n\nVerso número {word}\n'
+            for word in ('uno', 'dos', 'tres')
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            result = save_quotes_from_file('==========\n'.join(blocks), self.user)
+        self.assertEqual(result['quotes_created'], 3)
+        updates = [query for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "quotes" SET "search_vector"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(self.search('tres')), 1)
+        self.assertEqual(len(self.search('kindle')), 3)
+
+    def test_deferred_refreshes_not_flushed_on_error(self):
+        with mock.patch('api.search.update_search_vectors') as update:
+            with self.assertRaises(ZeroDivisionError):
+                with defer_search_vectors():
+                    self.quote('Verso perdido')
+                    1 / 0
+            update.assert_not_called()
+            with defer_search_vectors():
+                self.quote('Verso guardado')
+            update.assert_called_once()
+
+
+class QuoteFilterTests(TestCase):
+    """Per-field filters and sorting of the paginated quote listing."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com', password='x')
+        book = Book.objects.create(title='Cien años de soledad', author=Author.objects.create(name='Gabo'))
+        self.lonely = Quote.objects.create(owner=self.user, title='Macondo', body='La SOLEDAD del coronel', book=book)
+        self.tagged = Quote.objects.create(owner=self.user, title='Lluvia', body='Llovió cuatro años', book=book)
+        self.tagged.tags.add(Tag.objects.create(title='lluvia'), Tag.objects.create(title='macondo'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def paginated(self, **params):
+        return self.client.get('/api/quotes/paginated/', params)
+
+    def ids(self, **params):
+        response = self.paginated(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [quote['id'] for quote in response.json()['results']]
+
+    def test_trigram_icontains_compiles_to_ilike(self):
+        queryset = Quote.objects.filter(body__trigram_icontains='soledad')
+        sql = str(queryset.query)
+        self.assertIn('ILIKE', sql)
+        self.assertNotIn('UPPER', sql)
+        self.assertEqual(list(queryset), [self.lonely])
+
+    def test_contains_and_fuzzy_filters(self):
+        self.assertEqual(self.ids(body='soledad'), [self.lonely.pk])
+        self.assertEqual(self.ids(body__fuzzy='soledat'), [self.lonely.pk])
+        self.assertEqual(self.ids(**{'tags.title': 'lluv'}), [self.tagged.pk])
+
+    def test_unknown_filters_and_sorts_are_rejected(self):
+        for params in ({'owner': '1'}, {'body__regex': 'a'}, {'sort_field': 'owner__password'}):
+            response = self.paginated(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_page_and_limit_are_clamped_or_rejected(self):
+        data = self.paginated(limit=0, page=0).json()
+        self.assertEqual((data['page'], data['limit'], data['pages']), (1, 1, 2))
+        self.assertEqual(len(data['results']), 1)
+        for params in ({'limit': 'abc'}, {'page': 'x'}):
+            response = self.paginated(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_allowlist(self):
+        for param in QUOTE_TEXT_FILTERS:
+            self.assertEqual(self.paginated(**{param: 'a'}).status_code, 200, param)
+        for field in QUOTE_SORT_FIELDS:
+            self.assertEqual(self.paginated(sort_field=field, sort_order='desc').status_code, 200, field)
+
+    def test_sort_by_tag_count(self):
+        self.assertEqual(self.ids(sort_field='tags', sort_order='desc'), [self.tagged.pk, self.lonely.pk])
+        self.assertEqual(self.ids(sort_field='tags'), [self.lonely.pk, self.tagged.pk])
+        # created is a date: same-day quotes fall back to id order
+        self.assertEqual(self.ids(sort_field='created_at', sort_order='desc'), [self.lonely.pk, self.tagged.pk])
+
+
+class AutocompleteTests(TestCase):
+    """Type-ahead suggestions: one UNION query, cached per user and query."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com', password='x')
+        self.author = Author.objects.create(name='Herman Melville')
+        self.book = Book.objects.create(title='Moby Dick', author=self.author)
+        self.tag = Tag.objects.create(title='moby')
+        self.quote = Quote.objects.create(owner=self.user, title='Ishmael', body='Call me Ishmael, said Moby', book=self.book)
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='x')
+        Quote.objects.create(owner=other, title='Ajena', body='Moby de otro lector', book=self.book)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def suggest(self, q, **params):
+        response = self.client.get('/api/search/autocomplete/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(item['type'], item['id']) for item in response.json()['results']]
+
+    def test_union_of_every_type_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.suggest('Moby')
+        self.assertEqual(results, [
+            ('book', self.book.pk), ('tag', self.tag.pk), ('quote', self.quote.pk),
+        ])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0]['sql'].count('UNION ALL'), 3)
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.suggest('melvile'), [('author', self.author.pk)])
+        self.assertEqual(self.suggest('ishmail'), [('quote', self.quote.pk)])
+
+    def test_cached_for_a_minute_per_normalized_query(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.suggest('Moby')
+        self.assertEqual(cache_set.call_args.args[2], 60)
+        with CaptureQueriesContext(connection) as queries:
+            self.suggest('  moby ')
+        self.assertEqual(len(queries), 0)
 
-# Create your tests here.
+    def test_invalid_limit(self):
+        self.assertEqual(self.client.get('/api/search/autocomplete/', {'q': 'a', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(self.suggest(''), [])
@@ -14,6 +14,7 @@ from .views import (
     profile_update_direct,
     user_goals,
     search,
+    search_autocomplete,
     import_history,
     get_subscription_plan,
     AnthropicTagView,
@@ -37,6 +38,8 @@ router.register(r'import-logs', ImportLogViewSet)
 router.register(r'quote-notes', QuoteNoteViewSet)
 
 urlpatterns = [
+    # Before the router, whose users/<pk>/ route would otherwise take 'goals' as a pk
+    path('api/users/goals/', user_goals, name='user-goals'),
     path('api/', include(router.urls)),
     path('api/me/', current_user, name='current_user'),
     path('api/_allauth/', include('allauth.headless.urls')),
@@ -48,8 +51,8 @@ urlpatterns = [
     path('api/statistics/', get_statistics, name='get_statistics'),
     path('api/upload-avatar-direct/', upload_avatar_direct, name='upload-avatar-direct'),
     path('api/profile-update-direct/', profile_update_direct, name='profile-update-direct'),
-    path('api/users/goals/', user_goals, name='user-goals'),
     path('api/search/', search, name='search'),
+    path('api/search/autocomplete/', search_autocomplete, name='search-autocomplete'),
     path('api/subscription-plan/<int:user_id>/', get_subscription_plan, name='subscription-plan'),
     # DeepSeek AI endpoints
     path('api/deepseek/tag', DeepSeekTagView.as_view(), name='deepseek-tag'),
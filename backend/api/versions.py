@@ -0,0 +1,187 @@
+# api/versions.py
+"""
+Version stamps for conditional GET (ETag / Last-Modified).
+
+A stamp is the time of the last write to a scope, kept in the cache:
+
+* ``library`` (global): the author, book and tag rows, shared by every user.
+* ``quotes`` (per user): the quotes a user can see, with their notes and
+  tags, i.e. their own quotes and those shared with their groups (directly
+  or in a list). The quote counts of authors, books and tags only count the
+  user's own quotes, so those endpoints depend on it too.
+* ``lists`` (per user): the quote lists a user can see, i.e. their own
+  lists and the lists shared with their groups.
+* ``imports``, ``profile`` (per user): the import logs and the account
+  (subscription plan) of a user.
+
+Stamps are bumped by the receivers in api/signals.py. Read endpoints derive
+their validators from the stamps only, so a matching If-None-Match is
+answered with 304 before the main query or the serializer run. A stamp
+evicted from the cache is recreated with the current time, which only costs
+one full response.
+
+Last-Modified has one-second resolution, so it is left out while the second
+of the newest stamp is still running: a write later in that second would
+otherwise leave a client that only sends If-Modified-Since with a stale 304.
+The ETag is always sent.
+
+Stamps are only trustworthy when every worker process reads and writes the
+same cache: with a per-process cache (LocMemCache), a write handled by one
+worker leaves the other workers answering 304 for changed data. Conditional
+GET is therefore off unless the cache is shared (``CONDITIONAL_GET_ENABLED``
+defaults to ``cache_is_shared()``).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from django.db.models import Q
+
+from .models import Quote, QuoteGroupMembership, QuoteGroupShare, QuoteList
+from .pagination import PLAIN_LISTS_HEADER
+
+GLOBAL_SCOPES = ('library',)
+
+# Cache backends private to one process
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """True when the default cache is shared by every worker process."""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+CONDITIONAL_GET_ENABLED = getattr(settings, 'CONDITIONAL_GET_ENABLED', cache_is_shared())
+
+
+def _stamp_key(scope, user_id=None):
+    return f'version:{scope}:{"all" if scope in GLOBAL_SCOPES else user_id}'
+
+
+def bump_version(scope, user_ids=()):
+    """Record a write to ``scope`` (for ``user_ids`` unless the scope is global)."""
+    stamp = time.time()
+    if scope in GLOBAL_SCOPES:
+        keys = [_stamp_key(scope)]
+    else:
+        keys = [_stamp_key(scope, user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        cache.set_many({key: stamp for key in keys}, None)
+
+
+def list_viewers(list_ids):
+    """Users who can see the lists ``list_ids``: their owners and the members of their groups."""
+    rows = list(QuoteList.objects.filter(pk__in=list_ids).values_list('owner_id', 'group_id'))
+    viewers = {owner_id for owner_id, _ in rows}
+    group_ids = {group_id for _, group_id in rows if group_id}
+    if group_ids:
+        viewers.update(
+            QuoteGroupMembership.objects.filter(group_id__in=group_ids).values_list('user_id', flat=True)
+        )
+    return viewers
+
+
+def bump_list_versions(list_ids):
+    """Record a write to the lists ``list_ids`` for everyone who can see them."""
+    bump_version('lists', list_viewers(list_ids))
+
+
+def quote_viewers(quote_ids):
+    """
+    Users who can see the quotes ``quote_ids``: their owners and the members
+    of the groups they are shared with, directly or in a list (one query).
+    """
+    quote_ids = list(quote_ids)
+    if not quote_ids:
+        return set()
+    share_groups = QuoteGroupShare.objects.filter(quote_id__in=quote_ids).values('group_id')
+    list_groups = QuoteList.objects.filter(
+        group__isnull=False, quotelistquote__quote_id__in=quote_ids,
+    ).values('group_id')
+    members = QuoteGroupMembership.objects.filter(
+        Q(group_id__in=share_groups) | Q(group_id__in=list_groups)
+    ).order_by().values_list('user_id', flat=True)
+    owners = Quote.objects.filter(pk__in=quote_ids).order_by().values_list('owner_id', flat=True)
+    return set(owners.union(members))
+
+
+def bump_quote_versions(quote_ids, user_ids=()):
+    """Record a write to the quotes ``quote_ids`` for everyone who can see them (and ``user_ids``)."""
+    bump_version('quotes', quote_viewers(quote_ids) | set(user_ids))
+
+
+def get_versions(scopes, user_id):
+    """{scope: stamp} for ``user_id``, creating the missing stamps."""
+    keys = {scope: _stamp_key(scope, user_id) for scope in scopes}
+    found = cache.get_many(keys.values())
+    for scope, key in keys.items():
+        if key not in found:
+            cache.add(key, time.time(), None)
+            found[key] = cache.get(key)
+    return {scope: found[key] for scope, key in keys.items()}
+
+
+def validators(request, scopes):
+    """(ETag, Last-Modified timestamp) of ``request`` given the stamps of ``scopes``."""
+    versions = get_versions(scopes, request.user.pk)
+    # The same stamps serve every URL, user and representation
+    variant = '|'.join([
+        request.get_full_path(),
+        str(request.user.pk),
+        request.META.get('HTTP_ACCEPT', ''),
+        request.META.get(PLAIN_LISTS_HEADER, ''),
+        *(f'{scope}={versions[scope]!r}' for scope in scopes),
+    ])
+    etag = '"%s"' % hashlib.md5(variant.encode(), usedforsecurity=False).hexdigest()
+    return etag, max(versions.values())
+
+
+def last_modified_header(stamp):
+    """Last-Modified value for ``stamp``, or None while its second isn't over yet."""
+    if int(stamp) >= int(time.time()):
+        return None
+    return http_date(stamp)
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering list/retrieve with 304 Not Modified when the
+    client's ETag or Last-Modified is still current. ``version_scopes`` lists
+    the scopes whose writes can change the responses.
+    """
+
+    version_scopes = ('library', 'quotes')
+    conditional_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if (not CONDITIONAL_GET_ENABLED or request.method not in ('GET', 'HEAD')
+                or self.action not in self.conditional_actions):
+            return handler(request, *args, **kwargs)
+        etag, last_modified = validators(request, self.version_scopes)
+        header = last_modified_header(last_modified)
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=int(last_modified) if header else None,
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if header is not None:
+                response['Last-Modified'] = header
+            # Revalidate every time instead of trusting a heuristic freshness
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('X-Plain-Lists',))
+        return response
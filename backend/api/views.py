@@ -3,9 +3,10 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Exists, OuterRef, Q, prefetch_related_objects
 
 from .models import (
     Author, Book, Tag, Quote, QuoteTag,
@@ -15,9 +16,30 @@ from .models import (
 from .serializers import (
     UserSerializer, AuthorSerializer, BookSerializer, TagSerializer,
     QuoteSerializer, QuoteTagSerializer, QuoteGroupSerializer,
-    QuoteGroupMembershipSerializer, QuoteGroupShareSerializer,
+    QuoteGroupMembershipSerializer, QuoteGroupShareSerializer, GroupFeedEntrySerializer,
     QuoteListSerializer, QuoteListQuoteSerializer, DocumentSerializer,
-    ImportLogSerializer, QuoteUpdateSerializer, QuoteNoteSerializer
+    ImportLogSerializer, QuoteUpdateSerializer, QuoteNoteSerializer, QuoteNoteCompactSerializer,
+    QuoteSearchResultSerializer, parse_field_paths
+)
+from .filters import FilterError, apply_quote_filters, order_quotes
+from .search import autocomplete, defer_search_vectors, search_quotes
+from .stats import get_stats
+from .activity import BUCKETS, ActivityError, activity_timeline, parse_date
+from .rollups import activity_history, import_totals
+from .sampling import random_quotes
+from .fastpath import FastListMixin, count_expression, fast_data
+from .pagination import API_MAX_PAGE_SIZE, DefaultPagination
+from .renderers import FastJSONParser
+from .versions import ConditionalGetMixin
+from .response_cache import CachedListMixin, cache_response
+from .bulk import BulkError, bulk_update_quotes
+from .memberships import MembershipError, bulk_add_members, clean_emails
+from .feed import FeedError, feed_page, parse_page_size
+from .instrumentation import external_call
+from .notes import NotesError, notes_by_quote, parse_quote_ids, prefetch_visible_notes
+from .ranking import RankError, list_preview_rows, move_quote, next_position, ordered_quotes, reorder
+from .visibility import (
+    shared_list_condition, shared_lists, visible_groups, visible_lists, visible_memberships, visible_notes, visible_quotes, visible_shares,
 )
 import logging
 import os
@@ -30,6 +52,41 @@ from django.views.decorators.csrf import csrf_exempt
 
 logger = logging.getLogger(__name__)
 
+
+# quotes_count annotations read by the Author/Book/Tag serializers (num_quotes),
+# so listings don't run one COUNT query per row. Scalar subqueries rather than
+# JOIN + GROUP BY keep the default ordering and cheap pagination counts. Only
+# the user's own quotes are counted, like the quote listings they lead to.
+
+def with_author_counts(queryset, user):
+    return queryset.annotate(num_quotes=count_expression(Quote, 'book__author', 'pk', owner=user))
+
+
+def with_book_counts(queryset, user):
+    return queryset.prefetch_related(
+        models.Prefetch('author', queryset=with_author_counts(Author.objects.all(), user))
+    ).annotate(num_quotes=count_expression(Quote, 'book', 'pk', owner=user))
+
+
+def with_tag_counts(queryset, user):
+    return queryset.annotate(num_quotes=count_expression(QuoteTag, 'tag', 'pk', quote__owner=user))
+
+
+def with_list_summaries(queryset, request):
+    """Quote count, preview quotes and (with ?quote=<id>) membership of that quote for each list."""
+    queryset = queryset.select_related('owner').annotate(
+        quotes_count=count_expression(QuoteListQuote, 'quote_list', 'pk'),
+    ).prefetch_related(
+        models.Prefetch('quotelistquote_set', queryset=list_preview_rows(QuoteListQuote.objects.all()),
+                        to_attr='preview_rows'),
+    )
+    quote_id = request.query_params.get('quote')
+    if quote_id and quote_id.isdigit():
+        queryset = queryset.annotate(has_quote=Exists(
+            QuoteListQuote.objects.filter(quote_list=OuterRef('pk'), quote_id=quote_id)
+        ))
+    return queryset
+
 # quotesync/apps/quotes/views.py
 
 import re
@@ -48,13 +105,20 @@ User = get_user_model()
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-    parser_classes = (JSONParser, MultiPartParser, FormParser)
+    from rest_framework.parsers import MultiPartParser, FormParser
+    parser_classes = (FastJSONParser, MultiPartParser, FormParser)
 
     def get_permissions(self):
         if self.action == 'create':
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
+
+    def get_queryset(self):
+        # Only staff can browse other accounts
+        queryset = User.objects.order_by('pk')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(pk=self.request.user.pk)
+        return queryset
     
     @action(detail=False, methods=['get'])
     def profile(self, request):
@@ -136,97 +200,98 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics for the current user"""
-        user = request.user
-        
-        # Count various entities belonging to this user
-        total_quotes = Quote.objects.filter(owner=user).count()
-        total_books = Book.objects.filter(quotes__owner=user).distinct().count()
-        total_authors = Author.objects.filter(books__quotes__owner=user).distinct().count()
-        total_tags = Tag.objects.filter(quotes__owner=user).distinct().count()
+        stats = get_stats(request.user)
         
         return Response({
-            'totalQuotes': total_quotes,
-            'totalBooks': total_books,
-            'totalAuthors': total_authors,
-            'totalTags': total_tags
+            'totalQuotes': stats['total_quotes'],
+            'totalBooks': stats['total_books'],
+            'totalAuthors': stats['total_authors'],
+            'totalTags': stats['total_tags']
         })
     
     @action(detail=False, methods=['get'])
     def activity(self, request):
-        """Get recent activity for the current user"""
-        user = request.user
-        
-        # Get quotes created/updated in the last 7 days, grouped by date
+        """
+        Get the activity timeline of the current user.
+
+        Query params:
+        - start / end: ISO dates (default: the last 7 days, ending today)
+        - bucket: 'day' (default), 'week' or 'month'
+        """
         from django.utils import timezone
         from datetime import timedelta
-        from django.db.models.functions import TruncDate
-        
-        # Get the start date (7 days ago)
-        start_date = timezone.now().date() - timedelta(days=6)
-        
-        # For each of the last 7 days, count the quotes created or updated
-        activity_data = []
-        
-        for day_offset in range(7):
-            current_date = start_date + timedelta(days=day_offset)
-            next_date = current_date + timedelta(days=1)
-            
-            # Count quotes created or updated on this day
-            quotes_count = Quote.objects.filter(
-                owner=user,
-                created__gte=current_date,
-                created__lt=next_date
-            ).count()
-            
-            # Count imports completed on this day
-            imports_count = ImportLog.objects.filter(
-                owner=user,
-                created_at__date=current_date,
-                status='completed'
-            ).count()
-            
-            activity_data.append({
-                'date': current_date.isoformat(),
-                'quotes_count': quotes_count,
-                'imports_count': imports_count,
-                'total_count': quotes_count + imports_count
-            })
+
+        try:
+            end = parse_date(request.query_params.get('end'), timezone.now().date())
+            start = parse_date(request.query_params.get('start'), end - timedelta(days=6))
+            activity_data = activity_timeline(
+                request.user, start, end, request.query_params.get('bucket', 'day')
+            )
+        except ActivityError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(activity_data)
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def activity_history(self, request):
+        """
+        Get long-range activity of the current user per bucket and platform,
+        read from the daily rollup table.
+
+        Query params:
+        - start / end: ISO dates (default: the last 365 days, ending today)
+        - bucket: 'day', 'week' or 'month' (default)
+        """
+        from django.utils import timezone
+        from datetime import timedelta
+
+        bucket = request.query_params.get('bucket', 'month')
+        try:
+            end = parse_date(request.query_params.get('end'), timezone.now().date())
+            start = parse_date(request.query_params.get('start'), end - timedelta(days=364))
+            if bucket not in BUCKETS:
+                raise ActivityError(f"Unknown bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+            if start > end:
+                raise ActivityError('start must not be after end')
+        except ActivityError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(activity_history(request.user, start, end, bucket))
+
+
+class AuthorViewSet(ConditionalGetMixin, CachedListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['name']
 
     def get_queryset(self):
-        return Author.objects.all().prefetch_related('books', 'books__quotes')
+        return with_author_counts(Author.objects.all(), self.request.user)
 
     @action(detail=True, methods=['post'])
     def toggle_favorite(self, request, pk=None):
         author = self.get_object()
         author.is_favorite = not author.is_favorite
-        author.save()
+        author.save(update_fields=['is_favorite'])
         return Response({'is_favorite': author.is_favorite})
 
     @action(detail=True, methods=['get'])
     def books(self, request, pk=None):
         author = self.get_object()
-        books = author.books.all()
-        serializer = BookSerializer(books, many=True)
+        books = with_book_counts(author.books.all(), request.user)
+        serializer = BookSerializer(books, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, CachedListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['title', 'author']
 
     def get_queryset(self):
-        return Book.objects.all().select_related('author').prefetch_related('quotes')
+        return with_book_counts(Book.objects.all(), self.request.user)
 
     def update(self, request, *args, **kwargs):
         logger.info("BookViewSet update - Received data: %s", request.data)
@@ -245,29 +310,29 @@ class BookViewSet(viewsets.ModelViewSet):
     def toggle_favorite(self, request, pk=None):
         book = self.get_object()
         book.is_favorite = not book.is_favorite
-        book.save()
+        book.save(update_fields=['is_favorite', 'updated'])
         return Response({'is_favorite': book.is_favorite})
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, CachedListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['title']
 
     def get_queryset(self):
-        return Tag.objects.all().prefetch_related('quotes')
+        return with_tag_counts(Tag.objects.all(), self.request.user)
 
     @action(detail=True, methods=['post'])
     def toggle_favorite(self, request, pk=None):
         tag = self.get_object()
         tag.is_favorite = not tag.is_favorite
-        tag.save()
+        tag.save(update_fields=['is_favorite'])
         return Response({'is_favorite': tag.is_favorite})
 
 
 
-class QuoteViewSet(viewsets.ModelViewSet):
+class QuoteViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Quote.objects.all()
     
     def get_serializer_class(self):
@@ -276,8 +341,23 @@ class QuoteViewSet(viewsets.ModelViewSet):
             return QuoteUpdateSerializer  # Serializer específico para actualizaciones
         return QuoteSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Listings use the compact quote card form (?fields= / ?expand= to change it)
+        context['compact'] = self.action in ('list', 'paginated', 'random_favorites')
+        return context
+
     def get_queryset(self):
-        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action == 'retrieve':
+            # Quotes shared with the user's groups (directly or in a list) can be opened too
+            queryset = visible_quotes(user)
+        else:
+            queryset = Quote.objects.filter(owner=user)
+        queryset = queryset.select_related('book__author').prefetch_related('tags')
+        params = self.request.query_params
+        if 'notes' in parse_field_paths(params.get('expand')) or 'notes' in parse_field_paths(params.get('fields')):
+            queryset = queryset.prefetch_related(prefetch_visible_notes(user))
         book_id = self.request.query_params.get('book')
         author_id = self.request.query_params.get('author')
         tag = self.request.query_params.get('tag')
@@ -288,47 +368,61 @@ class QuoteViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(book__author__id=author_id)
         if tag:
             queryset = queryset.filter(tags__title__icontains=tag)
-        return queryset
+        # pk breaks ties of the default ordering, so pages (and the Link of a cut plain list) line up
+        return queryset.order_by(*Quote._meta.ordering, 'pk')
 
     @action(detail=True, methods=['post'])
     def toggle_favorite(self, request, pk=None):
         quote = self.get_object()
         quote.is_favorite = not quote.is_favorite
-        quote.save()
+        quote.save(update_fields=['is_favorite', 'updated'])
         return Response({'is_favorite': quote.is_favorite})
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply one action to many quotes of the user in a single transaction.
+
+        Body:
+        - action: 'tag', 'untag', 'favorite', 'archive', 'move_to_list' or 'delete'
+        - ids: list of quote ids, or
+        - filter: object with the filters of the paginated listing (plus 'search')
+        - tags: tag titles (tag / untag)
+        - value: true or false (favorite / archive, default true)
+        - list_id, from_list_id: target and optional source list (move_to_list)
+
+        Returns the counts and a status per quote ('updated', 'unchanged' or
+        'not_found'); see api/bulk.py.
+        """
+        data = request.data
+        try:
+            result = bulk_update_quotes(
+                request.user,
+                data.get('action'),
+                ids=data.get('ids'),
+                filters=data.get('filter'),
+                tags=data.get('tags'),
+                value=data.get('value', True),
+                list_id=data.get('list_id'),
+                from_list_id=data.get('from_list_id'),
+            )
+        except (BulkError, FilterError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
     @action(detail=False, methods=['get'])
     def random_favorites(self, request):
         """
         Return 5 random quotes, prioritizing favorites.
         - Takes up to 5 random favorite quotes
         - Fills remaining slots with random non-favorite quotes
-        - Shuffling is done on the backend
+        - Sampling probes random ids (see api/sampling.py), so only a few
+          rows are read whatever the size of the library
         """
-        import random
-        
-        # Get quotes for the current user
         user_quotes = Quote.objects.filter(owner=request.user)
-        
-        # Get and shuffle favorite quotes
-        favorite_quotes = list(user_quotes.filter(is_favorite=True))
-        random.shuffle(favorite_quotes)
-        
-        # Take up to 5 favorite quotes
-        selected_favorites = favorite_quotes[:5]
-        
-        # Calculate how many more quotes we need to reach 5 total
-        remaining_slots = max(0, 5 - len(selected_favorites))
-        
-        # If we need more quotes, get random non-favorites
-        selected_random_quotes = []
-        if remaining_slots > 0:
-            non_favorite_quotes = list(user_quotes.filter(is_favorite=False))
-            random.shuffle(non_favorite_quotes)
-            selected_random_quotes = non_favorite_quotes[:remaining_slots]
-        
-        # Combine the lists and serialize
-        selected_quotes = selected_favorites + selected_random_quotes
+        selected_quotes = random_quotes(
+            user_quotes.select_related('book__author').prefetch_related('tags'), 5
+        )
         serializer = self.get_serializer(selected_quotes, many=True)
         
         return Response(serializer.data)
@@ -353,15 +447,21 @@ class QuoteViewSet(viewsets.ModelViewSet):
         
         Query parameters:
         - page: Page number (1-based index)
-        - limit: Number of items per page
+        - limit: Number of items per page (at most API_MAX_PAGE_SIZE)
         - sort_field: Field to sort by
         - sort_order: 'asc' or 'desc'
-        - search: Global search term
-        - Other filter fields: Specific fields to filter on
+        - search: Global full-text search term (results ordered by relevance
+          unless sort_field is given, each with 'rank' and 'headline')
+        - Other filter fields: Specific fields to filter on (see
+          api.filters.QUOTE_TEXT_FILTERS), e.g. 'book.title=soledad' for a
+          substring match or 'body__fuzzy=soledat' for a typo-tolerant one
         """
         # Get query parameters
-        page = int(request.query_params.get('page', 1))
-        limit = int(request.query_params.get('limit', 10))
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+            limit = min(max(1, int(request.query_params.get('limit', 10))), API_MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'page and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
         sort_field = request.query_params.get('sort_field')
         sort_order = request.query_params.get('sort_order', 'asc')
         search = request.query_params.get('search')
@@ -372,59 +472,40 @@ class QuoteViewSet(viewsets.ModelViewSet):
         # Base queryset filtered by user
         queryset = self.get_queryset()
         
-        # Apply search if provided
+        # Apply full-text search if provided (results come ordered by rank)
         if search:
-            queryset = queryset.filter(
-                Q(body__icontains=search) |
-                Q(book__title__icontains=search) |
-                Q(book__author__name__icontains=search) |
-                Q(tags__title__icontains=search)
-            ).distinct()
-        
-        # Apply field-specific filters
-        for param, value in request.query_params.items():
-            if param not in ['page', 'limit', 'sort_field', 'sort_order', 'search'] and value:
-                # Handle nested field filters (e.g., 'book.title')
-                if '.' in param:
-                    parts = param.split('.')
-                    filter_param = '__'.join(parts) + '__icontains'
-                    queryset = queryset.filter(**{filter_param: value})
-                else:
-                    # Try direct filter first
-                    try:
-                        queryset = queryset.filter(**{f"{param}__icontains": value})
-                    except:
-                        # Ignore invalid filter fields
-                        pass
+            queryset = search_quotes(queryset, search)
+        
+        # Apply field-specific filters (trigram-indexed) and sorting,
+        # rejecting unknown fields
+        try:
+            queryset = apply_quote_filters(queryset, request.query_params)
+            if sort_field:
+                queryset = order_quotes(queryset, sort_field, sort_order)
+        except FilterError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Count total results (before pagination)
         total_count = queryset.count()
         
-        # Apply sorting
-        if sort_field:
-            # Handle nested field sorting (e.g., 'book.title')
-            if '.' in sort_field:
-                parts = sort_field.split('.')
-                sort_param = '__'.join(parts)
-            else:
-                sort_param = sort_field
-                
-            # Apply sort direction
-            if sort_order.lower() == 'desc':
-                sort_param = f"-{sort_param}"
-                
-            queryset = queryset.order_by(sort_param)
-        
         # Apply pagination
         paginated_queryset = queryset[offset:offset + limit]
         
-        # Serialize the results
-        serializer = self.get_serializer(paginated_queryset, many=True)
+        # Serialize the results (values() fast path when the field selection allows it)
+        if search:
+            serializer = QuoteSearchResultSerializer(
+                paginated_queryset, many=True, context=self.get_serializer_context()
+            )
+        else:
+            serializer = self.get_serializer(paginated_queryset, many=True)
+        results = fast_data(serializer, paginated_queryset)
+        if results is None:
+            results = serializer.data
         
         # Return paginated response
         return Response({
             'count': total_count,
-            'results': serializer.data,
+            'results': results,
             'page': page,
             'limit': limit,
             'pages': (total_count + limit - 1) // limit,  # Ceiling division
@@ -435,6 +516,9 @@ class QuoteTagViewSet(viewsets.ModelViewSet):
     queryset = QuoteTag.objects.all()
     serializer_class = QuoteTagSerializer
 
+    def get_queryset(self):
+        return QuoteTag.objects.filter(quote__owner=self.request.user).order_by('pk')
+
 
 class QuoteGroupViewSet(viewsets.ModelViewSet):
     queryset = QuoteGroup.objects.all()
@@ -442,10 +526,19 @@ class QuoteGroupViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return QuoteGroup.objects.filter(
-            models.Q(created_by=self.request.user) | 
-            models.Q(members=self.request.user)
-        ).distinct()
+        return visible_groups(self.request.user).prefetch_related(
+            'quotegroupmembership_set__user',
+        ).order_by('name', 'pk')
+
+    def create(self, request, *args, **kwargs):
+        try:
+            clean_emails(request.data.get('members', []))
+        except MembershipError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = super().create(request, *args, **kwargs)
+        # Outcome of the invitations sent with the group (see perform_create)
+        response.data['invitations'] = self.invitations
+        return response
 
     def perform_create(self, serializer):
         group = serializer.save(created_by=self.request.user)
@@ -455,19 +548,46 @@ class QuoteGroupViewSet(viewsets.ModelViewSet):
             user=self.request.user,
             role='admin'
         )
-        # Add other members if provided
-        member_emails = self.request.data.get('members', [])
-        for email in member_emails:
-            try:
-                user = User.objects.get(email=email)
-                QuoteGroupMembership.objects.create(
-                    group=group,
-                    user=user,
-                    role='reader'
-                )
-            except User.DoesNotExist:
-                # Skip if user not found
-                continue
+        # Add other members if provided (unknown emails are reported, not fatal)
+        self.invitations = bulk_add_members(group, self.request.data.get('members', []))
+        # The response lists every member: load them in two queries, not one per member
+        prefetch_related_objects([group], 'quotegroupmembership_set__user')
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """
+        Quotes shared into the user's groups, newest first.
+        Query params: cursor (the 'next' of the previous page), page_size.
+        Returns {results, next}; next is null on the last page.
+        """
+        try:
+            entries, cursor = feed_page(
+                request.user, request.query_params.get('cursor'),
+                parse_page_size(request.query_params.get('page_size')),
+            )
+        except FeedError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        next_url = None
+        if cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+        return Response({
+            'results': GroupFeedEntrySerializer(entries, many=True).data,
+            'next': next_url,
+        })
+
+    @action(detail=True, methods=['post'])
+    def add_members(self, request, pk=None):
+        """
+        Add many members at once.
+        Body: emails (list), role (default 'reader').
+        Returns the emails by outcome: added, already_members, unknown, duplicates.
+        """
+        group = self.get_object()
+        try:
+            report = bulk_add_members(group, request.data.get('emails'), request.data.get('role', 'reader'))
+        except MembershipError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
 
     @action(detail=True, methods=['post'])
     def add_member(self, request, pk=None):
@@ -480,27 +600,26 @@ class QuoteGroupViewSet(viewsets.ModelViewSet):
                 {'error': 'Email is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
+
         try:
-            user = User.objects.get(email=email)
-            # Check if user is already a member
-            if QuoteGroupMembership.objects.filter(group=group, user=user).exists():
-                return Response(
-                    {'error': 'User is already a member of this group'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            membership = QuoteGroupMembership.objects.create(
-                group=group,
-                user=user,
-                role=role
+            report = bulk_add_members(group, [email], role)
+        except MembershipError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if report['already_members']:
+            return Response(
+                {'error': 'User is already a member of this group'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
-            return Response(QuoteGroupMembershipSerializer(membership).data)
-        except User.DoesNotExist:
+        if report['unknown']:
             return Response(
                 {'error': 'User not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        # By the user id bulk_add_members resolved, not by another lookup on the email
+        membership = QuoteGroupMembership.objects.select_related('user').get(
+            group=group, user_id=report['added_ids'][0],
+        )
+        return Response(QuoteGroupMembershipSerializer(membership).data)
 
     @action(detail=True, methods=['delete'])
     def remove_member(self, request, pk=None):
@@ -534,38 +653,80 @@ class QuoteGroupMembershipViewSet(viewsets.ModelViewSet):
     queryset = QuoteGroupMembership.objects.all()
     serializer_class = QuoteGroupMembershipSerializer
 
+    def get_queryset(self):
+        # Memberships of the groups the user belongs to
+        return visible_memberships(self.request.user).select_related('user').order_by('pk')
+
 
 class QuoteGroupShareViewSet(viewsets.ModelViewSet):
     queryset = QuoteGroupShare.objects.all()
     serializer_class = QuoteGroupShareSerializer
 
+    def get_queryset(self):
+        # Shares of the user's quotes and shares into the user's groups
+        return visible_shares(self.request.user).order_by('-shared_at', 'pk')
+
 
-class QuoteListViewSet(viewsets.ModelViewSet):
+class QuoteListViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = QuoteList.objects.all()
     serializer_class = QuoteListSerializer
     permission_classes = [IsAuthenticated]
+    version_scopes = ('library', 'quotes', 'lists')
+    conditional_actions = ('list', 'retrieve', 'quotes', 'shared_quotes')
 
     def get_queryset(self):
         # Include both owned lists and lists shared through groups
-        return QuoteList.objects.filter(
-            models.Q(owner=self.request.user) | 
-            models.Q(visibility='group') & models.Q(group__members=self.request.user)
-        ).distinct()
+        queryset = visible_lists(self.request.user).order_by('-updated', 'pk')
+        if self.action in ('list', 'retrieve'):
+            queryset = with_list_summaries(queryset, self.request)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
     @action(detail=False, methods=['get'])
+    @cache_response('library', 'quotes', 'lists')
     def shared(self, request):
         # Get lists shared through groups the user is a member of
-        shared_lists = QuoteList.objects.filter(
-            models.Q(visibility='group') &
-            models.Q(group__members=request.user)
-        ).distinct()
+        lists = with_list_summaries(shared_lists(request.user).order_by('-updated', 'pk'), request)
         
-        serializer = self.get_serializer(shared_lists, many=True)
+        serializer = self.get_serializer(lists, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def quotes(self, request, pk=None):
+        """
+        Quotes of the list in the list's order, paginated like every list
+        (?page= / ?page_size=, or a plain array with X-Plain-Lists: 1).
+        """
+        return self._conditional(self._list_quotes, request, pk=pk)
+
+    def _list_quotes(self, request, pk=None):
+        return self._quote_page(request, ordered_quotes(self.get_object()))
+
+    @action(detail=False, methods=['get'])
+    def shared_quotes(self, request):
+        """
+        Quotes of every list shared with the user's groups, each once, in one
+        request; paginated like ``quotes``.
+        """
+        return self._conditional(self._shared_quotes, request)
+
+    def _shared_quotes(self, request):
+        in_shared_list = QuoteListQuote.objects.filter(
+            shared_list_condition(request.user, prefix='quote_list__'), quote=OuterRef('pk'),
+        )
+        return self._quote_page(
+            request, Quote.objects.filter(Exists(in_shared_list)).order_by(*Quote._meta.ordering, 'pk'),
+        )
+
+    def _quote_page(self, request, queryset):
+        queryset = queryset.select_related('book__author').prefetch_related('tags')
+        page = self.paginator.slice_queryset(queryset, request, view=self)
+        serializer = QuoteSerializer(page, many=True, context={**self.get_serializer_context(), 'compact': True})
+        data = fast_data(serializer, page)
+        return self.paginator.get_paginated_response(serializer.data if data is None else data)
+
     @action(detail=True, methods=['post'])
     def add_quote(self, request, pk=None):
         quote_list = self.get_object()
@@ -573,7 +734,8 @@ class QuoteListViewSet(viewsets.ModelViewSet):
         
         try:
             quote = Quote.objects.get(id=quote_id, owner=request.user)
-            quote_list.quotes.add(quote)
+            # New quotes go to the end of the list
+            quote_list.quotes.add(quote, through_defaults={'position': next_position(quote_list.pk)})
             return Response({'status': 'quote added'})
         except Quote.DoesNotExist:
             return Response(
@@ -636,7 +798,9 @@ class QuoteListViewSet(viewsets.ModelViewSet):
     def update_order(self, request, pk=None):
         """
         Update the order of quotes in a list
-        Expects a list of quote_ids in the order they should appear
+        Expects a list of quote_ids in the order they should appear.
+        Only the rows whose position changes are written; to move a single
+        quote use move_quote instead.
         """
         quote_list = self.get_object()
         quote_ids = request.data.get('quote_ids', [])
@@ -646,36 +810,45 @@ class QuoteListViewSet(viewsets.ModelViewSet):
                 {'error': 'quote_ids parameter is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
+
+        updated = reorder(quote_list, quote_ids)
+        return Response({'status': 'order updated', 'updated': updated})
+
+    @action(detail=True, methods=['post'])
+    def move_quote(self, request, pk=None):
+        """
+        Move one quote within the list, writing only its row.
+        Body: quote_id plus after_id (place it right after that quote) or
+        before_id (right before it); without either it goes to the end.
+        """
+        quote_list = self.get_object()
+        quote_id = request.data.get('quote_id')
+        if quote_id is None:
+            return Response({'error': 'quote_id parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            # First clear the existing relationships
-            QuoteListQuote.objects.filter(quote_list=quote_list).delete()
-            
-            # Then create new ones with proper order
-            for index, quote_id in enumerate(quote_ids):
-                try:
-                    quote = Quote.objects.get(id=quote_id)
-                    QuoteListQuote.objects.create(
-                        quote_list=quote_list,
-                        quote=quote,
-                        order=index
-                    )
-                except Quote.DoesNotExist:
-                    # Skip quotes that don't exist
-                    continue
-                    
-            return Response({'status': 'order updated'})
-        except Exception as e:
-            return Response(
-                {'error': str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            position = move_quote(
+                quote_list, quote_id,
+                after_id=request.data.get('after_id'), before_id=request.data.get('before_id'),
             )
+        except RankError as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'status': 'quote moved', 'position': position})
 
 
 class QuoteListQuoteViewSet(viewsets.ModelViewSet):
     queryset = QuoteListQuote.objects.all()
     serializer_class = QuoteListQuoteSerializer
 
+    def get_queryset(self):
+        return QuoteListQuote.objects.filter(quote_list__owner=self.request.user).order_by('quote_list', 'position', 'pk')
+
+    def perform_create(self, serializer):
+        # Appended at the end of the list unless a position is given
+        if 'position' not in serializer.validated_data:
+            serializer.save(position=next_position(serializer.validated_data['quote_list'].pk))
+        else:
+            serializer.save()
+
 
 class QuoteNoteViewSet(viewsets.ModelViewSet):
     queryset = QuoteNote.objects.all()
@@ -686,13 +859,9 @@ class QuoteNoteViewSet(viewsets.ModelViewSet):
         """
         This view should return notes based on permissions:
         - User's own notes (private or public)
-        - Public notes from other users
+        - Public notes from other users on quotes the user can see
         """
-        user = self.request.user
-        return QuoteNote.objects.filter(
-            Q(user=user) | 
-            Q(is_private=False)
-        ).order_by('created')
+        return visible_notes(self.request.user).select_related('user').order_by('created')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -722,16 +891,39 @@ class QuoteNoteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'])
+    def by_quote(self, request):
+        """
+        Notes of many quotes in one request: ?quote_ids=1,2,3.
+        Returns {quote_id: [notes]} with an entry (maybe empty) per requested
+        quote and the authors in compact form; see api/notes.py.
+        """
+        try:
+            quote_ids = parse_quote_ids(request.query_params.get('quote_ids'))
+        except NotesError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        grouped = notes_by_quote(request.user, quote_ids)
+        return Response({
+            quote_id: QuoteNoteCompactSerializer(notes, many=True).data
+            for quote_id, notes in grouped.items()
+        })
+
 
 class DocumentViewSet(viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
 
+    def get_queryset(self):
+        return Document.objects.filter(owner=self.request.user).order_by('-uploaded_at', 'pk')
+
 
 class ImportLogViewSet(viewsets.ModelViewSet):
     queryset = ImportLog.objects.all()
     serializer_class = ImportLogSerializer
 
+    def get_queryset(self):
+        return ImportLog.objects.filter(owner=self.request.user).order_by('-created_at', 'pk')
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -748,6 +940,7 @@ def current_user(request):
 
 
 
+@defer_search_vectors()
 def save_quotes_from_file(file_content, owner):
     """
     Process the file content and create Quote instances.
@@ -1165,6 +1358,7 @@ def convert_docx_to_json(docx_path):
     return book_data
 
 
+@defer_search_vectors()
 def save_quotes_from_docx(book_data, owner):
     """
     Save quotes from the parsed DOCX data
@@ -1447,18 +1641,13 @@ def get_statistics(request):
     """
     API view to get dashboard statistics for the current user.
     Returns counts of books, authors, quotes, and other metrics.
+    All counters come from one cached query (see api/stats.py).
     """
-    user = request.user
-    
-    # Get statistics
-    stats = {
-        'total_books': Book.objects.filter(quotes__owner=user).distinct().count(),
-        'books_without_covers': Book.objects.filter(quotes__owner=user, cover__isnull=True).distinct().count(),
-        'total_authors': Author.objects.filter(books__quotes__owner=user).distinct().count(),
-        'total_quotes': Quote.objects.filter(owner=user).count(),
-        'quote_lists': QuoteList.objects.filter(owner=user).count(),
-        'quote_groups': QuoteGroup.objects.filter(members=user).distinct().count(),
-    }
+    stats = get_stats(request.user)
+    stats = {key: stats[key] for key in (
+        'total_books', 'books_without_covers', 'total_authors',
+        'total_quotes', 'quote_lists', 'quote_groups',
+    )}
     
     return Response(stats, status=status.HTTP_200_OK)
 
@@ -1614,73 +1803,84 @@ def search(request):
         })
     
     # Perform search across models
-    books = Book.objects.filter(
+    books = with_book_counts(Book.objects.filter(
         Q(title__icontains=query) | 
         Q(author__name__icontains=query)
-    )[:10]  # Limit to 10 results per category
+    ), request.user)[:10]  # Limit to 10 results per category
     
-    authors = Author.objects.filter(
+    authors = with_author_counts(Author.objects.filter(
         name__icontains=query
-    )[:10]
+    ), request.user)[:10]
     
-    tags = Tag.objects.filter(
+    tags = with_tag_counts(Tag.objects.filter(
         title__icontains=query
-    )[:10]
-    
-    # Add quotes search by body content
-    quotes = Quote.objects.filter(
-        Q(body__icontains=query) |
-        Q(title__icontains=query)
-    ).filter(
-        owner=request.user  # Only return quotes owned by the current user
-    )[:10]
-    
-    # Serialize the results
-    book_serializer = BookSerializer(books, many=True)
-    author_serializer = AuthorSerializer(authors, many=True)
-    tag_serializer = TagSerializer(tags, many=True)
-    quote_serializer = QuoteSerializer(quotes, many=True)
-    
+    ), request.user)[:10]
+    
+    # Full-text search over the user's quotes, best matches first
+    quotes = search_quotes(
+        Quote.objects.filter(owner=request.user),  # Only return quotes owned by the current user
+        query
+    ).select_related('book__author').prefetch_related('tags')[:10]
+    
+    # Serialize the results (quotes in the compact card form)
+    results = {}
+    for key, serializer in (
+        ('books', BookSerializer(books, many=True, context={'request': request})),
+        ('authors', AuthorSerializer(authors, many=True, context={'request': request})),
+        ('tags', TagSerializer(tags, many=True, context={'request': request})),
+        ('quotes', QuoteSearchResultSerializer(quotes, many=True, context={'request': request, 'compact': True})),
+    ):
+        data = fast_data(serializer, serializer.instance)
+        results[key] = serializer.data if data is None else data
+    
+    return Response(results)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_autocomplete(request):
+    """
+    Type-ahead suggestions for the search overlay.
+    Returns compact {id, type, label} items for books, authors, tags and the
+    user's quotes, matched by prefix or typo-tolerant similarity.
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 5)), 20))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
     return Response({
-        'books': book_serializer.data,
-        'authors': author_serializer.data,
-        'tags': tag_serializer.data,
-        'quotes': quote_serializer.data
+        'query': query,
+        'results': autocomplete(request.user, query, limit)
     })
 
+
+# Always the envelope: it carries the totals next to the page
+class ImportHistoryPagination(DefaultPagination):
+    page_size = 20
+    allow_plain_lists = False
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_response('imports')
 def import_history(request):
     """
     API view to retrieve import history for the current user.
-    Returns a list of import logs.
+    Paginated (?page= / ?page_size=), newest first, with the totals of the
+    completed imports per platform read from the daily rollup.
     """
-    user = request.user
-    
-    # Get import logs
-    import_logs = ImportLog.objects.filter(owner=user).order_by('-created_at')
-    
-    # Problemas detectados: algunos registros muestran el mismo número de citas duplicadas y añadidas
-    # Por definición, si hay N duplicados, entonces solo se añadieron 0 citas
-    for log in import_logs:
-        # Corregir registros incoherentes:
-        # Si el número de duplicados es igual al número de citas añadidas, las citas añadidas deben ser 0
-        if log.duplicates_skipped > 0 and log.duplicates_skipped == log.quotes_added:
-            log.quotes_added = 0
-            log.save(update_fields=['quotes_added'])
-        
-        # Actualizar registros antiguos que no tengan duplicados registrados
-        elif log.quotes_added == 0 and log.duplicates_skipped == 0 and log.status == 'completed':
-            # Mantener el registro como está, con 0 citas añadidas y 0 duplicados
-            # Este caso ocurre cuando se reintentan importaciones y todas las citas son duplicadas
-            pass
-    
-    serializer = ImportLogSerializer(import_logs, many=True)
-    
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    import_logs = ImportLog.objects.filter(owner=request.user).order_by('-created_at', '-pk')
+    paginator = ImportHistoryPagination()
+    page = paginator.paginate_queryset(import_logs, request)
+    response = paginator.get_paginated_response(ImportLogSerializer(page, many=True).data)
+    response.data['totals'] = import_totals(request.user)
+    return response
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_response('profile', user_kwarg='user_id')
 def get_subscription_plan(request, user_id):
     try:
         user = User.objects.get(id=user_id)
@@ -1784,13 +1984,14 @@ class AnthropicTagView(APIView):
             )
             
             # Realizar la solicitud a Claude
-            message = client.messages.create(
-                model="claude-3-7-sonnet-20250219",
-                max_tokens=100,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            with external_call('anthropic'):
+                message = client.messages.create(
+                    model="claude-3-7-sonnet-20250219",
+                    max_tokens=100,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
             
             # Procesar la respuesta
             tag_content = message.content[0].text
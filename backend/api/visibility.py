@@ -0,0 +1,81 @@
+# api/visibility.py
+"""
+Who can see what: groups, lists, shares, memberships, quotes and notes.
+
+Group access is checked with a correlated ``EXISTS`` on
+quote_group_memberships, which is unique on (user, group) and so answers
+with one index probe per row. Joining ``group__members`` instead multiplies
+the rows by the number of members and needs a DISTINCT (and a costlier
+pagination COUNT) to undo it.
+"""
+from django.db.models import Exists, OuterRef, Q
+
+from .models import (
+    Quote, QuoteGroup, QuoteGroupMembership, QuoteGroupShare, QuoteList, QuoteListQuote, QuoteNote,
+)
+
+
+def member_of(user, group_field='group_id'):
+    """EXISTS: ``user`` belongs to the group referenced by ``group_field`` of the outer row."""
+    return Exists(QuoteGroupMembership.objects.filter(user=user, group_id=OuterRef(group_field)))
+
+
+def shared_list_condition(user, group_field='group_id', prefix=''):
+    """Q: the list is shared with one of ``user``'s groups."""
+    return Q(**{f'{prefix}visibility': 'group'}) & member_of(user, f'{prefix}{group_field}')
+
+
+def visible_groups(user, queryset=None):
+    """Groups ``user`` created or belongs to."""
+    queryset = QuoteGroup.objects.all() if queryset is None else queryset
+    return queryset.filter(Q(created_by=user) | member_of(user, 'pk'))
+
+
+def visible_lists(user, queryset=None):
+    """Lists ``user`` owns or that are shared with their groups."""
+    queryset = QuoteList.objects.all() if queryset is None else queryset
+    return queryset.filter(Q(owner=user) | shared_list_condition(user))
+
+
+def shared_lists(user, queryset=None):
+    """Lists shared with ``user``'s groups."""
+    queryset = QuoteList.objects.all() if queryset is None else queryset
+    return queryset.filter(shared_list_condition(user))
+
+
+def visible_memberships(user, queryset=None):
+    """Memberships of the groups ``user`` belongs to."""
+    queryset = QuoteGroupMembership.objects.all() if queryset is None else queryset
+    return queryset.filter(member_of(user))
+
+
+def visible_shares(user, queryset=None):
+    """Shares of ``user``'s quotes and shares into their groups."""
+    queryset = QuoteGroupShare.objects.all() if queryset is None else queryset
+    return queryset.filter(Q(quote__owner=user) | member_of(user))
+
+
+def quote_condition(user, quote_field='pk'):
+    """
+    Q: ``user`` can see the quote referenced by ``quote_field``: they own it,
+    it is in a list shared with their groups, or it was shared with one of
+    their groups.
+    """
+    owner = 'owner' if quote_field == 'pk' else f'{quote_field.removesuffix("_id")}__owner'
+    in_shared_list = QuoteListQuote.objects.filter(
+        shared_list_condition(user, prefix='quote_list__'), quote_id=OuterRef(quote_field),
+    )
+    shared = QuoteGroupShare.objects.filter(member_of(user), quote_id=OuterRef(quote_field))
+    return Q(**{owner: user}) | Exists(in_shared_list) | Exists(shared)
+
+
+def visible_quotes(user, queryset=None):
+    """Quotes ``user`` can open (see quote_condition())."""
+    queryset = Quote.objects.all() if queryset is None else queryset
+    return queryset.filter(quote_condition(user))
+
+
+def visible_notes(user, queryset=None):
+    """``user``'s own notes, and the public notes of the quotes they can see."""
+    queryset = QuoteNote.objects.all() if queryset is None else queryset
+    return queryset.filter(Q(user=user) | Q(is_private=False) & quote_condition(user, 'quote_id'))
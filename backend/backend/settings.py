@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party apps
     'rest_framework',
@@ -68,6 +69,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Times the rest of the stack (wall, DB and external calls): keep it near the top
+    'api.instrumentation.InstrumentationMiddleware',
+    # Compresses responses, so it goes before anything that sets the body
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -95,7 +100,9 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-csrftoken",
+    "x-plain-lists",
 ]
+CORS_EXPOSE_HEADERS = ["X-Total-Count", "Link"]
 
 # ACCOUNT_SIGNUP_FORM_CLASS = 'accounts.forms.CustomSignupForm'
 # ACCOUNT_SIGNUP_FORM_CLASS = 'accounts.forms'
@@ -114,8 +121,14 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Page size and limits: API_PAGE_SIZE, API_MAX_PAGE_SIZE, PLAIN_LIST_LIMIT (api/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.DefaultPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'api.renderers.FastJSONParser',
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
     ],
@@ -175,6 +188,50 @@ DATABASES = {
     }
 }
 
+# Cache: Redis in production (REDIS_URL, e.g. redis://localhost:6379/1), local memory otherwise.
+# Version stamps, response cache entries and their hit counters live here.
+# Conditional GET (api/versions.py) and the response cache (api/response_cache.py)
+# need a cache shared by every worker: without REDIS_URL both are off, unless
+# CONDITIONAL_GET_ENABLED / RESPONSE_CACHE_ENABLED are set for a single-process
+# server (the test settings do so).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Request instrumentation (api/instrumentation.py): one JSON line per request on
+# api.perf, slow queries and requests (with their SQL) on api.perf.slow.
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 1000))
+PERF_SLOW_QUERY_MS = int(os.environ.get('PERF_SLOW_QUERY_MS', 100))
+
+# Multiplier of the latency budgets of api/budgets.py, for slower CI machines
+API_BUDGET_LATENCY_SCALE = float(os.environ.get('API_BUDGET_LATENCY_SCALE', 1.0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.perf': {
+            'handlers': ['console'],
+            # WARNING keeps only the slow log (backend/test_settings.py does so for the test suite)
+            'level': os.environ.get('PERF_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -253,6 +310,10 @@ AUTH_USER_MODEL = 'api.User'
 # Change email backend to console for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# PostgreSQL text search configurations used to index quotes (see api/search.py).
+# The first one is used for books whose language is unknown.
+SEARCH_CONFIGS = ['spanish', 'english']
+
 # Ollama API URL
 OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', 'http://localhost:11434')
 
@@ -0,0 +1,16 @@
+"""
+Settings for the test suite:
+
+    python manage.py test --settings=backend.test_settings
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import LOGGING
+
+# Only the slow log while running the test suite
+LOGGING['loggers']['api.perf']['level'] = os.environ.get('PERF_LOG_LEVEL', 'WARNING')
+
+# The test runner is a single process: its local memory cache is shared by every request
+CONDITIONAL_GET_ENABLED = True
+RESPONSE_CACHE_ENABLED = True
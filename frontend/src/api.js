@@ -23,7 +23,8 @@ function getCookie(name) {
 
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
-  headers: { 'Content-Type': 'application/json' },
+  // X-Plain-Lists: list endpoints answer with plain (bounded) arrays instead of paginated envelopes
+  headers: { 'Content-Type': 'application/json', 'X-Plain-Lists': '1' },
   withCredentials: true, // Cookies are sent with every request
 });
 
@@ -39,6 +40,26 @@ apiClient.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// URL of the rel="next" entry of a Link header, if any
+const nextLink = (header) => {
+  const match = /<([^>]+)>;\s*rel="next"/.exec(header || '');
+  return match ? match[1] : null;
+};
+
+// Fetch every item of a list endpoint. Plain lists are cut by the backend
+// (X-Total-Count + Link: rel="next"); the rest is read page by page.
+const getAll = async (url, config = {}) => {
+  const response = await apiClient.get(url, config);
+  const items = [...response.data];
+  let next = nextLink(response.headers.link);
+  while (next) {
+    const page = await apiClient.get(next);
+    items.push(...page.data.results);
+    next = page.data.next;
+  }
+  return items;
+};
+
 // Login function: call the login endpoint and return the response
 const loginApi = async (username, password) => {
   try {
@@ -147,4 +168,4 @@ const passwordResetWithKey = async (key, password) => {
   }
 };
 
-export { apiClient, loginApi, logout, getSession, signup, getCookie, me, passwordResetRequest, passwordResetWithKey };
+export { apiClient, getAll, loginApi, logout, getSession, signup, getCookie, me, passwordResetRequest, passwordResetWithKey };
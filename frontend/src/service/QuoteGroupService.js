@@ -39,6 +39,24 @@ export const QuoteGroupService = {
         return response.data;
     },
 
+    // Returns the emails by outcome: added, already_members, unknown, duplicates
+    async addMembers(groupId, emails, role = 'reader') {
+        const response = await apiClient.post(`/quote-groups/${groupId}/add_members/`, {
+            emails: emails,
+            role: role
+        });
+        return response.data;
+    },
+
+    // Quotes shared into the user's groups, newest first: { results, next }.
+    // Pass the `next` URL of the previous page to get the following one.
+    async getFeed(next = null, pageSize = 20) {
+        const response = next
+            ? await apiClient.get(next)
+            : await apiClient.get('/quote-groups/feed/', { params: { page_size: pageSize } });
+        return response.data;
+    },
+
     async removeMember(groupId, email) {
         const response = await apiClient.delete(`/quote-groups/${groupId}/remove_member/`, {
             data: { email: email }
@@ -1,18 +1,33 @@
-import { apiClient } from "@/api";
+import { apiClient, getAll } from "@/api";
 
 export const QuoteListService = {
-    async getQuoteLists() {
+    // Summaries (quotes_count, previews); with quoteId each list says whether it has that quote (has_quote)
+    async getQuoteLists(quoteId = null) {
         console.log('Getting quote lists...');
-        const response = await apiClient.get("quote-lists/");
+        const params = quoteId ? { quote: quoteId } : {};
+        const response = await apiClient.get("quote-lists/", { params });
         console.log('Quote lists response:', response.data);
         return response.data;
     },
     
     async getQuoteList(listId) {
         console.log('Getting quote list:', listId);
-        const response = await apiClient.get(`quote-lists/${listId}/`);
+        const [response, quotes] = await Promise.all([
+            apiClient.get(`quote-lists/${listId}/`),
+            this.getListQuotes(listId)
+        ]);
         console.log('Quote list response:', response.data);
-        return response.data;
+        return { ...response.data, quotes };
+    },
+
+    // Quotes of a list in the list's order
+    async getListQuotes(listId) {
+        return getAll(`quote-lists/${listId}/quotes/`);
+    },
+
+    // Quotes of every list shared with the user's groups, each once
+    async getSharedListQuotes() {
+        return getAll("quote-lists/shared_quotes/");
     },
     
     async createQuoteList(listData) {
@@ -75,6 +90,16 @@ export const QuoteListService = {
         return response.data;
     },
     
+    // Move one quote right after (afterId) or before (beforeId) another one of the list
+    async moveQuote(listId, quoteId, { afterId = null, beforeId = null } = {}) {
+        const response = await apiClient.post(`quote-lists/${listId}/move_quote/`, {
+            quote_id: quoteId,
+            after_id: afterId,
+            before_id: beforeId
+        });
+        return response.data;
+    },
+    
     async getSharedLists() {
         console.log('Getting shared lists...');
         const response = await apiClient.get("quote-lists/shared/");
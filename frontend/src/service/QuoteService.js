@@ -1,13 +1,12 @@
 // src/service/QuoteService.js
-import { apiClient } from "@/api";
+import { apiClient, getAll } from "@/api";
 import { EventBus } from "./EventBusService";
 import axios from "axios";
 
 export const QuoteService = {
     // Fetch all quotes from the Django API
     async getQuotes() {
-        const response = await apiClient.get("quotes/");
-        return response.data;
+        return getAll("quotes/");
     },
 
     // Get quotes with pagination
@@ -47,19 +46,24 @@ export const QuoteService = {
         return response.data;
     },
 
-    async getQuotesByBook(bookId) {
-        const response = await apiClient.get(`quotes/?book=${bookId}`);
+    // Notes of many quotes in one request: { [quoteId]: [notes] }
+    async getNotes(quoteIds) {
+        const response = await apiClient.get('quote-notes/by_quote/', {
+            params: { quote_ids: quoteIds.join(',') }
+        });
         return response.data;
     },
 
+    async getQuotesByBook(bookId) {
+        return getAll(`quotes/?book=${bookId}`);
+    },
+
     async getQuotesByTag(tagTitle) {
-        const response = await apiClient.get(`quotes/?tag=${tagTitle}`);
-        return response.data;
+        return getAll(`quotes/?tag=${tagTitle}`);
     },
 
     async getQuotesByAuthor(authorId) {
-        const response = await apiClient.get(`quotes/?author=${authorId}`);
-        return response.data;
+        return getAll(`quotes/?author=${authorId}`);
     },
 
     async updateQuote(quoteId, quoteData) {
@@ -72,14 +76,21 @@ export const QuoteService = {
         return response.data;
     },
 
-    // Optionally, delete multiple quotes (if supported by your backend)
-    async deleteMultipleQuotes(quoteIds) {
-        const response = await apiClient.post("quotes/delete-multiple/", {
-            data: { ids: quoteIds }
-        });
+    // One action over many quotes in a single request (see api/bulk.py)
+    async bulkUpdateQuotes(action, quoteIds, options = {}) {
+        const response = await apiClient.post("quotes/bulk/", { action, ids: quoteIds, ...options });
         return response.data;
     },
 
+    async deleteMultipleQuotes(quoteIds) {
+        return this.bulkUpdateQuotes("delete", quoteIds);
+    },
+
+    // Add tags (titles) to many quotes, keeping the tags they already have
+    async addTagsToQuotes(quoteIds, tags) {
+        return this.bulkUpdateQuotes("tag", quoteIds, { tags });
+    },
+
     // Upload a .txt file containing quotes to the Django API
     async uploadQuotes(file) {
         const formData = new FormData();
@@ -38,7 +38,7 @@ export class QuoteSyncChatService {
       // Obtener todas las citas
       try {
         console.log('Getting all quotes');
-        const allQuotesResponse = await apiClient.get(`/quotes/`);
+        const allQuotesResponse = await apiClient.get(`/quotes/?expand=notes`);
         
         if (allQuotesResponse.data && 
             Array.isArray(allQuotesResponse.data) && 
@@ -281,7 +281,7 @@ export class QuoteSyncChatService {
         console.log('No specific quotes found, getting random quotes');
         
         try {
-          const allQuotesResponse = await apiClient.get(`/quotes/`);
+          const allQuotesResponse = await apiClient.get(`/quotes/?expand=notes`);
           
           if (allQuotesResponse.data && 
               Array.isArray(allQuotesResponse.data) && 
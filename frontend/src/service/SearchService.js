@@ -16,6 +16,22 @@ export const SearchService = {
     }
   },
   
+  /**
+   * Get type-ahead suggestions for books, authors, tags and quotes
+   * @param {string} query - The partial search query
+   * @param {number} limit - Maximum number of suggestions per type
+   * @returns {Promise<Array>} - Promise that resolves to [{ id, type, label }]
+   */
+  async autocomplete(query, limit = 5) {
+    try {
+      const response = await apiClient.get(`/search/autocomplete/?q=${encodeURIComponent(query.trim())}&limit=${limit}`);
+      return response.data.results;
+    } catch (error) {
+      console.error('Autocomplete error:', error);
+      return [];
+    }
+  },
+
   /**
    * Get recent searches
    * @returns {Array} - Array of recent searches
@@ -343,11 +343,11 @@ export const UserService = {
         }
     },
     
-    // Get user activity
-    async getUserActivity() {
+    // Get user activity (params: { start, end, bucket: 'day' | 'week' | 'month' })
+    async getUserActivity(params = {}) {
         try {
             // Try to get activity data from the backend
-            const response = await apiClient.get("/users/activity/");
+            const response = await apiClient.get("/users/activity/", { params });
             console.log("Retrieved user activity from backend:", response.data);
             return response.data;
         } catch (error) {
@@ -69,6 +69,18 @@ export const useSearchStore = defineStore('search', () => {
     recentSearches.value = SearchService.getRecentSearches();
   };
 
+  // Map {id, type, label} suggestions to the sections the overlay renders
+  const groupSuggestions = (suggestions) => {
+    const grouped = { books: [], authors: [], tags: [], quotes: [] };
+    for (const { id, type, label } of suggestions) {
+      if (type === 'book') grouped.books.push({ id, title: label });
+      else if (type === 'author') grouped.authors.push({ id, name: label });
+      else if (type === 'tag') grouped.tags.push({ id, title: label });
+      else if (type === 'quote') grouped.quotes.push({ id, body: label });
+    }
+    return grouped;
+  };
+
   // Debounced search function
   const debouncedSearch = debounce(async (searchQuery) => {
     if (!searchQuery || searchQuery.trim() === '') {
@@ -78,8 +90,9 @@ export const useSearchStore = defineStore('search', () => {
     }
 
     try {
-      const response = await SearchService.search(searchQuery);
-      results.value = response;
+      // Compact type-ahead suggestions (one cached query per keystroke)
+      const suggestions = await SearchService.autocomplete(searchQuery);
+      results.value = groupSuggestions(suggestions);
       
       // Save to recent searches only when we've completed a search with results
       if (hasResults.value) {